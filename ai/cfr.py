@@ -0,0 +1,422 @@
+# liars_bar/ai/cfr.py
+"""
+反事實遺憾最小化 (CFR) 離線求解器與策略表
+
+抽象化：
+- 以「一輪」為子遊戲求解，終局報酬為 ev.survival_share 的期望存活份額
+- 一輪之內目標牌固定，目標牌與 Joker 同樣算誠實，因此手牌只需記錄
+  (誠實牌張數, 非誠實牌張數)；目標牌資訊已隱含在這個相對表示中
+- 資訊集 = 手牌 × 上家出牌張數 × 存活對手數 × 下家手牌數 × 上家剩餘手牌數 × 自己的槍管位置
+- 動作 = (誠實牌張數, 謊報牌張數) 共 9 種出牌，加上質疑
+
+訓練使用 outcome-sampling MCCFR 搭配 regret-matching+（遺憾值下限為 0）：
+每次迭代只抽樣一條對局軌跡，遺憾值與平均策略都是以資訊集編號為列的 NumPy 陣列。
+多進程模式下陣列放在共享記憶體，各工作進程無鎖地直接更新（Hogwild 式），
+並定期寫出檢查點，可中斷後續跑。
+
+求解結果寫成量化為 uint8 的平均策略表，SolverStrategy 載入後每次決策只是
+計算資訊集編號並讀取一列。
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import RawArray
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models.card import DECK_COMPOSITION, GUN_CHAMBERS, TARGET_CARDS
+from utils.rng import SeedStream
+from .ev import survival_share
+
+DEFAULT_POLICY_PATH = os.path.join("config", "solver_policy.npz")
+
+# 抽象動作：(誠實牌張數, 謊報牌張數)，最後一個動作為質疑
+PLAY_ACTIONS = ((1, 0), (2, 0), (3, 0), (0, 1), (1, 1), (2, 1), (0, 2), (1, 2), (0, 3))
+CHALLENGE_ACTION = len(PLAY_ACTIONS)
+NUM_ACTIONS = len(PLAY_ACTIONS) + 1
+
+# 一輪之內的相對牌組：誠實牌（目標牌與 Joker）與其他牌
+# 標準牌組中 A、K、Q 張數相同，因此不論目標牌為何都是同一副相對牌組
+TRUE_CARDS = DECK_COMPOSITION[TARGET_CARDS[0]] + DECK_COMPOSITION["J"]
+DECK_SIZE = sum(DECK_COMPOSITION.values())
+MAX_HAND_SIZE = DECK_SIZE // 2
+
+# (誠實牌, 非誠實牌) -> 手牌編號；(誠實牌, 非誠實牌, 可否質疑) -> 合法抽象動作
+_HAND_INDEX: Dict[Tuple[int, int], int] = {}
+_LEGAL: Dict[Tuple[int, int, bool], Tuple[int, ...]] = {}
+
+
+def _build_tables():
+    """列舉所有相對手牌並建立編號與合法動作表"""
+    for true_cards in range(TRUE_CARDS + 1):
+        for false_cards in range(MAX_HAND_SIZE - true_cards + 1):
+            _HAND_INDEX[(true_cards, false_cards)] = len(_HAND_INDEX)
+            plays = tuple(i for i, (t, f) in enumerate(PLAY_ACTIONS)
+                          if t <= true_cards and f <= false_cards)
+            _LEGAL[(true_cards, false_cards, False)] = plays
+            _LEGAL[(true_cards, false_cards, True)] = plays + (CHALLENGE_ACTION,)
+
+
+_build_tables()
+
+# 資訊集各維度大小
+NUM_HANDS = len(_HAND_INDEX)
+LAST_SIZES = 4          # 0 表示沒有可質疑的上家出牌
+OPPONENT_COUNTS = 3     # 1~3 名存活對手
+NEXT_COUNT_BUCKETS = 4  # 下家手牌 1、2、3、4 張以上
+LAST_COUNT_BUCKETS = 4  # 0 表示沒有上家出牌；1、2、3 張以上
+CHAMBERS = GUN_CHAMBERS
+NUM_INFOSETS = (NUM_HANDS * LAST_SIZES * OPPONENT_COUNTS * NEXT_COUNT_BUCKETS
+                * LAST_COUNT_BUCKETS * CHAMBERS)
+
+
+def infoset_id(true_cards: int, false_cards: int, last_size: int, opponents: int,
+               next_count: int, last_remaining: int, gun_pos: int) -> int:
+    """以混合進位計算資訊集編號"""
+    idx = _HAND_INDEX[(true_cards, false_cards)]
+    idx = idx * LAST_SIZES + last_size
+    idx = idx * OPPONENT_COUNTS + min(max(opponents, 1), OPPONENT_COUNTS) - 1
+    idx = idx * NEXT_COUNT_BUCKETS + min(max(next_count, 1), NEXT_COUNT_BUCKETS) - 1
+    idx = idx * LAST_COUNT_BUCKETS + (min(last_remaining, LAST_COUNT_BUCKETS - 1) if last_size else 0)
+    return idx * CHAMBERS + min(max(gun_pos, 1), CHAMBERS) - 1
+
+
+def hand_index(true_cards: int, false_cards: int) -> int:
+    """相對手牌 (誠實牌張數, 非誠實牌張數) 的編號"""
+    return _HAND_INDEX[(true_cards, false_cards)]
+
+
+def relative_hands() -> List[Tuple[int, int]]:
+    """所有相對手牌，順序同 hand_index"""
+    return list(_HAND_INDEX)
+
+
+def legal_actions(true_cards: int, false_cards: int, can_challenge: bool) -> Tuple[int, ...]:
+    """手牌的合法抽象動作"""
+    return _LEGAL[(true_cards, false_cards, can_challenge)]
+
+
+def _regret_matching(row: List[float], legal: Tuple[int, ...]) -> List[float]:
+    """依正遺憾值比例分配合法動作的機率，全為 0 時均勻分配"""
+    total = 0.0
+    for a in legal:
+        total += row[a]
+    if total > 0.0:
+        return [row[a] / total for a in legal]
+    return [1.0 / len(legal)] * len(legal)
+
+
+def _sample(probs: List[float], rng) -> int:
+    """依機率抽出索引"""
+    u = rng.random()
+    for k, p in enumerate(probs):
+        u -= p
+        if u < 0.0:
+            return k
+    return len(probs) - 1
+
+
+def run_iterations(regrets: np.ndarray, strategy_sum: np.ndarray, rng, iterations: int,
+                   epsilon: float = 0.6, player_counts: Sequence[int] = (2, 3, 4),
+                   random_chambers: bool = False):
+    """
+    執行 outcome-sampling MCCFR 迭代，直接更新 regrets 與 strategy_sum
+    每次迭代：抽樣存活人數、發牌與先手，隨機選一名更新者；更新者以 epsilon 探索抽樣，
+    其他玩家依目前策略抽樣並累加平均策略；到本輪有人開槍或出完手牌為止
+    """
+    deck = [1] * TRUE_CARDS + [0] * (DECK_SIZE - TRUE_CARDS)
+    path: List[Tuple[int, Tuple[int, ...], List[float], int]] = []
+
+    for _ in range(iterations):
+        n = player_counts[rng.randrange(len(player_counts))]
+        rng.shuffle(deck)
+        per_player = DECK_SIZE // n
+        trues = [sum(deck[i * per_player:(i + 1) * per_player]) for i in range(n)]
+        falses = [per_player - t for t in trues]
+        guns = [rng.randint(1, GUN_CHAMBERS) if random_chambers else 1 for _ in range(n)]
+        traverser = rng.randrange(n)
+        current = rng.randrange(n)
+        last, last_size, last_honest = -1, 0, True
+        shooter = -1
+        sample_prob = 1.0
+        del path[:]
+
+        while True:
+            true_cards, false_cards = trues[current], falses[current]
+            legal = _LEGAL[(true_cards, false_cards, last >= 0)]
+            next_idx = (current + 1) % n
+            info = infoset_id(true_cards, false_cards, last_size, n - 1,
+                              trues[next_idx] + falses[next_idx],
+                              trues[last] + falses[last] if last >= 0 else 0, guns[current])
+            sigma = _regret_matching(regrets[info].tolist(), legal)
+
+            if current == traverser:
+                explore = epsilon / len(legal)
+                k = _sample([explore + (1.0 - epsilon) * p for p in sigma], rng)
+                sample_prob *= explore + (1.0 - epsilon) * sigma[k]
+                path.append((info, legal, sigma, k))
+            else:
+                k = _sample(sigma, rng)
+                row = strategy_sum[info]
+                values = row.tolist()
+                for a, p in zip(legal, sigma):
+                    values[a] += p
+                row[:] = values
+
+            action = legal[k]
+            if action == CHALLENGE_ACTION:
+                shooter = current if last_honest else last
+                break
+            t, f = PLAY_ACTIONS[action]
+            trues[current] -= t
+            falses[current] -= f
+            last, last_size, last_honest = current, t + f, f == 0
+            if trues[current] + falses[current] == 0:
+                # 出完手牌時系統自動質疑
+                if not last_honest:
+                    shooter = current
+                break
+            current = next_idx
+
+        # 以 1/n 為基準的報酬降低變異，不影響遺憾值的期望
+        utility = (survival_share(n, shooter, guns[shooter] if shooter >= 0 else 1, traverser) - 1.0 / n)
+        weight = utility / sample_prob
+        tail = 1.0
+        for info, legal, sigma, k in reversed(path):
+            whole = sigma[k] * tail
+            row = regrets[info]
+            values = row.tolist()
+            for idx, a in enumerate(legal):
+                value = values[a] + (weight * (tail - whole) if idx == k else -weight * whole)
+                values[a] = value if value > 0.0 else 0.0
+            row[:] = values
+            tail = whole
+
+
+# 工作進程共用的陣列（由 _init_worker 設定）
+_SHARED: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(regrets_raw, strategy_raw):
+    """工作進程初始化：以共享記憶體建立陣列視圖"""
+    _SHARED["regrets"] = np.frombuffer(regrets_raw, dtype=np.float64).reshape(NUM_INFOSETS, NUM_ACTIONS)
+    _SHARED["strategy_sum"] = np.frombuffer(strategy_raw, dtype=np.float64).reshape(NUM_INFOSETS, NUM_ACTIONS)
+
+
+def _train_batch(entropy: int, batch_index: int, iterations: int, epsilon: float,
+                 player_counts: Tuple[int, ...], random_chambers: bool) -> int:
+    """在工作進程中執行一批迭代，直接寫入共享陣列"""
+    rng = SeedStream(entropy).child(batch_index).rng()
+    run_iterations(_SHARED["regrets"], _SHARED["strategy_sum"], rng, iterations,
+                   epsilon, player_counts, random_chambers)
+    return iterations
+
+
+class CFRSolver:
+    """MCCFR 離線求解器"""
+
+    def __init__(self, seed: Optional[int] = None, epsilon: float = 0.6,
+                 player_counts: Sequence[int] = (2, 3, 4), random_chambers: bool = False):
+        """
+        seed: 根亂數種子；第 i 批迭代使用其第 i 個子流，單進程時結果可重現
+        epsilon: 更新者的探索率
+        player_counts: 訓練時抽樣的存活人數
+        random_chambers: 是否隨機化開局槍管位置（本引擎每次發牌都會重置為 1，
+                         開啟後可訓練其他槍管位置的資訊集）
+        """
+        self.seed_stream = SeedStream(seed)
+        self.epsilon = epsilon
+        self.player_counts = tuple(player_counts)
+        self.random_chambers = random_chambers
+        self.regrets = np.zeros((NUM_INFOSETS, NUM_ACTIONS), dtype=np.float64)
+        self.strategy_sum = np.zeros((NUM_INFOSETS, NUM_ACTIONS), dtype=np.float64)
+        self.iterations = 0
+        self.batches = 0
+
+    def run(self, iterations: int, workers: int = 1, batch_size: int = 20000,
+            checkpoint_path: Optional[str] = None, checkpoint_every: float = 600.0,
+            progress: Optional[Callable[[int, float], None]] = None):
+        """
+        執行 iterations 次迭代
+        workers: 工作進程數，1 時在目前進程執行
+        checkpoint_path: 每 checkpoint_every 秒與結束時寫出檢查點
+        progress: 每完成一批呼叫 progress(已完成迭代數, 經過秒數)
+        """
+        start_time = time.perf_counter()
+        last_checkpoint = start_time
+        batches = [min(batch_size, iterations - i) for i in range(0, iterations, batch_size)]
+
+        if workers <= 1:
+            for size in batches:
+                rng = self.seed_stream.child(self.batches).rng()
+                run_iterations(self.regrets, self.strategy_sum, rng, size, self.epsilon,
+                               self.player_counts, self.random_chambers)
+                self.batches += 1
+                self.iterations += size
+                if progress:
+                    progress(self.iterations, time.perf_counter() - start_time)
+                if checkpoint_path and time.perf_counter() - last_checkpoint >= checkpoint_every:
+                    self.save_checkpoint(checkpoint_path)
+                    last_checkpoint = time.perf_counter()
+        else:
+            regrets_raw = RawArray("d", self.regrets.size)
+            strategy_raw = RawArray("d", self.strategy_sum.size)
+            self.regrets = self._share(regrets_raw, self.regrets)
+            self.strategy_sum = self._share(strategy_raw, self.strategy_sum)
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(regrets_raw, strategy_raw)) as executor:
+                futures = []
+                for size in batches:
+                    futures.append(executor.submit(
+                        _train_batch, self.seed_stream.entropy, self.batches, size,
+                        self.epsilon, self.player_counts, self.random_chambers))
+                    self.batches += 1
+                for future in as_completed(futures):
+                    self.iterations += future.result()
+                    if progress:
+                        progress(self.iterations, time.perf_counter() - start_time)
+                    if checkpoint_path and time.perf_counter() - last_checkpoint >= checkpoint_every:
+                        self.save_checkpoint(checkpoint_path)
+                        last_checkpoint = time.perf_counter()
+
+            # 結束後複製回一般陣列，釋放共享記憶體
+            self.regrets = self.regrets.copy()
+            self.strategy_sum = self.strategy_sum.copy()
+
+        if checkpoint_path:
+            self.save_checkpoint(checkpoint_path)
+
+    @staticmethod
+    def _share(raw, array: np.ndarray) -> np.ndarray:
+        """建立共享記憶體視圖並複製現有內容"""
+        shared = np.frombuffer(raw, dtype=np.float64).reshape(array.shape)
+        shared[:] = array
+        return shared
+
+    def average_policy(self) -> np.ndarray:
+        """平均策略（各資訊集正規化；從未到達的資訊集全為 0）"""
+        totals = self.strategy_sum.sum(axis=1, keepdims=True)
+        return np.divide(self.strategy_sum, totals, out=np.zeros_like(self.strategy_sum),
+                         where=totals > 0)
+
+    def save_policy(self, path: str = DEFAULT_POLICY_PATH):
+        """將平均策略量化為 uint8 寫出"""
+        policy = np.rint(self.average_policy() * 255).astype(np.uint8)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, policy=policy, shape=np.array(_table_shape()),
+                            iterations=np.array(self.iterations))
+
+    def save_checkpoint(self, path: str):
+        """寫出可續跑的檢查點（先寫暫存檔再改名，避免中斷時留下損壞的檔案）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, regrets=self.regrets, strategy_sum=self.strategy_sum,
+                     shape=np.array(_table_shape()), iterations=np.array(self.iterations),
+                     batches=np.array(self.batches), entropy=np.array(str(self.seed_stream.entropy)))
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path: str):
+        """載入檢查點並沿用其亂數種子，續跑時使用尚未用過的子流"""
+        with np.load(path) as data:
+            if tuple(data["shape"]) != _table_shape():
+                raise ValueError("檢查點的抽象化維度與目前版本不符")
+            self.regrets = data["regrets"].copy()
+            self.strategy_sum = data["strategy_sum"].copy()
+            self.iterations = int(data["iterations"])
+            self.batches = int(data["batches"])
+            self.seed_stream = SeedStream(int(str(data["entropy"])))
+
+
+def _table_shape() -> Tuple[int, ...]:
+    """策略表各維度大小，用於檢查檔案與程式版本是否一致"""
+    return (NUM_HANDS, LAST_SIZES, OPPONENT_COUNTS, NEXT_COUNT_BUCKETS,
+            LAST_COUNT_BUCKETS, CHAMBERS, NUM_ACTIONS)
+
+
+class PolicyTable:
+    """載入後的量化策略表，每次查詢為 O(1)"""
+
+    def __init__(self, policy: np.ndarray):
+        if policy.shape != (NUM_INFOSETS, NUM_ACTIONS):
+            raise ValueError("策略表大小與目前的抽象化不符")
+        self.policy = policy
+
+    def action_probs(self, info: int, legal: Tuple[int, ...]) -> List[float]:
+        """合法動作的機率；未訓練到的資訊集均勻分配"""
+        row = self.policy[info]
+        weights = [int(row[a]) for a in legal]
+        total = sum(weights)
+        if total == 0:
+            return [1.0 / len(legal)] * len(legal)
+        return [w / total for w in weights]
+
+    def choose(self, info: int, legal: Tuple[int, ...], rng) -> int:
+        """依策略抽出抽象動作"""
+        return legal[_sample(self.action_probs(info, legal), rng)]
+
+
+_POLICY_CACHE: Dict[str, PolicyTable] = {}
+
+
+def load_policy(path: Optional[str] = None) -> PolicyTable:
+    """載入策略表（同一路徑只讀取一次）"""
+    path = path or DEFAULT_POLICY_PATH
+    table = _POLICY_CACHE.get(path)
+    if table is None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"找不到策略表 {path}，請先執行 python main.py solve")
+        with np.load(path) as data:
+            if tuple(data["shape"]) != _table_shape():
+                raise ValueError("策略表的抽象化維度與目前版本不符，請重新求解")
+            table = PolicyTable(data["policy"])
+        _POLICY_CACHE[path] = table
+    return table
+
+
+def split_hand(hand: Sequence[str], target_card: str) -> Tuple[int, int]:
+    """手牌的 (誠實牌張數, 非誠實牌張數)"""
+    true_cards = sum(1 for card in hand if card == target_card or card == "J")
+    return true_cards, len(hand) - true_cards
+
+
+def game_state_infoset(game_state: Dict, player) -> Tuple[int, Tuple[int, ...]]:
+    """由遊戲狀態計算玩家的資訊集編號與合法抽象動作"""
+    players = game_state["players"]
+    target = game_state["target_card"]
+    true_cards, false_cards = split_hand(player.hand, target)
+
+    last_size, last_remaining = 0, 0
+    last_play = game_state.get("last_play")
+    if last_play is not None and last_play.get("player_id") is not None and last_play.get("cards"):
+        last_size = len(last_play["cards"])
+        last_remaining = len(players[last_play["player_id"]].hand)
+
+    next_idx = (player.id + 1) % len(players)
+    while not players[next_idx].alive and next_idx != player.id:
+        next_idx = (next_idx + 1) % len(players)
+    opponents = sum(1 for p in players if p.alive and p.id != player.id)
+
+    info = infoset_id(true_cards, false_cards, last_size, opponents,
+                      len(players[next_idx].hand), last_remaining, player.gun_pos)
+    return info, legal_actions(true_cards, false_cards, last_size > 0)
+
+
+def action_to_cards(hand: Sequence[str], target_card: str, action: int) -> List[str]:
+    """
+    將抽象出牌轉為實際的牌：誠實牌先出目標牌再出 Joker，
+    謊報牌從張數最多的非目標牌開始出
+    """
+    t, f = PLAY_ACTIONS[action]
+    targets = [card for card in hand if card == target_card]
+    jokers = [card for card in hand if card == "J"]
+    cards = (targets + jokers)[:t]
+
+    others: Dict[str, int] = {}
+    for card in hand:
+        if card != target_card and card != "J":
+            others[card] = others.get(card, 0) + 1
+    for card in sorted(others, key=lambda c: -others[c]):
+        take = min(f - (len(cards) - t), others[card])
+        cards.extend([card] * take)
+    return cards
@@ -1,42 +1,83 @@
 # liars_bar/ai/decision.py
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from models.player import Player
-from .strategy import RandomStrategy, RuleBasedStrategy, LearningStrategy
-from .llm_manager import LLMManager, AIResponse
+import random
+from .strategy import RandomStrategy, RuleBasedStrategy, LearningStrategy, ExpectedValueStrategy, ISMCTSStrategy, SolverStrategy, EndgameStrategy
+
+
+def _find_player_stats(game_state: Dict, player_id: int) -> Optional[Dict]:
+    """取得某位玩家的統計：GameStateView 以玩家 ID 直接查詢，一般字典才逐一比對"""
+    lookup = getattr(game_state, "player_stats", None)
+    if lookup is not None:
+        return lookup(player_id)
+    for p in game_state.get("players_stats", ()):
+        if p["id"] == player_id:
+            return p
+    return None
 
 
 class AIDecisionMaker:
     """AI 決策器，可以使用不同的策略"""
 
-    def __init__(self, strategy_type: str = "rule"):
+    def __init__(self, strategy_type: str = "rule", rng: Optional[random.Random] = None,
+                 model_path: Optional[str] = None, save_models: bool = True):
         """
         初始化 AI 決策器
-        strategy_type: 策略類型，可選值: "random", "rule", "llm", "learning"
+        strategy_type: 策略類型，可選值: "random", "rule", "llm", "learning", "ev", "mcts", "solver", "endgame"
+        rng: 亂數產生器，None 時建立新的獨立產生器
+        model_path: 學習型策略的對手模型檔案（見 LearningStrategy），其他策略忽略
+        save_models: 學習型策略是否在每局結束後寫回 model_path
         """
         self.strategy_type = strategy_type
+        self.rng = rng if rng is not None else random.Random()
 
         # 選擇策略
         if strategy_type == "random":
-            self.strategy = RandomStrategy()
+            self.strategy = RandomStrategy(self.rng)
         elif strategy_type == "learning":
-            self.strategy = LearningStrategy()
+            self.strategy = LearningStrategy(self.rng, model_path=model_path,
+                                             save_models=save_models)
+        elif strategy_type == "ev":
+            self.strategy = ExpectedValueStrategy(self.rng)
+        elif strategy_type == "mcts":
+            self.strategy = ISMCTSStrategy(self.rng)
+        elif strategy_type == "solver":
+            self.strategy = SolverStrategy(self.rng)
+        elif strategy_type == "endgame":
+            self.strategy = EndgameStrategy(self.rng)
         elif strategy_type == "llm":
+            # 延遲導入，非 LLM 策略（如無頭模擬）不需要載入 langchain
+            from .llm_manager import LLMManager
             self.llm_manager = LLMManager()
         else:  # 默認使用規則策略
-            self.strategy = RuleBasedStrategy()
+            self.strategy = RuleBasedStrategy(self.rng)
+
+    def set_rng(self, rng: random.Random):
+        """替換亂數產生器（例如每局使用獨立的子流）"""
+        self.rng = rng
+        if hasattr(self, "strategy"):
+            self.strategy.rng = rng
+
+    def reset(self):
+        """捨棄策略跨局累積的資料（例如學習型策略的對手模型）"""
+        if hasattr(self, "strategy"):
+            self.strategy.reset()
+
+    def set_opponents(self, identities: Sequence[str]):
+        """指定每個座位的穩定身分（例如策略名稱或 "human"），學習型策略以此跨局辨識對手"""
+        if hasattr(self, "strategy"):
+            self.strategy.set_opponents(identities)
+
+    def observe(self, game_state: Dict):
+        """讓策略觀察不需要決策的遊戲狀態（例如一局結束時）"""
+        if hasattr(self, "strategy"):
+            self.strategy.observe(game_state)
 
     def make_decision(self, game_state: Dict, player_id: int) -> Tuple[str, List[str]]:
         """
         根據遊戲狀態做出決策
         返回: (action, cards)，其中 action 是要執行的動作，cards 是要出的牌（僅當 action 為 "play" 時有值）
         """
-        # 嘗試從 players_stats 中獲取基本玩家信息
-        player_stats = None
-        for p in game_state["players_stats"]:
-            if p["id"] == player_id:
-                player_stats = p
-                break
-
         # 嘗試獲取完整的玩家對象
         player_obj = None
         if "players" in game_state:
@@ -72,6 +113,7 @@ class AIDecisionMaker:
                 from models.player import Player, PlayerType
                 player_obj = Player(id=player_id, player_type=PlayerType.AI)
                 # 如果 player_stats 存在，設置基本屬性
+                player_stats = _find_player_stats(game_state, player_id)
                 if player_stats is not None:
                     player_obj.alive = player_stats["alive"]
                     player_obj.shots_fired = player_stats["shots_fired"]
@@ -88,8 +130,6 @@ class AIDecisionMaker:
 
     def get_behavior(self, action_type: str, num_cards: int = 0) -> str:
         """生成 AI 行為描述"""
-        import random
-
         behaviors = {
             "play": [
                 "慢慢地放下牌，眼神堅定",
@@ -117,4 +157,4 @@ class AIDecisionMaker:
             ]
         }
 
-        return random.choice(behaviors.get(action_type, ["面無表情"]))
+        return self.rng.choice(behaviors.get(action_type, ["面無表情"]))
@@ -0,0 +1,311 @@
+# liars_bar/ai/endgame.py
+"""
+兩人殘局資料庫
+
+只剩兩名玩家時，整副 20 張牌平分給兩人，一輪之內的狀態只有：
+雙方的相對手牌 (誠實牌張數, 非誠實牌張數)、上家出牌是否誠實、雙方槍管位置。
+資料庫以「輪到行動的玩家」為視角，記錄在雙方都看得到所有牌（雙明手）時
+行動者最終贏得整局的機率，並以 max 遞迴精確求解：
+
+- 開槍者以 ev.death_table 的機率中彈，對手獲勝
+- 倖存則重新發牌：質疑後由開槍者先手，出完手牌後由另一人先手；
+  新一輪先手者的勝率 S 本身也依賴資料庫，以二分法求出 S = F(S) 的固定點
+
+一輪之內沒有重新發牌，槍管位置不會改變，因此 (行動者槍管, 對手槍管) 與其對調
+構成互相獨立的子表，可分給多個進程平行建立，直接寫入同一個記憶體映射檔。
+
+實際對局看不到對手手牌與上家實際出的牌，使用時以抽樣決定化後取各動作的平均值
+（與橋牌雙明手資料庫的用法相同）。資料庫在第一次查詢時才以唯讀記憶體映射載入。
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models.card import GUN_CHAMBERS
+from .cfr import (CHALLENGE_ACTION, NUM_HANDS, PLAY_ACTIONS, TRUE_CARDS,
+                  action_to_cards, hand_index, relative_hands, split_hand)
+from .ev import death_table
+
+DEFAULT_TABLEBASE_PATH = os.path.join("config", "endgame_tablebase.npy")
+DECK_SIZE = 20
+HAND_SIZE = DECK_SIZE // 2
+FALSE_CARDS = DECK_SIZE - TRUE_CARDS
+
+# 上家出牌：沒有、誠實、說謊
+LAST_NONE = 0
+LAST_HONEST = 1
+LAST_LIE = 2
+LAST_STATES = 3
+
+TABLE_SHAPE = (NUM_HANDS, NUM_HANDS, LAST_STATES, GUN_CHAMBERS, GUN_CHAMBERS)
+
+Hand = Tuple[int, int]
+
+# 槍管位置 -> 開一槍中彈的機率
+_DEATH = death_table()
+
+
+def _hand_pairs() -> List[Tuple[Hand, Hand]]:
+    """兩人局中可能同時出現的手牌組合，依總張數由少到多排序"""
+    hands = relative_hands()
+    pairs = []
+    for mover in hands:
+        for other in hands:
+            if (sum(mover) > 0 and sum(other) > 0
+                    and mover[0] + other[0] <= TRUE_CARDS
+                    and mover[1] + other[1] <= FALSE_CARDS
+                    and sum(mover) <= HAND_SIZE and sum(other) <= HAND_SIZE):
+                pairs.append((mover, other))
+    pairs.sort(key=lambda pair: sum(pair[0]) + sum(pair[1]))
+    return pairs
+
+
+def _action_value(values: Dict, mover: Hand, other: Hand, last: int, gm: int, go: int,
+                  action: int, start_value: float) -> float:
+    """行動者執行抽象動作後的勝率；values 以 (行動者, 對手, 上家, 行動者槍管, 對手槍管) 為鍵"""
+    if action == CHALLENGE_ACTION:
+        if last == LAST_HONEST:
+            # 質疑失敗：自己開槍，倖存則自己先手
+            return (1.0 - _DEATH[gm]) * start_value
+        # 質疑成功：對手開槍，倖存則對手先手
+        return _DEATH[go] + (1.0 - _DEATH[go]) * (1.0 - start_value)
+
+    t, f = PLAY_ACTIONS[action]
+    remaining = (mover[0] - t, mover[1] - f)
+    if remaining == (0, 0):
+        # 出完手牌由系統檢查，之後由對手先手
+        if f:
+            return (1.0 - _DEATH[gm]) * (1.0 - start_value)
+        return 1.0 - start_value
+    return 1.0 - values[(other, remaining, LAST_LIE if f else LAST_HONEST, go, gm)]
+
+
+def _legal(mover: Hand, last: int) -> List[int]:
+    """行動者的合法抽象動作"""
+    actions = [i for i, (t, f) in enumerate(PLAY_ACTIONS) if t <= mover[0] and f <= mover[1]]
+    if last != LAST_NONE:
+        actions.append(CHALLENGE_ACTION)
+    return actions
+
+
+def _solve_guns(pairs: Sequence[Tuple[Hand, Hand]], gun_pairs: Sequence[Tuple[int, int]],
+                start_value: float) -> Dict:
+    """在給定新一輪先手勝率下，求解一組互相參照的槍管位置子表"""
+    values: Dict = {}
+    for mover, other in pairs:
+        for last in range(LAST_STATES):
+            for gm, go in gun_pairs:
+                values[(mover, other, last, gm, go)] = max(
+                    _action_value(values, mover, other, last, gm, go, action, start_value)
+                    for action in _legal(mover, last))
+    return values
+
+
+def _deal_probs() -> List[Tuple[float, Hand, Hand]]:
+    """新一輪發牌：(機率, 先手手牌, 後手手牌)"""
+    deals = []
+    for t in range(max(0, HAND_SIZE - FALSE_CARDS), min(TRUE_CARDS, HAND_SIZE) + 1):
+        p = comb(TRUE_CARDS, t) * comb(FALSE_CARDS, HAND_SIZE - t) / comb(DECK_SIZE, HAND_SIZE)
+        deals.append((p, (t, HAND_SIZE - t), (TRUE_CARDS - t, HAND_SIZE - TRUE_CARDS + t)))
+    return deals
+
+
+def solve_start_value(tolerance: float = 1e-9) -> float:
+    """
+    以二分法求新一輪先手者的勝率 S（槍管位置皆為 1）
+    F(S) 為以 S 作為續局價值時，對發牌取期望的先手勝率；F(0) >= 0、F(1) <= 1，固定點必存在
+    """
+    pairs = _hand_pairs()
+    deals = _deal_probs()
+
+    def start_value_given(s: float) -> float:
+        values = _solve_guns(pairs, [(1, 1)], s)
+        return sum(p * values[(first, second, LAST_NONE, 1, 1)] for p, first, second in deals)
+
+    low, high = 0.0, 1.0
+    while high - low > tolerance:
+        mid = (low + high) / 2
+        if start_value_given(mid) > mid:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def _build_unit(path: str, gun_pairs: Tuple[Tuple[int, int], ...], start_value: float) -> int:
+    """工作進程：求解一組槍管子表並寫入記憶體映射檔"""
+    table = np.lib.format.open_memmap(path, mode="r+")
+    values = _solve_guns(_hand_pairs(), gun_pairs, start_value)
+    for (mover, other, last, gm, go), value in values.items():
+        table[hand_index(*mover), hand_index(*other), last, gm - 1, go - 1] = value
+    table.flush()
+    del table
+    return len(values)
+
+
+def build_tablebase(path: str = DEFAULT_TABLEBASE_PATH, workers: Optional[int] = None) -> float:
+    """
+    建立殘局資料庫並寫成 .npy 記憶體映射檔，返回新一輪先手勝率 S
+    不可能出現的手牌組合以 NaN 表示
+    """
+    start_value = solve_start_value()
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp.npy"
+    table = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=TABLE_SHAPE)
+    table[:] = np.nan
+    table.flush()
+    del table
+
+    # (a, b) 與 (b, a) 互相參照，合成一個工作單位
+    units = [tuple({(a, b), (b, a)}) for a in range(1, GUN_CHAMBERS + 1)
+             for b in range(a, GUN_CHAMBERS + 1)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for unit in units:
+            _build_unit(tmp_path, unit, start_value)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_build_unit, [tmp_path] * len(units), units,
+                              [start_value] * len(units)))
+
+    os.replace(tmp_path, path)
+    return start_value
+
+
+class EndgameTablebase:
+    """殘局資料庫查詢介面，第一次查詢時才以唯讀記憶體映射載入"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_TABLEBASE_PATH
+        self._table: Optional[np.ndarray] = None
+        self._start_value: Optional[float] = None
+
+    @property
+    def table(self) -> np.ndarray:
+        if self._table is None:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(
+                    f"找不到殘局資料庫 {self.path}，請先執行 python main.py endgame")
+            table = np.load(self.path, mmap_mode="r")
+            if table.shape != TABLE_SHAPE:
+                raise ValueError("殘局資料庫的維度與目前版本不符，請重新建立")
+            self._table = table
+        return self._table
+
+    @property
+    def start_value(self) -> float:
+        """新一輪先手者的勝率 S（由資料庫中的開局狀態重新計算）"""
+        if self._start_value is None:
+            self._start_value = sum(p * self.value(first, second, LAST_NONE)
+                                    for p, first, second in _deal_probs())
+        return self._start_value
+
+    def available(self) -> bool:
+        """資料庫檔案是否存在"""
+        return self._table is not None or os.path.exists(self.path)
+
+    def value(self, mover: Hand, other: Hand, last: int, mover_gun: int = 1,
+              other_gun: int = 1) -> float:
+        """行動者的勝率（雙明手）"""
+        return float(self.table[hand_index(*mover), hand_index(*other), last,
+                                mover_gun - 1, other_gun - 1])
+
+    def action_values(self, mover: Hand, other: Hand, last: int, mover_gun: int = 1,
+                      other_gun: int = 1) -> Dict[int, float]:
+        """每個合法抽象動作的勝率"""
+        start_value = self.start_value
+        values = {}
+        for action in _legal(mover, last):
+            values[action] = _action_value(_TableView(self), mover, other, last, mover_gun,
+                                           other_gun, action, start_value)
+        return values
+
+    def best_action(self, mover: Hand, other: Hand, last: int, mover_gun: int = 1,
+                    other_gun: int = 1) -> int:
+        """勝率最高的抽象動作"""
+        values = self.action_values(mover, other, last, mover_gun, other_gun)
+        return max(values, key=values.get)
+
+
+class _TableView:
+    """讓 _action_value 以字典鍵的形式讀取記憶體映射表"""
+    __slots__ = ("tablebase",)
+
+    def __init__(self, tablebase: EndgameTablebase):
+        self.tablebase = tablebase
+
+    def __getitem__(self, key) -> float:
+        mover, other, last, gm, go = key
+        return self.tablebase.value(mover, other, last, gm, go)
+
+
+_TABLEBASES: Dict[str, EndgameTablebase] = {}
+
+
+def get_tablebase(path: Optional[str] = None) -> EndgameTablebase:
+    """取得共用的殘局資料庫（尚未載入檔案）"""
+    path = path or DEFAULT_TABLEBASE_PATH
+    tablebase = _TABLEBASES.get(path)
+    if tablebase is None:
+        tablebase = EndgameTablebase(path)
+        _TABLEBASES[path] = tablebase
+    return tablebase
+
+
+def endgame_decision(game_state: Dict, player, rng: random.Random, samples: int = 32,
+                     tablebase: Optional[EndgameTablebase] = None, bluff_prior: float = 0.0,
+                     max_resamples: int = 32) -> Optional[Dict]:
+    """
+    只剩兩名玩家時以殘局資料庫決策，否則返回 None
+    對手手牌與上家實際出牌以看不到的牌抽樣 samples 次，取各動作的平均勝率；
+    資料庫假設對手只在沒有誠實牌時說謊，因此預設只接受這類說謊樣本；
+    bluff_prior > 0 時，對手手上有誠實牌卻說謊的樣本以該機率接受（同 ai.mcts）
+    """
+    players = game_state["players"]
+    alive = [p for p in players if p.alive]
+    if len(alive) != 2 or not player.hand:
+        return None
+    tablebase = tablebase or get_tablebase()
+    if not tablebase.available():
+        return None
+
+    opponent = alive[0] if alive[0].id != player.id else alive[1]
+    target = game_state["target_card"]
+    mover = split_hand(player.hand, target)
+
+    last_count = 0
+    last_play = game_state.get("last_play")
+    if last_play is not None and last_play.get("player_id") == opponent.id and last_play.get("cards"):
+        last_count = len(last_play["cards"])
+
+    # 看不到的牌（對手手牌、上家出牌與更早出過的牌）中的誠實牌標記為 1
+    unseen_true = TRUE_CARDS - mover[0]
+    unseen = [1] * unseen_true + [0] * (DECK_SIZE - sum(mover) - unseen_true)
+    totals: Dict[int, float] = {}
+    opponent_size = len(opponent.hand)
+    for _ in range(samples):
+        for _ in range(max_resamples):
+            rng.shuffle(unseen)
+            opponent_true = sum(unseen[:opponent_size])
+            if not last_count:
+                last = LAST_NONE
+                break
+            played_true = sum(unseen[opponent_size:opponent_size + last_count])
+            if played_true == last_count:
+                last = LAST_HONEST
+                break
+            last = LAST_LIE
+            if opponent_true + played_true == 0 or rng.random() < bluff_prior:
+                break
+        other = (opponent_true, opponent_size - opponent_true)
+        for action, value in tablebase.action_values(mover, other, last, player.gun_pos,
+                                                     opponent.gun_pos).items():
+            totals[action] = totals.get(action, 0.0) + value
+
+    action = max(totals, key=totals.get)
+    if action == CHALLENGE_ACTION:
+        return {"action": "challenge"}
+    return {"action": "play", "cards": action_to_cards(player.hand, target, action)}
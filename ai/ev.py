@@ -0,0 +1,171 @@
+# liars_bar/ai/ev.py
+"""
+質疑與出牌的期望值 (EV) 計算
+
+以「自己出局 = -1、淘汰一名對手 = elimination_value」為單位評估每個決策：
+- 上家誠實的機率：假設上家出的 k 張牌是我們看不到的牌中均勻抽出的 k 張，
+  以超幾何分布 C(G, k) / C(N, k) 計算（N 為未見牌數，G 為其中目標牌與 Joker 數）
+- 開槍中彈機率：子彈在裝填後均勻分布於尚未擊發的彈巢，槍管在第 g 格時為 1 / (7 - g)
+
+超幾何表與中彈機率表依牌組組成建立一次並快取，之後每次決策都只是查表。
+"""
+from functools import lru_cache
+from math import comb
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.card import DECK_COMPOSITION, GUN_CHAMBERS
+from models.packed_state import card_count, hand_size
+from utils.move_table import is_honest_play, legal_plays, play_cards
+
+MAX_PLAY_CARDS = 3
+
+
+@lru_cache(maxsize=None)
+def hypergeometric_table(deck_size: int) -> Tuple[Tuple[Tuple[float, ...], ...], ...]:
+    """table[N][G][k] = 從 N 張（其中 G 張誠實牌）抽 k 張全部為誠實牌的機率"""
+    return tuple(
+        tuple(
+            tuple(comb(good, k) / comb(total, k) if k <= total else 0.0
+                  for k in range(MAX_PLAY_CARDS + 1))
+            for good in range(total + 1))
+        for total in range(deck_size + 1))
+
+
+@lru_cache(maxsize=None)
+def death_table(chambers: int = GUN_CHAMBERS) -> Tuple[float, ...]:
+    """table[g] = 槍管在第 g 格（前 g-1 格皆已擊發且倖存）時中彈的機率"""
+    return (0.0,) + tuple(1.0 / (chambers - g + 1) for g in range(1, chambers + 1))
+
+
+def survival_share(num_alive: int, shooter: int, gun_pos: int, player: int) -> float:
+    """
+    一輪結束時 player 的期望存活份額（存活者平分 1），供 CFR、ISMCTS 等以一輪為範圍的搜尋使用
+    每次開槍之後都會重新發牌，因此不實際抽子彈，而是以 shooter 在槍管位置 gun_pos 的中彈機率
+    計算期望值；shooter 為負數表示這一輪沒有人開槍
+    """
+    if shooter < 0:
+        return 1.0 / num_alive
+    death = death_table()[gun_pos]
+    if player == shooter:
+        return (1.0 - death) / num_alive
+    return (1.0 - death) / num_alive + death / (num_alive - 1)
+
+
+class ExpectedValueEngine:
+    """以快取的超幾何與輪盤表計算質疑及出牌期望值"""
+
+    def __init__(self, deck: Optional[Dict[str, int]] = None, elimination_value: float = 0.5,
+                 challenge_probs: Sequence[float] = (0.3, 0.5, 0.7)):
+        """
+        deck: 牌組組成，預設為標準牌組
+        elimination_value: 淘汰一名對手的價值（自己出局為 -1）
+        challenge_probs: 下家在我們出 1、2、3 張牌後質疑的機率
+        """
+        self.deck = dict(deck or DECK_COMPOSITION)
+        self.deck_size = sum(self.deck.values())
+        self.elimination_value = elimination_value
+        self.challenge_probs = (0.0,) + tuple(challenge_probs)
+        self._hypergeometric = hypergeometric_table(self.deck_size)
+        self._death = death_table()
+        self._honest_cache: Dict[Tuple[int, str, int], float] = {}
+        self._best_play_cache: Dict[Tuple[int, str, int, int], Tuple[int, float]] = {}
+
+    def death_prob(self, gun_pos: int) -> float:
+        """開一槍中彈的機率"""
+        return self._death[gun_pos]
+
+    def p_honest(self, known_cards: int, target_card: str, num_cards: int) -> float:
+        """
+        上家出的 num_cards 張牌全部為目標牌或 Joker 的機率
+        known_cards: 已知不在上家手中的牌（自己的手牌等）的整數編碼
+        """
+        key = (known_cards, target_card, num_cards)
+        p = self._honest_cache.get(key)
+        if p is None:
+            unseen = self.deck_size - hand_size(known_cards)
+            good = (self.deck[target_card] + self.deck["J"]
+                    - card_count(known_cards, target_card) - card_count(known_cards, "J"))
+            p = self._hypergeometric[unseen][good][num_cards]
+            self._honest_cache[key] = p
+        return p
+
+    def challenge_ev(self, known_cards: int, target_card: str, num_cards: int,
+                     my_gun_pos: int, their_gun_pos: int, p_honest: Optional[float] = None) -> float:
+        """
+        質疑上家的期望值：上家誠實則自己開槍，否則上家開槍
+        p_honest: 覆寫上家誠實的機率，None 時以超幾何分布計算
+        """
+        p = self.p_honest(known_cards, target_card, num_cards) if p_honest is None else p_honest
+        return (-p * self._death[my_gun_pos]
+                + (1.0 - p) * self._death[their_gun_pos] * self.elimination_value)
+
+    def play_ev(self, hand: int, play: int, target_card: str, my_gun_pos: int,
+                next_gun_pos: int, challenge_probs: Optional[Sequence[float]] = None) -> float:
+        """
+        出牌的期望值：下家依出牌張數以 challenge_probs 的機率質疑；
+        出完手牌時系統必定檢查
+        challenge_probs: 覆寫下家出 1、2、3 張牌後的質疑機率（例如對手模型的估計）
+        """
+        probs = self.challenge_probs if challenge_probs is None else (0.0, *challenge_probs)
+        num_cards = hand_size(play)
+        empties_hand = num_cards == hand_size(hand)
+        if is_honest_play(play, target_card):
+            # 誠實出完手牌時系統檢查不會開槍；否則下家質疑會讓下家開槍
+            if empties_hand:
+                return 0.0
+            return probs[num_cards] * self._death[next_gun_pos] * self.elimination_value
+        checked = 1.0 if empties_hand else probs[num_cards]
+        return -checked * self._death[my_gun_pos]
+
+    def best_play(self, hand: int, target_card: str, my_gun_pos: int, next_gun_pos: int,
+                  challenge_probs: Optional[Sequence[float]] = None) -> Tuple[int, float]:
+        """
+        所有合法出牌中期望值最高者，同分時選張數較少的
+        使用預設質疑機率時結果依輸入快取；覆寫 challenge_probs 時每次重新計算
+        """
+        key = (hand, target_card, my_gun_pos, next_gun_pos)
+        if challenge_probs is None:
+            cached = self._best_play_cache.get(key)
+            if cached is not None:
+                return cached
+
+        best, best_ev = 0, float("-inf")
+        for play in legal_plays(hand):
+            ev = self.play_ev(hand, play, target_card, my_gun_pos, next_gun_pos, challenge_probs)
+            if ev > best_ev:
+                best, best_ev = play, ev
+        if challenge_probs is None:
+            self._best_play_cache[key] = (best, best_ev)
+        return best, best_ev
+
+    def evaluate(self, hand: int, target_card: str, my_gun_pos: int, next_gun_pos: int,
+                 last_play_count: int = 0, last_gun_pos: int = 1,
+                 known_cards: Optional[int] = None) -> Dict:
+        """
+        評估當前回合的所有選項
+        返回 {"play": (出牌編碼, EV), "challenge": EV 或 None}
+        """
+        result = {"play": self.best_play(hand, target_card, my_gun_pos, next_gun_pos),
+                  "challenge": None}
+        if last_play_count:
+            result["challenge"] = self.challenge_ev(
+                hand if known_cards is None else known_cards,
+                target_card, last_play_count, my_gun_pos, last_gun_pos)
+        return result
+
+
+@lru_cache(maxsize=None)
+def _shared_engine(deck_items: Tuple[Tuple[str, int], ...], elimination_value: float,
+                   challenge_probs: Tuple[float, ...]) -> ExpectedValueEngine:
+    return ExpectedValueEngine(dict(deck_items), elimination_value, challenge_probs)
+
+
+def get_engine(deck: Optional[Dict[str, int]] = None, elimination_value: float = 0.5,
+               challenge_probs: Sequence[float] = (0.3, 0.5, 0.7)) -> ExpectedValueEngine:
+    """依牌組設定取得共用（已快取）的 EV 引擎"""
+    deck_items = tuple(sorted((deck or DECK_COMPOSITION).items()))
+    return _shared_engine(deck_items, elimination_value, tuple(challenge_probs))
+
+
+def play_to_cards(play: int) -> List[str]:
+    """出牌編碼轉為牌列表"""
+    return list(play_cards(play))
@@ -0,0 +1,347 @@
+# liars_bar/ai/mcts.py
+"""
+資訊集蒙地卡羅樹搜尋 (ISMCTS)
+
+每次迭代先依公開資訊把看不到的部分「決定化」：
+對手手牌與上家實際出牌從我們看不到的牌中隨機抽出，張數與公開資訊一致，
+上家出牌再依對手模型篩選（有誠實牌可出時較少說謊）。
+搜尋樹只在自己的決策處分支，節點即自己的資訊集（自己的出牌歷史加上
+每次輪到自己時觀察到的上家出牌張數），以 UCB 選擇；對手則以看不到實際牌面的
+對手模型抽樣行動，避免對手在樹中「看穿」我們的手牌。
+展開一個節點後以簡單規則策略快速推演，最後回傳被走訪最多次的動作。
+
+搜尋範圍是目前這一輪：推演到有人開槍（或誠實出完手牌）為止，
+葉節點以 ev.survival_share 的期望存活份額為報酬，省去輪盤本身的變異。
+
+推演使用與 core/game.py 相同規則的精簡狀態：手牌為整數編碼、
+出牌來自預先計算的合法出牌表，狀態緩衝區在迭代之間重複使用，
+每次迭代唯一的配置只有新展開的樹節點，因此可在固定時間預算內隨時停止。
+"""
+import math
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.card import CARD_KINDS, DECK_COMPOSITION, TARGET_CARDS
+from models.packed_state import hand_size, pack_counts, pack_hand
+from utils.move_table import honest_plays, is_honest_play, legal_plays
+from .ev import survival_share
+
+# 出牌編碼一定大於 0，以 0 代表質疑
+CHALLENGE = 0
+NO_SHOOTER = -1
+
+# 一副牌中每張牌的整數編碼，加總即為手牌編碼
+_DECK_UNITS = tuple(pack_hand([card]) for card in CARD_KINDS
+                    for _ in range(DECK_COMPOSITION[card]))
+
+# 出牌張數與誠實判斷的查詢表（以出牌編碼為鍵）
+_PLAY_SIZE: Dict[int, int] = {}
+_HONEST: Dict[str, frozenset] = {}
+
+
+def _build_tables():
+    """以包含所有 1~3 張出牌的手牌列舉出牌，建立張數與誠實查詢表"""
+    all_plays = legal_plays(pack_counts([min(3, DECK_COMPOSITION[card]) for card in CARD_KINDS]))
+    for play in all_plays:
+        _PLAY_SIZE[play] = hand_size(play)
+    for target in TARGET_CARDS:
+        _HONEST[target] = frozenset(play for play in all_plays if is_honest_play(play, target))
+
+
+_build_tables()
+
+# 手牌 -> 合法出牌加上質疑，首次查詢後快取
+_ACTIONS_WITH_CHALLENGE: Dict[int, Tuple[int, ...]] = {}
+
+
+class _SimState:
+    """推演用的精簡單輪狀態，規則與 core.game.Game 相同，到這一輪有人開槍時結束"""
+    __slots__ = ("num_players", "hands", "sizes", "alive", "guns", "target", "current",
+                 "last_player", "last_play", "num_alive", "round_over", "shooter")
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.hands = [0] * num_players
+        self.sizes = [0] * num_players
+        self.alive = [True] * num_players
+        self.guns = [1] * num_players
+        self.target = TARGET_CARDS[0]
+        self.current = 0
+        self.last_player = -1
+        self.last_play = 0
+        self.num_alive = num_players
+        self.round_over = False
+        self.shooter = NO_SHOOTER
+
+    def copy_from(self, other: "_SimState"):
+        """就地複製另一個狀態（不配置新列表）"""
+        self.hands[:] = other.hands
+        self.sizes[:] = other.sizes
+        self.alive[:] = other.alive
+        self.guns[:] = other.guns
+        self.target = other.target
+        self.current = other.current
+        self.last_player = other.last_player
+        self.last_play = other.last_play
+        self.num_alive = other.num_alive
+        self.round_over = other.round_over
+        self.shooter = other.shooter
+
+    def legal_actions(self) -> Tuple[int, ...]:
+        """當前玩家的合法動作（出牌編碼，可質疑時另含 CHALLENGE）"""
+        hand = self.hands[self.current]
+        if self.last_player < 0:
+            return legal_plays(hand)
+        actions = _ACTIONS_WITH_CHALLENGE.get(hand)
+        if actions is None:
+            actions = legal_plays(hand) + (CHALLENGE,)
+            _ACTIONS_WITH_CHALLENGE[hand] = actions
+        return actions
+
+    def apply(self, action: int):
+        """執行動作（對應 Game.next 的出牌與質疑分支）"""
+        current = self.current
+        if action == CHALLENGE:
+            cheating = self.last_play not in _HONEST[self.target]
+            self.shooter = self.last_player if cheating else current
+            self.round_over = True
+            return
+
+        self.hands[current] -= action
+        self.sizes[current] -= _PLAY_SIZE[action]
+        self.last_player = current
+        self.last_play = action
+        if self.sizes[current] == 0:
+            # 出完手牌時系統自動質疑，無論結果都會重新發牌
+            if action not in _HONEST[self.target]:
+                self.shooter = current
+            self.round_over = True
+            return
+        idx = (current + 1) % self.num_players
+        while not self.alive[idx]:
+            idx = (idx + 1) % self.num_players
+        self.current = idx
+
+    def share(self, player: int) -> float:
+        """本輪結束時 player 的期望存活份額（見 ev.survival_share）"""
+        shooter = self.shooter
+        gun_pos = self.guns[shooter] if shooter != NO_SHOOTER else 1
+        return survival_share(self.num_alive, shooter, gun_pos, player)
+
+
+class _Node:
+    """
+    搜尋樹節點，只在自己的決策處分支：
+    決策節點的 children 以動作為鍵；動作節點的 children 以下次輪到自己時
+    觀察到的上家出牌張數為鍵，指向下一個決策節點
+    """
+    __slots__ = ("children", "visits", "reward")
+
+    def __init__(self):
+        self.children: Dict[int, "_Node"] = {}
+        self.visits = 0
+        self.reward = 0.0
+
+
+class InformationSetSearch:
+    """有時間預算、可隨時停止的資訊集蒙地卡羅樹搜尋"""
+
+    def __init__(self, time_budget: float = 0.05, max_iterations: Optional[int] = None,
+                 exploration: float = 0.1, challenge_probs: Sequence[float] = (0.3, 0.5, 0.7),
+                 bluff_prior: float = 0.2, max_resamples: int = 8):
+        """
+        time_budget: 每次決策的時間預算（秒）
+        max_iterations: 迭代次數上限；指定時可得到與機器速度無關、可重現的結果
+        exploration: UCB 探索係數（報酬為存活份額，差距通常只有幾個百分點）
+        challenge_probs: 對手模型在上家出 1、2、3 張牌後質疑的機率
+        bluff_prior: 對手手上有誠實出牌時仍然說謊的先驗機率
+        max_resamples: 決定化時最多重抽幾次以符合對手模型
+        """
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.exploration = exploration
+        self.challenge_probs = (0.0,) + tuple(challenge_probs)
+        self.bluff_prior = bluff_prior
+        self.max_resamples = max_resamples
+        self.last_iterations = 0
+        # 依玩家數量重複使用的狀態緩衝區
+        self._buffers: Dict[int, Tuple[_SimState, _SimState]] = {}
+
+    def search(self, game_state: Dict, player, rng: random.Random) -> int:
+        """
+        搜尋最佳動作，返回出牌編碼或 CHALLENGE
+        只使用公開資訊與自己的手牌：對手手牌與上家實際出牌都以抽樣決定
+        """
+        deadline = time.perf_counter() + self.time_budget
+        root_state, state, pool, last_count = self._information_set(game_state, player)
+        me = player.id
+
+        root_actions = root_state.legal_actions()
+        if len(root_actions) == 1:
+            self.last_iterations = 0
+            return root_actions[0]
+
+        root = _Node()
+        log = math.log
+        sqrt = math.sqrt
+        exploration = self.exploration
+        max_iterations = self.max_iterations
+        iterations = 0
+        path: List[_Node] = []
+
+        while True:
+            if max_iterations is not None:
+                if iterations >= max_iterations:
+                    break
+            elif iterations and time.perf_counter() >= deadline:
+                break
+            iterations += 1
+
+            self._determinize(root_state, state, pool, last_count, me, rng)
+            node = root
+            del path[:]
+
+            # 選擇與展開：自己的決策以 UCB 選擇，對手以對手模型抽樣
+            while not state.round_over:
+                children = node.children
+                untried, num_untried = None, 0
+                best, best_action, best_score = None, None, -1.0
+                log_visits = log(node.visits) if node.visits else 0.0
+                for action in state.legal_actions():
+                    child = children.get(action)
+                    if child is None:
+                        num_untried += 1
+                        if rng.randrange(num_untried) == 0:
+                            untried = action
+                    elif not num_untried:
+                        score = (child.reward / child.visits
+                                 + exploration * sqrt(log_visits / child.visits))
+                        if score > best_score:
+                            best, best_action, best_score = child, action, score
+
+                node.visits += 1
+                if untried is not None:
+                    child = _Node()
+                    children[untried] = child
+                    state.apply(untried)
+                    path.append(child)
+                    break
+                state.apply(best_action)
+                path.append(best)
+
+                while not state.round_over and state.current != me:
+                    state.apply(self._opponent_action(state, rng))
+                if state.round_over:
+                    break
+                observed = _PLAY_SIZE[state.last_play] if state.last_player >= 0 else 0
+                node = best.children.get(observed)
+                if node is None:
+                    node = _Node()
+                    best.children[observed] = node
+
+            # 快速推演到本輪結束
+            while not state.round_over:
+                if state.current == me:
+                    state.apply(self._default_play(state))
+                else:
+                    state.apply(self._opponent_action(state, rng))
+
+            reward = state.share(me)
+            for child in path:
+                child.visits += 1
+                child.reward += reward
+
+        self.last_iterations = iterations
+        best_action, best_visits = root_actions[0], -1
+        for action in root_actions:
+            child = root.children.get(action)
+            if child is not None and child.visits > best_visits:
+                best_action, best_visits = action, child.visits
+        return best_action
+
+    def _information_set(self, game_state: Dict, player) -> Tuple[_SimState, _SimState, List[int], int]:
+        """由遊戲狀態建立公開資訊樣板與看不到的牌池"""
+        players = game_state["players"]
+        num_players = len(players)
+        buffers = self._buffers.get(num_players)
+        if buffers is None:
+            buffers = (_SimState(num_players), _SimState(num_players))
+            self._buffers[num_players] = buffers
+        root_state, state = buffers
+
+        for p in players:
+            root_state.hands[p.id] = 0
+            root_state.sizes[p.id] = len(p.hand)
+            root_state.alive[p.id] = p.alive
+            root_state.guns[p.id] = p.gun_pos
+        root_state.hands[player.id] = pack_hand(player.hand)
+        root_state.num_alive = sum(1 for p in players if p.alive)
+        root_state.target = game_state["target_card"]
+        root_state.current = player.id
+        root_state.round_over = False
+        root_state.shooter = NO_SHOOTER
+
+        last_count = 0
+        root_state.last_player = -1
+        root_state.last_play = 0
+        last_play = game_state.get("last_play")
+        if last_play is not None and last_play.get("player_id") is not None and last_play.get("cards"):
+            root_state.last_player = last_play["player_id"]
+            if last_play["player_id"] == player.id:
+                root_state.last_play = pack_hand(last_play["cards"])
+            else:
+                last_count = len(last_play["cards"])
+
+        # 看不到的牌：整副牌扣掉自己的手牌
+        pool = list(_DECK_UNITS)
+        for card in player.hand:
+            pool.remove(pack_hand([card]))
+        return root_state, state, pool, last_count
+
+    def _determinize(self, root_state: _SimState, state: _SimState, pool: List[int],
+                     last_count: int, me: int, rng: random.Random):
+        """
+        依公開資訊抽樣對手手牌與上家實際出牌，寫入 state
+        上家出牌依對手模型篩選：對手有誠實出牌可選卻說謊的樣本，只以 bluff_prior 的機率接受
+        """
+        state.copy_from(root_state)
+        last_player = state.last_player
+        target = state.target
+        for _ in range(self.max_resamples):
+            rng.shuffle(pool)
+            k = 0
+            for i in range(state.num_players):
+                if i == me or not state.alive[i]:
+                    continue
+                hand = 0
+                for j in range(k, k + state.sizes[i]):
+                    hand += pool[j]
+                state.hands[i] = hand
+                k += state.sizes[i]
+            if not last_count:
+                return
+            play = 0
+            for j in range(k, k + last_count):
+                play += pool[j]
+            state.last_play = play
+            if (play in _HONEST[target]
+                    or not honest_plays(state.hands[last_player] + play, target)
+                    or rng.random() < self.bluff_prior):
+                return
+
+    def _opponent_action(self, state: _SimState, rng: random.Random) -> int:
+        """
+        對手模型：看不到上家實際出的牌，只依出牌張數以 challenge_probs 的機率質疑，
+        否則依預設出牌
+        """
+        if state.last_player >= 0 and rng.random() < self.challenge_probs[_PLAY_SIZE[state.last_play]]:
+            return CHALLENGE
+        return self._default_play(state)
+
+    def _default_play(self, state: _SimState) -> int:
+        """預設出牌（同 RuleBasedStrategy）：盡量誠實出最多張，否則只謊報 1 張"""
+        hand = state.hands[state.current]
+        honest = honest_plays(hand, state.target)
+        if honest:
+            return honest[-1]
+        return legal_plays(hand)[0]
@@ -0,0 +1,241 @@
+# liars_bar/ai/opponent_model.py
+"""
+增量式貝氏對手模型
+
+每位對手依出牌張數 (1-3) 維護兩組 Beta 後驗：
+- 說謊率：被質疑（含出完手牌時的系統檢查）而公開的出牌中，說謊與誠實的次數
+- 質疑傾向：面對上家出 k 張牌時，選擇質疑與繼續出牌的次數
+
+後驗只由 Game.events 中的公開資訊更新（發牌與未被質疑的出牌內容不會被讀取），
+每個事件 O(1)，以游標接續上次讀到的位置，不需要重新掃描歷史。
+計數總和超過 max_weight 時等比例縮小，讓舊資料逐漸淡出，對手改變打法時能跟上。
+
+模型可寫成精簡的二進位檔（每位對手 49 位元組加上身分名稱），長時間運行的服務重啟後直接載入，
+不需要重播記錄檔。
+
+對手以身分（字串）而非座位編號區分，座位在不同局、不同陣容之間會改變，身分不會：
+bind() 指定每個座位的身分（例如策略名稱或 "human"），未指定的座位使用 "p<座位>"。
+"""
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+from core.events import CardsPlayed, Challenged, GameStarted, PlayerEliminated, RoundReset
+
+MAX_PLAY_CARDS = 3
+
+# 計數欄位：每種張數各一組 (說謊, 誠實, 質疑, 不質疑)
+_LIES, _HONEST, _CHALLENGES, _PASSES = range(4)
+_FIELDS = 4
+_NUM_COUNTS = _FIELDS * MAX_PLAY_CARDS
+
+_MAGIC = b"LBOM"
+_VERSION = 2
+_HEADER = struct.Struct("<4sHHI")
+_COUNTS = struct.Struct(f"<{_NUM_COUNTS}f")
+_NAME_SIZE = struct.Struct("<B")
+# 第 1 版以座位編號（1 位元組）區分對手，載入時轉成預設身分
+_V1_ENTRY = struct.Struct(f"<B{_NUM_COUNTS}f")
+
+
+def _slot(num_cards: int, field: int) -> int:
+    return (num_cards - 1) * _FIELDS + field
+
+
+class OpponentModel:
+    """單一對手的後驗計數"""
+    __slots__ = ("counts",)
+
+    def __init__(self, counts: Optional[Sequence[float]] = None):
+        self.counts: List[float] = list(counts) if counts is not None else [0.0] * _NUM_COUNTS
+
+    def _add(self, num_cards: int, field: int, other: int, max_weight: float):
+        """field 計數加一；與 other 的總和超過 max_weight 時兩者等比例縮小"""
+        counts = self.counts
+        i, j = _slot(num_cards, field), _slot(num_cards, other)
+        counts[i] += 1.0
+        total = counts[i] + counts[j]
+        if total > max_weight:
+            scale = max_weight / total
+            counts[i] *= scale
+            counts[j] *= scale
+
+    def bluff_rate(self, num_cards: int, prior_mean: float, prior_weight: float) -> float:
+        """出 num_cards 張牌時說謊機率的後驗平均"""
+        lies = self.counts[_slot(num_cards, _LIES)]
+        honest = self.counts[_slot(num_cards, _HONEST)]
+        return (lies + prior_mean * prior_weight) / (lies + honest + prior_weight)
+
+    def challenge_rate(self, num_cards: int, prior_mean: float, prior_weight: float) -> float:
+        """面對上家出 num_cards 張牌時質疑機率的後驗平均"""
+        challenges = self.counts[_slot(num_cards, _CHALLENGES)]
+        passes = self.counts[_slot(num_cards, _PASSES)]
+        return (challenges + prior_mean * prior_weight) / (challenges + passes + prior_weight)
+
+    def observations(self) -> float:
+        """累積的（縮放後）觀察次數"""
+        return sum(self.counts)
+
+
+class OpponentModels:
+    """所有對手的模型，並追蹤事件串流的讀取位置"""
+
+    def __init__(self, prior_weight: float = 4.0, max_weight: float = 200.0):
+        """
+        prior_weight: 先驗的等效觀察次數
+        max_weight: 每組計數的上限，超過時等比例縮小
+        """
+        self.prior_weight = prior_weight
+        self.max_weight = max_weight
+        self.models: Dict[str, OpponentModel] = {}
+        self.games = 0
+        # 座位 -> 身分
+        self.identities: List[str] = []
+        # 目前讀取中的事件串流與游標
+        self._events: Optional[List] = None
+        self._cursor = 0
+        # 本局的公開狀態：上家與其出牌張數、存活人數
+        self._last_player: Optional[int] = None
+        self._last_size = 0
+        self._alive = 0
+
+    def bind(self, identities: Sequence[str]):
+        """指定每個座位的身分（索引為座位編號）；同一身分的多個座位共用一個模型"""
+        self.identities = list(identities)
+
+    def identity(self, player_id: int) -> str:
+        """座位的身分；未指定時為 p<座位>"""
+        if player_id < len(self.identities):
+            return self.identities[player_id]
+        return f"p{player_id}"
+
+    def model(self, player_id: int) -> OpponentModel:
+        """座位目前的身分對應的模型（不存在時建立）"""
+        key = self.identity(player_id)
+        model = self.models.get(key)
+        if model is None:
+            model = OpponentModel()
+            self.models[key] = model
+        return model
+
+    def bluff_rate(self, player_id: int, num_cards: int, prior_mean: float) -> float:
+        """某位對手出 num_cards 張牌時說謊的機率；prior_mean 通常來自算牌"""
+        model = self.models.get(self.identity(player_id))
+        if model is None:
+            return prior_mean
+        return model.bluff_rate(num_cards, prior_mean, self.prior_weight)
+
+    def challenge_probs(self, player_id: int, prior: Sequence[float]) -> Tuple[float, ...]:
+        """某位對手面對 1、2、3 張牌時的質疑機率；prior 為沒有觀察時的預設值"""
+        model = self.models.get(self.identity(player_id))
+        if model is None:
+            return tuple(prior)
+        return tuple(model.challenge_rate(k, prior[k - 1], self.prior_weight)
+                     for k in range(1, MAX_PLAY_CARDS + 1))
+
+    def sync(self, events: Optional[List]) -> int:
+        """讀取事件串流中尚未處理的事件，返回本次處理的數量；換成新的串流時視為新的一局"""
+        if events is None:
+            return 0
+        processed = 0
+        if events is not self._events:
+            # 先讀完上一局剩下的事件（例如結束時的淘汰事件）
+            if self._events is not None:
+                processed += self._consume(self._events)
+            self._events = events
+            self._cursor = 0
+        elif len(events) < self._cursor:
+            self._cursor = 0
+        return processed + self._consume(events)
+
+    def _consume(self, events: List) -> int:
+        start = self._cursor
+        for i in range(start, len(events)):
+            self.observe(events[i])
+        self._cursor = len(events)
+        return self._cursor - start
+
+    def observe(self, event):
+        """以單一事件更新後驗，O(1)"""
+        kind = type(event)
+        if kind is CardsPlayed:
+            if self._last_size and self._last_player != event.player_id:
+                self.model(event.player_id)._add(self._last_size, _PASSES, _CHALLENGES,
+                                                 self.max_weight)
+            self._last_player = event.player_id
+            self._last_size = min(len(event.cards), MAX_PLAY_CARDS)
+        elif kind is Challenged:
+            if self._last_size:
+                if event.challenger is not None:
+                    self.model(event.challenger)._add(self._last_size, _CHALLENGES, _PASSES,
+                                                      self.max_weight)
+                field, other = (_LIES, _HONEST) if event.success else (_HONEST, _LIES)
+                self.model(event.challenged)._add(self._last_size, field, other, self.max_weight)
+        elif kind is RoundReset:
+            self._last_player = None
+            self._last_size = 0
+        elif kind is PlayerEliminated:
+            self._alive -= 1
+            if self._alive == 1:
+                self.games += 1
+        elif kind is GameStarted:
+            self._last_player = None
+            self._last_size = 0
+            self._alive = event.num_players
+
+    def to_bytes(self) -> bytes:
+        """編碼為精簡的二進位格式（不含座位與身分的對應）"""
+        parts = [_HEADER.pack(_MAGIC, _VERSION, len(self.models), self.games)]
+        for key in sorted(self.models):
+            name = key.encode("utf-8")
+            if len(name) > 255:
+                raise ValueError(f"對手身分過長: {key}")
+            parts.append(_NAME_SIZE.pack(len(name)) + name + _COUNTS.pack(*self.models[key].counts))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **kwargs) -> "OpponentModels":
+        """由 to_bytes 的輸出還原"""
+        if len(data) < _HEADER.size:
+            raise ValueError("對手模型檔案不完整")
+        magic, version, count, games = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version not in (1, _VERSION):
+            raise ValueError("對手模型檔案格式不符")
+
+        models = cls(**kwargs)
+        models.games = games
+        offset = _HEADER.size
+        try:
+            for _ in range(count):
+                if version == 1:
+                    player_id, *counts = _V1_ENTRY.unpack_from(data, offset)
+                    key = f"p{player_id}"
+                    offset += _V1_ENTRY.size
+                else:
+                    (size,) = _NAME_SIZE.unpack_from(data, offset)
+                    offset += _NAME_SIZE.size
+                    key = data[offset:offset + size].decode("utf-8")
+                    offset += size
+                    counts = _COUNTS.unpack_from(data, offset)
+                    offset += _COUNTS.size
+                models.models[key] = OpponentModel(counts)
+        except struct.error:
+            raise ValueError("對手模型檔案不完整") from None
+        if offset != len(data):
+            raise ValueError("對手模型檔案不完整")
+        return models
+
+    def save(self, path: str):
+        """寫入檔案（先寫暫存檔再改名，避免中斷時留下損壞的檔案）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "OpponentModels":
+        """讀取檔案；檔案不存在時返回空模型"""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read(), **kwargs)
@@ -1,24 +1,37 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from models.player import Player
+from models.packed_state import pack_hand
+from .ev import get_engine, play_to_cards
+from .mcts import CHALLENGE, InformationSetSearch
+from .opponent_model import OpponentModels
+import random
 
 
 class Strategy:
     """AI策略基類"""
 
-    def __init__(self):
-        pass
+    def __init__(self, rng: Optional[random.Random] = None):
+        # 策略專屬的亂數產生器，模擬時可替換為每局獨立的子流
+        self.rng = rng if rng is not None else random.Random()
 
     def decide_action(self, game_state: Dict, player: Player) -> Dict:
         """決定執行什麼動作"""
         raise NotImplementedError("子類必須實現此方法")
 
+    def observe(self, game_state: Dict):
+        """不做決策地觀察遊戲狀態（例如一局結束時），預設不做任何事"""
+
+    def reset(self):
+        """回到建立時的狀態，捨棄跨局累積的資料（例如對手模型），預設不做任何事"""
+
+    def set_opponents(self, identities: Sequence[str]):
+        """指定每個座位的穩定身分（索引為座位編號），供跨局辨識對手，預設不做任何事"""
+
 
 class RandomStrategy(Strategy):
     """隨機策略"""
 
     def decide_action(self, game_state: Dict, player: Player) -> Dict:
-        import random
-
         # 確保 player 具有 hand 屬性
         if player is None or not hasattr(player, 'hand') or player.hand is None:
             return {"action": "skip", "cards": []}
@@ -27,7 +40,7 @@ class RandomStrategy(Strategy):
         available_actions = self._get_available_actions(game_state, player)
 
         # 隨機選擇一個動作
-        action_type = random.choice(available_actions)
+        action_type = self.rng.choice(available_actions)
 
         if action_type == "play":
             # 隨機選擇1-3張手牌
@@ -39,8 +52,8 @@ class RandomStrategy(Strategy):
                     # 如果只能出牌但沒有手牌，隨便返回一個
                     return {"action": "play", "cards": []}
 
-            num_cards = min(random.randint(1, 3), len(player.hand))
-            cards = random.sample(player.hand, num_cards)
+            num_cards = min(self.rng.randint(1, 3), len(player.hand))
+            cards = self.rng.sample(player.hand, num_cards)
             return {"action": "play", "cards": cards}
 
         # 其他動作不需要額外參數
@@ -103,8 +116,7 @@ class RuleBasedStrategy(Strategy):
         if last_player_idx is not None and last_play_cards and "challenge" in available_actions:
             # 如果上一個玩家出了很多牌，有較高概率質疑
             if len(last_play_cards) >= 2:
-                import random
-                if random.random() < 0.7:
+                if self.rng.random() < 0.7:
                     return {"action": "challenge"}
 
             # 否則跳過 (只有當跳過是有效動作時)
@@ -156,12 +168,136 @@ class RuleBasedStrategy(Strategy):
         return actions
 
 
-class LearningStrategy(Strategy):
-    """學習型策略"""
+class ExpectedValueStrategy(Strategy):
+    """以期望值引擎比較質疑與各種出牌的策略"""
+
+    def __init__(self, rng: Optional[random.Random] = None, elimination_value: float = 0.5):
+        super().__init__(rng)
+        self.engine = get_engine(elimination_value=elimination_value)
+
+    def decide_action(self, game_state: Dict, player: Player) -> Dict:
+        # 確保 player 具有 hand 屬性
+        if player is None or not hasattr(player, 'hand') or player.hand is None:
+            return {"action": "skip", "cards": []}
+
+        players = game_state["players"]
+        hand = pack_hand(player.hand)
+
+        # 上家資訊（只使用公開的出牌張數）
+        last_play = game_state.get("last_play")
+        last_count = 0
+        last_gun_pos = 1
+        if last_play is not None and last_play.get("player_id") is not None and last_play.get("cards"):
+            last_count = len(last_play["cards"])
+            last_gun_pos = players[last_play["player_id"]].gun_pos
+
+        if not player.hand:
+            return {"action": "challenge"} if last_count else {"action": "skip"}
+
+        # 下家（下一位存活玩家）的槍管位置
+        next_idx = (player.id + 1) % len(players)
+        while not players[next_idx].alive and next_idx != player.id:
+            next_idx = (next_idx + 1) % len(players)
+
+        result = self.engine.evaluate(hand, game_state["target_card"], player.gun_pos,
+                                      players[next_idx].gun_pos, last_count, last_gun_pos)
+        play, play_ev = result["play"]
+        if result["challenge"] is not None and result["challenge"] > play_ev:
+            return {"action": "challenge"}
+        return {"action": "play", "cards": play_to_cards(play)}
+
+
+class ISMCTSStrategy(Strategy):
+    """資訊集蒙地卡羅樹搜尋策略，在每步的時間預算內隨時可回傳目前最佳動作"""
+
+    def __init__(self, rng: Optional[random.Random] = None, time_budget: float = 0.05,
+                 max_iterations: Optional[int] = None):
+        super().__init__(rng)
+        self.search = InformationSetSearch(time_budget=time_budget, max_iterations=max_iterations)
+
+    def decide_action(self, game_state: Dict, player: Player) -> Dict:
+        # 確保 player 具有 hand 屬性
+        if player is None or not hasattr(player, 'hand') or player.hand is None:
+            return {"action": "skip", "cards": []}
+
+        last_play = game_state.get("last_play")
+        can_challenge = (last_play is not None and last_play.get("player_id") is not None
+                         and bool(last_play.get("cards")))
+        if not player.hand:
+            return {"action": "challenge"} if can_challenge else {"action": "skip"}
+
+        action = self.search.search(game_state, player, self.rng)
+        if action == CHALLENGE:
+            return {"action": "challenge"}
+        return {"action": "play", "cards": play_to_cards(action)}
+
 
-    def __init__(self):
-        super().__init__()
-        self.player_models = {}  # 用於記錄其他玩家的行為模式
+class SolverStrategy(Strategy):
+    """查詢 CFR 離線求解策略表的策略，每次決策為 O(1) 查表"""
+
+    def __init__(self, rng: Optional[random.Random] = None, policy_path: Optional[str] = None):
+        super().__init__(rng)
+        # 延遲導入：策略表需要 NumPy，其他策略不需要
+        from . import cfr
+        self.cfr = cfr
+        self.policy = cfr.load_policy(policy_path)
+
+    def decide_action(self, game_state: Dict, player: Player) -> Dict:
+        # 確保 player 具有 hand 屬性
+        if player is None or not hasattr(player, 'hand') or player.hand is None:
+            return {"action": "skip", "cards": []}
+
+        info, legal = self.cfr.game_state_infoset(game_state, player)
+        if not player.hand:
+            return {"action": "challenge"} if self.cfr.CHALLENGE_ACTION in legal else {"action": "skip"}
+
+        action = self.policy.choose(info, legal, self.rng)
+        if action == self.cfr.CHALLENGE_ACTION:
+            return {"action": "challenge"}
+        return {"action": "play",
+                "cards": self.cfr.action_to_cards(player.hand, game_state["target_card"], action)}
+
+
+class EndgameStrategy(Strategy):
+    """只剩兩名玩家時查詢殘局資料庫，其餘情況（或資料庫尚未建立時）使用期望值策略"""
+
+    def __init__(self, rng: Optional[random.Random] = None, tablebase_path: Optional[str] = None):
+        super().__init__(rng)
+        self.fallback = ExpectedValueStrategy(self.rng)
+        self.tablebase_path = tablebase_path
+
+    def decide_action(self, game_state: Dict, player: Player) -> Dict:
+        # 確保 player 具有 hand 屬性
+        if player is None or not hasattr(player, 'hand') or player.hand is None:
+            return {"action": "skip", "cards": []}
+
+        # 延遲導入：資料庫需要 NumPy，且只在兩人殘局時才會用到
+        from .endgame import endgame_decision, get_tablebase
+        decision = endgame_decision(game_state, player, self.rng,
+                                    tablebase=get_tablebase(self.tablebase_path))
+        if decision is not None:
+            return decision
+        self.fallback.rng = self.rng
+        return self.fallback.decide_action(game_state, player)
+
+
+class LearningStrategy(Strategy):
+    """學習型策略：以增量更新的對手模型調整期望值決策"""
+
+    def __init__(self, rng: Optional[random.Random] = None, model_path: Optional[str] = None,
+                 elimination_value: float = 0.5, save_models: bool = True):
+        """
+        model_path: 對手模型檔案，設定時啟動時載入；None 時只保存在記憶體
+        save_models: 是否在每局結束後將模型寫回 model_path（False 時檔案只作為初始模型）
+        """
+        super().__init__(rng)
+        self.model_path = model_path
+        self.save_models = save_models
+        self.player_models = (OpponentModels.load(model_path) if model_path
+                              else OpponentModels())  # 用於記錄其他玩家的行為模式
+        # reset() 用：建立時（載入檔案後）的模型
+        self._initial_models = self.player_models.to_bytes()
+        self.engine = get_engine(elimination_value=elimination_value)
 
     def decide_action(self, game_state: Dict, player: Player) -> Dict:
         # 更新其他玩家的模型
@@ -180,20 +316,63 @@ class LearningStrategy(Strategy):
 
         return action
 
+    def observe(self, game_state: Dict):
+        self._update_player_models(game_state)
+
+    def reset(self):
+        """對手模型回到建立時的狀態（空模型或 model_path 載入的內容）"""
+        identities = self.player_models.identities
+        self.player_models = OpponentModels.from_bytes(
+            self._initial_models, prior_weight=self.player_models.prior_weight,
+            max_weight=self.player_models.max_weight)
+        self.player_models.bind(identities)
+
+    def set_opponents(self, identities: Sequence[str]):
+        self.player_models.bind(identities)
+
     def _update_player_models(self, game_state: Dict):
-        """更新其他玩家的行為模型"""
-        # 通過分析玩家過去的行為來預測其策略
-        # 這裡可以實現更複雜的學習算法
-        pass
+        """讀取上次決策後新增的事件，增量更新其他玩家的行為模型，並在每局結束後寫回檔案"""
+        games = self.player_models.games
+        self.player_models.sync(game_state.get("events"))
+        if self.model_path and self.save_models and self.player_models.games != games:
+            self.player_models.save(self.model_path)
 
     def _analyze_best_action(self, game_state: Dict, player: Player, available_actions: List[str] = None) -> Dict:
-        """分析最佳行動"""
-        # 針對當前局勢，結合對其他玩家的建模，選擇最優的行動
-        # 這裡使用簡化版，實際上可以結合更多因素
+        """分析最佳行動：以對手的說謊率與質疑傾向後驗取代期望值引擎的固定假設"""
+        if player is None or not hasattr(player, 'hand') or player.hand is None:
+            return {"action": "skip", "cards": []}
 
-        # 先使用規則策略作為基礎
-        rule_strategy = RuleBasedStrategy()
-        return rule_strategy.decide_action(game_state, player)
+        players = game_state["players"]
+        target_card = game_state["target_card"]
+        hand = pack_hand(player.hand)
+
+        last_play = game_state.get("last_play")
+        last_count = 0
+        last_id = None
+        if last_play is not None and last_play.get("player_id") is not None and last_play.get("cards"):
+            last_count = len(last_play["cards"])
+            last_id = last_play["player_id"]
+
+        if not player.hand:
+            return {"action": "challenge"} if last_count else {"action": "skip"}
+
+        # 下家（下一位存活玩家）依其質疑傾向決定我們出幾張
+        next_idx = (player.id + 1) % len(players)
+        while not players[next_idx].alive and next_idx != player.id:
+            next_idx = (next_idx + 1) % len(players)
+        challenge_probs = self.player_models.challenge_probs(next_idx, self.engine.challenge_probs[1:])
+        play, play_ev = self.engine.best_play(hand, target_card, player.gun_pos,
+                                              players[next_idx].gun_pos, challenge_probs)
+
+        if last_count:
+            # 以算牌得到的說謊機率為先驗，結合上家過去被揭露的出牌
+            prior = 1.0 - self.engine.p_honest(hand, target_card, last_count)
+            p_lie = self.player_models.bluff_rate(last_id, last_count, prior)
+            challenge_ev = self.engine.challenge_ev(hand, target_card, last_count, player.gun_pos,
+                                                    players[last_id].gun_pos, 1.0 - p_lie)
+            if challenge_ev > play_ev:
+                return {"action": "challenge"}
+        return {"action": "play", "cards": play_to_cards(play)}
 
     def _get_available_actions(self, game_state: Dict, player: Player = None) -> List[str]:
         """獲取當前可用的動作列表"""
@@ -0,0 +1,393 @@
+# liars_bar/benchmarks/suite.py
+"""
+遊戲引擎與記錄的微觀／巨觀效能基準
+
+每個基準是一個「執行 n 次並返回量測到的總秒數」的函式，
+準備工作（建立遊戲、暫存目錄等）不計入時間。每個基準重複量測 repeat 次，
+以最佳值作為每次操作的耗時（同 timeit 的建議），並附上中位數供參考。
+所有亂數都有固定種子，同一台機器上的結果可重現。
+
+結果寫成 JSON；compare() 將目前結果與儲存的基準線比較，
+每次操作的耗時超過基準線 (1 + threshold) 倍即標記為退步。
+"""
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+SEED = 20240501
+
+
+class SkipBenchmark(Exception):
+    """基準所需的相依套件或資料不存在，略過此基準"""
+
+
+@dataclass
+class Benchmark:
+    """單一基準：func(n) 執行 n 次操作並返回總秒數"""
+    name: str
+    func: Callable[[int], float]
+    number: int
+    group: str = "micro"
+    description: str = ""
+
+
+@contextmanager
+def _in_temp_dir():
+    """在暫存目錄中執行（RecordManager 以相對路徑寫入 log/）"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="liars_bar_bench_") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+
+def _new_game(seed: int, num_players: int = 4, record_logs: bool = False):
+    from core.game import Game
+    game = Game(num_players=num_players, human_player_index=-1, verbose=False,
+                record_logs=record_logs, rng=random.Random(seed))
+    game.start()
+    return game
+
+
+def _simple_decision(game) -> Dict:
+    """最簡單的合法決策：有手牌就出第一張，否則質疑"""
+    player = game.players[game.current_idx]
+    if player.hand:
+        return {"action": "play", "played_cards": [player.hand[0]]}
+    return {"action": "challenge"}
+
+
+def bench_game_next(n: int) -> float:
+    """Game.next：每次處理一個決策（不含記錄檔）"""
+    seed = SEED
+    game = _new_game(seed)
+    total = 0.0
+    for _ in range(n):
+        if game.is_game_over():
+            seed += 1
+            game = _new_game(seed)
+        decision = _simple_decision(game)
+        start = time.perf_counter()
+        game.next(decision)
+        total += time.perf_counter() - start
+    return total
+
+
+def bench_get_game_state(n: int) -> float:
+    """Game.get_game_state：狀態變更後建立視圖並讀取規則策略用到的欄位"""
+    game = _new_game(SEED)
+    get_state = game.get_game_state
+    invalidate = game.invalidate_state
+    start = time.perf_counter()
+    for _ in range(n):
+        invalidate()
+        state = get_state()
+        state["target_card"], state.get("last_play"), state["players"]
+    return time.perf_counter() - start
+
+
+def bench_shuffle_and_deal(n: int) -> float:
+    """utils.card_utils.shuffle_and_deal：四人洗牌發牌"""
+    from utils.card_utils import create_deck, shuffle_and_deal
+    deck = create_deck()
+    rng = random.Random(SEED)
+    start = time.perf_counter()
+    for _ in range(n):
+        shuffle_and_deal(deck, 4, rng)
+    return time.perf_counter() - start
+
+
+def bench_validate_played_cards(n: int) -> float:
+    """utils.card_utils.validate_played_cards：合法與不合法出牌混合"""
+    from utils.card_utils import create_deck, shuffle_and_deal, validate_played_cards
+    rng = random.Random(SEED)
+    cases = []
+    for _ in range(64):
+        hand = shuffle_and_deal(create_deck(), 4, rng)["p0"]
+        played = rng.sample(create_deck(), rng.randint(1, 3))
+        cases.append((played, hand))
+    start = time.perf_counter()
+    for i in range(n):
+        played, hand = cases[i & 63]
+        validate_played_cards(played, hand)
+    return time.perf_counter() - start
+
+
+def _record_manager(game_id: int = 1):
+    from utils.record_manager import RecordManager
+    return RecordManager(game_id, "bench")
+
+
+def _log_action_rounds(round_length: int) -> Callable[[int], float]:
+    """RecordManager.log_action：每 round_length 個動作換一次回合，用來確認單一動作的成本不隨回合長度增加"""
+    def bench(n: int) -> float:
+        with _in_temp_dir():
+            manager = _record_manager()
+            manager.update_target_card("Q")
+            hand = ["A", "A", "K", "Q", "J"]
+            total = 0.0
+            for i in range(n):
+                start = time.perf_counter()
+                manager.log_action(player_id=i % 4, action_type="play", cards_played=["Q"],
+                                   cards_remaining=hand, shots_fired=i % 3,
+                                   behavior="迅速出牌", strategy="bench")
+                total += time.perf_counter() - start
+                if (i + 1) % round_length == 0:
+                    manager.next_round()
+            manager.close()
+            return total
+    if round_length == 1:
+        bench.__doc__ = "RecordManager.log_action：每回合一個動作（與 Game 相同，動作之間換回合）"
+    else:
+        bench.__doc__ = f"RecordManager.log_action：每回合 {round_length} 個動作"
+    return bench
+
+
+def bench_get_round_context(n: int) -> float:
+    """RecordManager.get_round_context：已有 200 回合記錄時查詢目前回合"""
+    with _in_temp_dir():
+        manager = _record_manager()
+        manager.update_target_card("K")
+        for i in range(200):
+            manager.log_action(player_id=i % 4, action_type="challenge" if i % 5 == 0 else "play",
+                               cards_played=["K"], cards_remaining=["A", "J"], shots_fired=i % 3,
+                               behavior="思考片刻", strategy="bench")
+            if i < 199:
+                manager.next_round()
+        start = time.perf_counter()
+        for _ in range(n):
+            manager.get_round_context()
+        elapsed = time.perf_counter() - start
+        manager.close()
+        return elapsed
+
+
+def bench_round_context_after_action(n: int) -> float:
+    """RecordManager.get_round_context：同一回合內每新增一個動作就查詢一次（回合持續變長）"""
+    with _in_temp_dir():
+        manager = _record_manager()
+        manager.update_target_card("K")
+        total = 0.0
+        for i in range(n):
+            manager.log_action(player_id=i % 4, action_type="challenge" if i % 5 == 0 else "play",
+                               cards_played=["K"], cards_remaining=["A", "J"], shots_fired=i % 3,
+                               behavior="思考片刻", strategy="bench")
+            start = time.perf_counter()
+            manager.get_round_context()
+            total += time.perf_counter() - start
+        manager.close()
+        return total
+
+
+def bench_build_game_prompt(n: int) -> float:
+    """LLMManager._build_game_prompt：組合 LLM 提示詞（不呼叫網路）"""
+    try:
+        from ai.llm_manager import LLMManager
+    except ImportError as e:
+        raise SkipBenchmark(f"缺少 LLM 相依套件: {e}")
+    manager = LLMManager()
+    game = _new_game(SEED)
+    game.next(_simple_decision(game))
+    state = game.get_game_state()
+    player_id = game.current_idx
+    context = "回合記錄\n" * 20
+    start = time.perf_counter()
+    for _ in range(n):
+        manager._build_game_prompt(state, player_id, context)
+    return time.perf_counter() - start
+
+
+def bench_full_game_with_logs(n: int) -> float:
+    """開啟記錄檔的完整四人局（每次操作為一局）"""
+    with _in_temp_dir():
+        total = 0.0
+        for i in range(n):
+            start = time.perf_counter()
+            game = _new_game(SEED + i, record_logs=True)
+            while not game.is_game_over():
+                game.next(_simple_decision(game))
+            total += time.perf_counter() - start
+        return total
+
+
+def _headless_games(strategy: str) -> Callable[[int], float]:
+    def bench(n: int) -> float:
+        from simulation.runner import HeadlessRunner
+        try:
+            runner = HeadlessRunner([strategy] * 4, seed=SEED)
+            runner.play_game(0)
+        except (FileNotFoundError, ImportError) as e:
+            raise SkipBenchmark(str(e))
+        start = time.perf_counter()
+        for i in range(1, n + 1):
+            runner.play_game(i)
+        return time.perf_counter() - start
+    bench.__doc__ = f"四個 {strategy} 策略的無頭完整局（每次操作為一局）"
+    return bench
+
+
+def default_benchmarks() -> List[Benchmark]:
+    """所有基準與其預設操作次數"""
+    from simulation.runner import SIMULATION_STRATEGIES
+
+    micro = [
+        Benchmark("game.next", bench_game_next, 20000),
+        Benchmark("game.get_game_state", bench_get_game_state, 50000),
+        Benchmark("card_utils.shuffle_and_deal", bench_shuffle_and_deal, 50000),
+        Benchmark("card_utils.validate_played_cards", bench_validate_played_cards, 100000),
+        Benchmark("record_manager.log_action", _log_action_rounds(1), 2000),
+        Benchmark("record_manager.log_action.round_50", _log_action_rounds(50), 2000),
+        Benchmark("record_manager.log_action.round_500", _log_action_rounds(500), 2000),
+        Benchmark("record_manager.get_round_context", bench_get_round_context, 20000),
+        Benchmark("record_manager.get_round_context.after_action",
+                  bench_round_context_after_action, 1000),
+        Benchmark("llm_manager.build_game_prompt", bench_build_game_prompt, 20000),
+    ]
+    macro = [Benchmark("game.full_with_logs", bench_full_game_with_logs, 20, group="macro")]
+    macro += [Benchmark(f"headless.{strategy}", _headless_games(strategy), 200, group="macro")
+              for strategy in SIMULATION_STRATEGIES]
+    for benchmark in micro + macro:
+        benchmark.description = (benchmark.func.__doc__ or "").strip()
+    return micro + macro
+
+
+def run_benchmark(benchmark: Benchmark, repeat: int = 5, scale: float = 1.0) -> Dict:
+    """量測單一基準，返回每次操作的耗時（微秒）統計；略過時返回 skipped 原因"""
+    number = max(1, int(benchmark.number * scale))
+    timings = []
+    gc_enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                timings.append(benchmark.func(number) / number)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except SkipBenchmark as e:
+        return {"group": benchmark.group, "description": benchmark.description, "skipped": str(e)}
+
+    best = min(timings)
+    return {
+        "group": benchmark.group,
+        "description": benchmark.description,
+        "number": number,
+        "repeat": repeat,
+        "per_op_us": best * 1e6,
+        "median_us": statistics.median(timings) * 1e6,
+        "ops_per_sec": 1.0 / best if best > 0 else None,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(names: Optional[Sequence[str]] = None, repeat: int = 5, scale: float = 1.0,
+              progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    執行基準（names 為名稱前綴過濾，None 時全部執行），返回可寫成 JSON 的結果
+    progress: 每完成一個基準時呼叫 progress(名稱, 結果)
+    """
+    results = {}
+    for benchmark in default_benchmarks():
+        if names and not any(benchmark.name.startswith(prefix) for prefix in names):
+            continue
+        results[benchmark.name] = run_benchmark(benchmark, repeat, scale)
+        if progress:
+            progress(benchmark.name, results[benchmark.name])
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+def save_results(results: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到基準線 {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.1) -> List[Dict]:
+    """
+    比較兩份結果中都有量測到的基準
+    返回每個基準的 {name, baseline_us, current_us, ratio, status}，
+    status 為 "regression"（慢於基準線超過 threshold）、"improvement"（快超過 threshold）或 "ok"
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or "per_op_us" not in base or "per_op_us" not in result:
+            continue
+        ratio = result["per_op_us"] / base["per_op_us"] if base["per_op_us"] > 0 else float("inf")
+        if ratio > 1.0 + threshold:
+            status = "regression"
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline_us": base["per_op_us"],
+                     "current_us": result["per_op_us"], "ratio": ratio, "status": status})
+    return rows
+
+
+def format_results(results: Dict) -> str:
+    """將結果格式化為文字報告"""
+    meta = results["meta"]
+    lines = [f"版本 {meta['revision']}，Python {meta['python']}，{meta['platform']}"]
+    width = max((len(name) for name in results["results"]), default=0) + 2
+    for name, result in results["results"].items():
+        if "skipped" in result:
+            lines.append(f"{name.ljust(width)}略過：{result['skipped']}")
+            continue
+        lines.append(f"{name.ljust(width)}{result['per_op_us']:>12.2f} us/op "
+                     f"(中位數 {result['median_us']:.2f}，{result['ops_per_sec']:.0f} op/s)")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    """將比較結果格式化為文字報告"""
+    labels = {"regression": "退步", "improvement": "進步", "ok": ""}
+    width = max((len(row["name"]) for row in rows), default=0) + 2
+    lines = ["與基準線比較 (目前 / 基準線):"]
+    for row in rows:
+        lines.append(f"{row['name'].ljust(width)}{row['baseline_us']:>12.2f} -> "
+                     f"{row['current_us']:>12.2f} us/op  x{row['ratio']:.2f} {labels[row['status']]}")
+    regressions = sum(row["status"] == "regression" for row in rows)
+    lines.append(f"共 {regressions} 項退步" if regressions else "沒有退步")
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+# liars_bar/core/events.py
+"""
+遊戲事件與歸約器 (reducer)
+
+Game 的每一次狀態變更都先寫成一個不可變事件，附加到只增不改的事件串流，
+再交由 apply_event 套用。事件已包含所有亂數結果（發到的手牌、子彈位置、目標牌），
+因此同一串事件永遠歸約出同一個狀態，不需要亂數或重新呼叫 AI 決策，
+可用於當機復原、賽後分析與回歸檢查。
+"""
+import json
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from models.card import GUN_CHAMBERS
+
+
+class GameStarted(NamedTuple):
+    """開局：所有玩家復活，回到第 1 回合"""
+    num_players: int
+
+
+class TargetDrawn(NamedTuple):
+    """抽出目標牌"""
+    card: str
+
+
+class CardsDealt(NamedTuple):
+    """發牌：以玩家 ID 為索引，None 表示該玩家未發牌（已出局）"""
+    hands: Tuple[Optional[Tuple[str, ...]], ...]
+    bullets: Tuple[Optional[int], ...]
+    reset_guns: bool
+
+
+class CardsPlayed(NamedTuple):
+    """玩家出牌"""
+    player_id: int
+    cards: Tuple[str, ...]
+
+
+class Challenged(NamedTuple):
+    """質疑；challenger 為 None 表示出完手牌時的系統自動質疑"""
+    challenger: Optional[int]
+    challenged: int
+    success: bool
+
+
+class ShotFired(NamedTuple):
+    """俄羅斯輪盤開槍"""
+    player_id: int
+    hit: bool
+
+
+class PlayerEliminated(NamedTuple):
+    """玩家出局"""
+    player_id: int
+
+
+class RoundReset(NamedTuple):
+    """質疑結束，清空上家出牌，準備重新發牌"""
+
+
+class TurnPassed(NamedTuple):
+    """輪到下一位玩家，回合數加一"""
+    player_id: int
+
+
+EVENT_TYPES = {cls.__name__: cls for cls in (
+    GameStarted, TargetDrawn, CardsDealt, CardsPlayed, Challenged,
+    ShotFired, PlayerEliminated, RoundReset, TurnPassed)}
+
+
+class PlayerState:
+    """重播用的輕量玩家狀態，欄位名稱與 models.player.Player 相同"""
+    __slots__ = ("id", "hand", "alive", "bullet_pos", "gun_pos", "shots_fired")
+
+    def __init__(self, player_id: int):
+        self.id = player_id
+        self.hand: List[str] = []
+        self.alive = True
+        self.bullet_pos = None
+        self.gun_pos = 1
+        self.shots_fired = 0
+
+
+class ReplayState:
+    """重播用的遊戲狀態，欄位名稱與 core.game.Game 相同，因此兩者共用同一組歸約函式"""
+    __slots__ = ("num_players", "players", "target_card", "current_idx", "round_count",
+                 "last_play_cards", "last_player_idx")
+
+    def __init__(self):
+        self.num_players = 0
+        self.players: List[PlayerState] = []
+        self.target_card = None
+        self.current_idx = 0
+        self.round_count = 0
+        self.last_play_cards: List[str] = []
+        self.last_player_idx = None
+
+    def is_game_over(self) -> bool:
+        """檢查遊戲是否結束"""
+        return sum(1 for p in self.players if p.alive) <= 1
+
+    def get_winner(self) -> Optional[int]:
+        """獲取贏家ID，如果沒有贏家則返回None"""
+        for player in self.players:
+            if player.alive:
+                return player.id
+        return None
+
+
+def _game_started(state, event: GameStarted):
+    if len(state.players) != event.num_players:
+        state.players = [PlayerState(i) for i in range(event.num_players)]
+    state.num_players = event.num_players
+    for player in state.players:
+        player.alive = True
+    state.current_idx = 0
+    state.round_count = 1
+    state.last_play_cards = []
+    state.last_player_idx = None
+
+
+def _target_drawn(state, event: TargetDrawn):
+    state.target_card = event.card
+
+
+def _cards_dealt(state, event: CardsDealt):
+    for player, hand, bullet in zip(state.players, event.hands, event.bullets):
+        if hand is None:
+            continue
+        player.hand = list(hand)
+        player.bullet_pos = bullet
+        if event.reset_guns:
+            player.gun_pos = 1
+
+
+def _cards_played(state, event: CardsPlayed):
+    hand = state.players[event.player_id].hand
+    for card in event.cards:
+        hand.remove(card)
+    state.last_play_cards = list(event.cards)
+    state.last_player_idx = event.player_id
+
+
+def _challenged(state, event: Challenged):
+    # 質疑本身不改變狀態，結果由後續的 ShotFired / PlayerEliminated 事件表達
+    pass
+
+
+def _shot_fired(state, event: ShotFired):
+    player = state.players[event.player_id]
+    player.gun_pos = (player.gun_pos % GUN_CHAMBERS) + 1
+    player.shots_fired += 1
+
+
+def _player_eliminated(state, event: PlayerEliminated):
+    state.players[event.player_id].alive = False
+
+
+def _round_reset(state, event: RoundReset):
+    state.last_play_cards = []
+    state.last_player_idx = None
+
+
+def _turn_passed(state, event: TurnPassed):
+    state.current_idx = event.player_id
+    state.round_count += 1
+
+
+_REDUCERS = {
+    GameStarted: _game_started,
+    TargetDrawn: _target_drawn,
+    CardsDealt: _cards_dealt,
+    CardsPlayed: _cards_played,
+    Challenged: _challenged,
+    ShotFired: _shot_fired,
+    PlayerEliminated: _player_eliminated,
+    RoundReset: _round_reset,
+    TurnPassed: _turn_passed,
+}
+
+
+def apply_event(state, event):
+    """
+    將單一事件歸約到狀態上並返回該狀態
+    state 可以是 ReplayState 或 Game：只讀寫兩者共有的欄位，不做 I/O、不用亂數
+    """
+    _REDUCERS[type(event)](state, event)
+    return state
+
+
+def replay(events: Iterable, state=None):
+    """由事件串流重建狀態；state 為 None 時從空的 ReplayState 開始"""
+    if state is None:
+        state = ReplayState()
+    reducers = _REDUCERS
+    for event in events:
+        reducers[type(event)](state, event)
+    return state
+
+
+def encode_event(event) -> List:
+    """將事件轉為可 JSON 序列化的精簡列表：[事件名稱, 欄位...]"""
+    return [type(event).__name__, *event]
+
+
+def decode_event(data: List):
+    """由 encode_event 的輸出還原事件"""
+    cls = EVENT_TYPES[data[0]]
+    fields = data[1:]
+    if cls is CardsDealt:
+        hands, bullets, reset_guns = fields
+        return CardsDealt(tuple(tuple(h) if h is not None else None for h in hands),
+                          tuple(bullets), reset_guns)
+    if cls is CardsPlayed:
+        return CardsPlayed(fields[0], tuple(fields[1]))
+    return cls(*fields)
+
+
+def dump_events(events: Iterable, path: str):
+    """將事件串流寫成 JSONL 檔（每行一個事件）"""
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(encode_event(event), ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+
+def load_events(path: str) -> List:
+    """讀取 dump_events 寫出的事件串流，忽略寫到一半的最後一行（當機復原）"""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(decode_event(json.loads(line)))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                break
+    return events
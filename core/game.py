@@ -1,25 +1,52 @@
 # liars_bar/core/game.py
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Tuple
+from models.card import GUN_CHAMBERS, TARGET_CARDS
 from models.player import Player, PlayerType
 from utils.card_utils import create_deck, shuffle_and_deal, validate_played_cards
+from utils.game_id import next_game_id
 from utils.record_manager import RecordManager
-import json
-import os
+from utils.record_store import RecordStore
+from .events import (CardsDealt, CardsPlayed, Challenged, GameStarted, PlayerEliminated,
+                     RoundReset, ShotFired, TargetDrawn, TurnPassed, apply_event, replay)
+from .state_view import GameStateView
 import random
 from enum import Enum
 from datetime import datetime
 
 
+class GameSnapshot(NamedTuple):
+    """
+    遊戲狀態快照：只含不可變的元組，可直接雜湊並在多個分支間共享
+    players 每項為 (手牌, 存活, 子彈位置, 槍管位置, 開槍次數)
+    """
+    target_card: Optional[str]
+    current_idx: int
+    round_count: int
+    last_play_cards: Tuple[str, ...]
+    last_player_idx: Optional[int]
+    players: Tuple[Tuple[Tuple[str, ...], bool, int, int, int], ...]
+    num_events: int
+
+
 class Game:
     """統一的遊戲控制器，整合了之前 class_game.py 和 game_core.py 的功能"""
 
-    def __init__(self, num_players=4, debug=False, human_player_index=0, ai_strategy="rule", kill_player_on_start: Optional[int] = None, interactive_pause: bool = True):
+    def __init__(self, num_players=4, debug=False, human_player_index=0, ai_strategy="rule", kill_player_on_start: Optional[int] = None, interactive_pause: bool = True, verbose: bool = True, record_logs: bool = True, rng: Optional[random.Random] = None, record_store: Optional[RecordStore] = None, ai_model_path: Optional[str] = None):
         self.num_players = num_players
         self.debug = debug
         self.human_player_index = human_player_index
         self.ai_strategy = ai_strategy
         self.kill_player_on_start = kill_player_on_start
         self.interactive_pause = interactive_pause
+        # 無頭模擬時關閉終端輸出與記錄檔
+        self.verbose = verbose
+        self.record_logs = record_logs
+        # 選用的 SQLite 記錄庫，記錄時每個動作也寫入資料庫
+        self.record_store = record_store
+        # 學習型 AI 的對手模型檔，互動遊戲每局結束後寫回
+        self.ai_model_path = ai_model_path
+        # 本局專屬的亂數產生器，注入相同種子即可逐位元重播整局
+        self.rng = rng if rng is not None else random.Random()
 
         # 創建玩家
         self.players = self._create_players()
@@ -35,6 +62,11 @@ class Game:
         self.last_play_cards = []
         self.last_player_idx = None
         self.play_history = []
+        # 只增不改的事件串流，所有狀態變更都經由 _emit 套用
+        self.events: List = []
+        # get_game_state() 返回的視圖；每次狀態變更遞增世代編號，舊視圖隨之失效
+        self._state_view: Optional[GameStateView] = None
+        self._state_generation = 0
 
         # 初始化記錄管理器 (會在 start() 中被賦值)
         self.record_manager: Optional[RecordManager] = None
@@ -45,38 +77,46 @@ class Game:
         players = []
         for i in range(self.num_players):
             player_type = PlayerType.HUMAN if i == self.human_player_index else PlayerType.AI
-            players.append(Player(id=i, player_type=player_type))
+            players.append(Player(id=i, player_type=player_type,
+                                  bullet_pos=self.rng.randint(1, GUN_CHAMBERS)))
         return players
 
     def start(self):
         """開始新遊戲"""
         # 初始化記錄管理器
-        self.game_count = self._get_next_game_count()
-        self.record_manager = RecordManager(
-            self.game_count, self.session_id)  # 傳遞 session_id
-        self.current_log_directory = self.record_manager.get_log_directory_path()
+        if self.record_logs:
+            self.game_count = self._get_next_game_count()
+            self.record_manager = RecordManager(
+                self.game_count, self.session_id,  # 傳遞 session_id
+                store=self.record_store, num_players=self.num_players)
+            self.current_log_directory = self.record_manager.get_log_directory_path()
         # 偵錯輸出
         # print(
         #     f"DEBUG: Log directory for this session: {self.current_log_directory}")
 
+        self.events = []
+        self._emit(GameStarted(self.num_players))
+
         # 抽取目標牌
-        self.target_card = self._draw_target_card()
-        self.record_manager.update_target_card(self.target_card)
+        self._emit(TargetDrawn(self._draw_target_card()))
+        if self.record_manager:
+            self.record_manager.update_target_card(self.target_card)
 
         # 發牌並設置初始狀態
         deck = create_deck()
-        hands = shuffle_and_deal(deck, self.num_players)
-        for i in range(self.num_players):
-            self.players[i].hand = hands[f"p{i}"]
-            self.players[i].bullet_pos = random.randint(1, 6)
-            self.players[i].alive = True
+        hands = shuffle_and_deal(deck, self.num_players, self.rng)
+        self._emit(CardsDealt(
+            hands=tuple(tuple(hands[f"p{i}"]) for i in range(self.num_players)),
+            bullets=tuple(self.rng.randint(1, GUN_CHAMBERS) for _ in range(self.num_players)),
+            reset_guns=False
+        ))
 
         # 新增：根據 kill_player_on_start 設定玩家死亡狀態
         if self.kill_player_on_start is not None and 0 <= self.kill_player_on_start < self.num_players:
             player_to_kill = self.players[self.kill_player_on_start]
             if player_to_kill.alive:  # 確保只 "殺死" 活著的玩家一次
-                player_to_kill.alive = False
-                print(f"DEBUG: 玩家 {player_to_kill.id} 已在遊戲開始時被設定為死亡狀態。")
+                self._emit(PlayerEliminated(player_to_kill.id))
+                self._print(f"DEBUG: 玩家 {player_to_kill.id} 已在遊戲開始時被設定為死亡狀態。")
                 # 可以在此處添加日誌記錄，如果 RecordManager 已經初始化且可用
                 if self.record_manager:
                     self.record_manager.log_action(
@@ -89,11 +129,6 @@ class Game:
                         strategy='N/A'
                     )
 
-        # 初始化遊戲數據
-        self.current_idx = 0
-        self.last_player_idx = None
-        self.round_count = 1
-
         return self.get_game_state()
 
     def next(self, player_decision: Dict):
@@ -109,71 +144,74 @@ class Game:
             # print("DEBUG played_cards before validate:", played_cards)
             valid, msg = validate_played_cards(played_cards, current.hand)
             if not valid:
-                print(f"出牌無效: {msg}")
+                self._print(f"出牌無效: {msg}")
                 return self.get_game_state()
 
-            # 移除出的牌
-            for card in played_cards:
-                current.hand.remove(card)
+            # 移除出的牌並記為上家出牌
+            self._emit(CardsPlayed(current.id, tuple(played_cards)))
 
             # 記錄動作
-            self.record_manager.log_action(
-                player_id=current.id,
-                action_type='play',
-                cards_played=played_cards,
-                cards_remaining=current.hand,
-                shots_fired=current.shots_fired,
-                behavior=behavior,
-                strategy=strategy,
-                bullet_pos=current.bullet_pos if self.debug else None
-            )
-
-            self.last_play_cards = played_cards
-            self.last_player_idx = current.id
+            if self.record_manager:
+                self.record_manager.log_action(
+                    player_id=current.id,
+                    action_type='play',
+                    cards_played=played_cards,
+                    cards_remaining=current.hand,
+                    shots_fired=current.shots_fired,
+                    behavior=behavior,
+                    strategy=strategy,
+                    bullet_pos=current.bullet_pos if self.debug else None
+                )
+
+            next_idx = None
 
             # 檢查是否出完所有牌
             if len(current.hand) == 0:
-                print(f"p{current.id} 出完所有牌，系統對其自動質疑")
+                self._print(f"p{current.id} 出完所有牌，系統對其自動質疑")
                 is_cheating = not all(
                     card in [self.target_card, 'J'] for card in played_cards)
+                self._emit(Challenged(None, current.id, is_cheating))
 
                 if is_cheating:
-                    print(f"質疑成功！p{current.id} 被系統發現出了非目標牌")
+                    self._print(f"質疑成功！p{current.id} 被系統發現出了非目標牌")
                     hit = self._russian_roulette(current.id)
                 else:
-                    print(f"質疑失敗！p{current.id} 所出的牌全部是目標牌或萬能牌")
+                    self._print(f"質疑失敗！p{current.id} 所出的牌全部是目標牌或萬能牌")
 
                 if self._reset_game_state():
                     return self.get_game_state()
 
             # 更新下一輪玩家
-            self.current_idx = self._get_next_player_idx(self.current_idx)
+            next_idx = self._get_next_player_idx(self.current_idx)
 
         elif action == 'challenge':
             # 處理質疑
             if self.last_player_idx is None or not self.last_play_cards:
-                print("錯誤：沒有可質疑的上一輪出牌")
+                self._print("錯誤：沒有可質疑的上一輪出牌")
                 return self.get_game_state()
 
             is_cheating = not all(card in [self.target_card, 'J']
                                   for card in self.last_play_cards)
-            print(f"質疑結果: {'成功' if is_cheating else '失敗'}")
+            self._print(f"質疑結果: {'成功' if is_cheating else '失敗'}")
+            self._emit(Challenged(current.id, self.last_player_idx, is_cheating))
 
             # 記錄動作
-            self.record_manager.log_action(
-                player_id=current.id,
-                action_type='challenge',
-                cards_played=[],
-                cards_remaining=current.hand,
-                shots_fired=current.shots_fired,
-                behavior=behavior,
-                strategy=player_decision.get('challenge_reason', ''),
-                bullet_pos=current.bullet_pos if self.debug else None
-            )
+            if self.record_manager:
+                self.record_manager.log_action(
+                    player_id=current.id,
+                    action_type='challenge',
+                    cards_played=[],
+                    cards_remaining=current.hand,
+                    shots_fired=current.shots_fired,
+                    behavior=behavior,
+                    strategy=player_decision.get('challenge_reason', ''),
+                    bullet_pos=current.bullet_pos if self.debug else None,
+                    success=is_cheating
+                )
 
             # 根據質疑結果決定誰開槍
             shooter_idx = self.last_player_idx if is_cheating else current.id
-            print(f"p{shooter_idx} 將進行俄羅斯輪盤...")
+            self._print(f"p{shooter_idx} 將進行俄羅斯輪盤...")
             hit = self._russian_roulette(shooter_idx)
 
             if self._reset_game_state():
@@ -181,33 +219,115 @@ class Game:
 
             # 更新下一位玩家
             if self.players[shooter_idx].alive:
-                self.current_idx = shooter_idx
+                next_idx = shooter_idx
             else:
-                self.current_idx = self._get_next_player_idx(shooter_idx)
+                next_idx = self._get_next_player_idx(shooter_idx)
+
+        else:
+            # 其他動作不換人，只推進回合數
+            next_idx = self.current_idx
 
-        self.round_count += 1
-        self.record_manager.next_round()
+        self._emit(TurnPassed(next_idx))
+        if self.record_manager:
+            self.record_manager.next_round()
         return self.get_game_state()
 
-    def _get_next_game_count(self) -> int:
-        """獲取下一局遊戲的編號"""
-        try:
-            with open("log/game_info.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-            game_count = data.get("game_count", 0) + 1
-        except (FileNotFoundError, json.JSONDecodeError):
-            game_count = 1
-            os.makedirs("log", exist_ok=True)
-            data = {"game_count": game_count}
+    def _emit(self, event):
+        """附加事件到事件串流並套用到目前狀態"""
+        self.events.append(event)
+        apply_event(self, event)
+        self._state_generation += 1
+
+    def invalidate_state(self):
+        """不經由 _emit 直接修改狀態後呼叫：先前取得的視圖失效，下一次 get_game_state() 重新建立"""
+        self._state_generation += 1
+
+    @classmethod
+    def from_events(cls, events: List, **kwargs) -> "Game":
+        """由事件串流重建遊戲（當機復原用），不重新呼叫 AI 決策也不寫記錄"""
+        num_players = events[0].num_players
+        kwargs.setdefault("verbose", False)
+        kwargs.setdefault("record_logs", False)
+        kwargs.setdefault("human_player_index", -1)
+        game = cls(num_players=num_players, **kwargs)
+        replay(events, game)
+        game.events = list(events)
+        game.invalidate_state()
+        return game
+
+    def snapshot(self) -> GameSnapshot:
+        """擷取目前狀態（不含記錄管理器、玩家歷史與評價）"""
+        return GameSnapshot(
+            target_card=self.target_card,
+            current_idx=self.current_idx,
+            round_count=self.round_count,
+            last_play_cards=tuple(self.last_play_cards),
+            last_player_idx=self.last_player_idx,
+            players=tuple((tuple(p.hand), p.alive, p.bullet_pos, p.gun_pos, p.shots_fired)
+                          for p in self.players),
+            num_events=len(self.events)
+        )
 
-        with open("log/game_info.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+    def restore(self, snapshot: GameSnapshot):
+        """
+        回復到快照時的狀態，並截斷之後的事件
+        不會回寫或刪除已輸出的記錄檔；需要探索分支時請在 fork() 出來的遊戲上操作
+        """
+        self.target_card = snapshot.target_card
+        self.current_idx = snapshot.current_idx
+        self.round_count = snapshot.round_count
+        self.last_play_cards = list(snapshot.last_play_cards)
+        self.last_player_idx = snapshot.last_player_idx
+        for player, (hand, alive, bullet_pos, gun_pos, shots_fired) in zip(self.players, snapshot.players):
+            player.hand = list(hand)
+            player.alive = alive
+            player.bullet_pos = bullet_pos
+            player.gun_pos = gun_pos
+            player.shots_fired = shots_fired
+        del self.events[snapshot.num_events:]
+        self._state_generation += 1
+
+    def fork(self, rng: Optional[random.Random] = None) -> "Game":
+        """
+        複製出一個獨立的遊戲分支，供前瞻搜尋與「如果當時質疑」分析使用
+        分支不輸出訊息、不寫記錄，玩家的 play_history 與 opinions 為空；
+        未指定 rng 時與原遊戲共用亂數產生器（避免建立新產生器的成本）
+        """
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game.verbose = False
+        game.record_logs = False
+        game.record_manager = None
+        game.current_log_directory = None
+        game._state_view = None
+        if rng is not None:
+            game.rng = rng
+        game.last_play_cards = list(self.last_play_cards)
+        game.events = list(self.events)
+
+        players = []
+        for p in self.players:
+            player = Player.__new__(Player)
+            player.__dict__.update(p.__dict__)
+            player.hand = list(p.hand)
+            player.play_history = []
+            player.opinions = {}
+            players.append(player)
+        game.players = players
+        return game
+
+    def _print(self, *args, **kwargs):
+        """僅在 verbose 模式下輸出訊息"""
+        if self.verbose:
+            print(*args, **kwargs)
 
-        return game_count
+    def _get_next_game_count(self) -> int:
+        """獲取下一局遊戲的編號（跨進程安全，見 utils.game_id）"""
+        return next_game_id()
 
     def _draw_target_card(self) -> str:
         """抽取目標牌"""
-        return random.choice(["A", "K", "Q"])
+        return self.rng.choice(TARGET_CARDS)
 
     def _get_next_player_idx(self, idx: int) -> int:
         """獲取下一位活著的玩家索引"""
@@ -220,25 +340,26 @@ class Game:
         """玩家進行俄羅斯輪盤"""
         player = self.players[player_idx]
         is_hit = player.bullet_pos == player.gun_pos
-        player.gun_pos = (player.gun_pos % 6) + 1
-        player.shots_fired += 1
+        self._emit(ShotFired(player_idx, is_hit))
 
-        print(f"p{player_idx} {'中彈！' if is_hit else '倖存！'}")
+        self._print(f"p{player_idx} {'中彈！' if is_hit else '倖存！'}")
 
         if is_hit:
-            player.alive = False
-            print(f"p{player_idx} 已出局！")
+            self._emit(PlayerEliminated(player_idx))
+            self._print(f"p{player_idx} 已出局！")
 
         # 記錄開槍動作
-        self.record_manager.log_action(
-            player_id=player_idx,
-            action_type='shoot',
-            cards_played=[],
-            cards_remaining=player.hand,
-            shots_fired=player.shots_fired,
-            behavior='進行俄羅斯輪盤',
-            bullet_pos=player.bullet_pos if self.debug else None
-        )
+        if self.record_manager:
+            self.record_manager.log_action(
+                player_id=player_idx,
+                action_type='shoot',
+                cards_played=[],
+                cards_remaining=player.hand,
+                shots_fired=player.shots_fired,
+                behavior='進行俄羅斯輪盤',
+                bullet_pos=player.bullet_pos if self.debug else None,
+                hit=is_hit
+            )
 
         return is_hit
 
@@ -246,76 +367,54 @@ class Game:
         """重置遊戲狀態"""
         alive_count = sum(1 for p in self.players if p.alive)
         if alive_count <= 1:
+            if self.record_manager:
+                winner = next((p.id for p in self.players if p.alive), None)
+                self.record_manager.close(winner)
             return True
 
-        print("\n===== 重新洗牌與發牌 =====\n")
+        self._print("\n===== 重新洗牌與發牌 =====\n")
+        self._emit(RoundReset())
 
-        self.target_card = self._draw_target_card()
-        self.record_manager.update_target_card(self.target_card)
-        print(f"新目標牌：{self.target_card}")
+        self._emit(TargetDrawn(self._draw_target_card()))
+        if self.record_manager:
+            self.record_manager.update_target_card(self.target_card)
+        self._print(f"新目標牌：{self.target_card}")
 
         deck = create_deck()
         alive_players = [p for p in self.players if p.alive]
-        print(f"DEBUG: _reset_game_state - 存活玩家數量: {len(alive_players)}")
-        hands = shuffle_and_deal(deck, len(alive_players))
+        self._print(f"DEBUG: _reset_game_state - 存活玩家數量: {len(alive_players)}")
+        hands = shuffle_and_deal(deck, len(alive_players), self.rng)
         # print(
         # f"DEBUG: _reset_game_state - shuffle_and_deal 返回的 hands: {hands}")
 
+        new_hands = [None] * self.num_players
+        bullets = [None] * self.num_players
+        for i, player in enumerate(alive_players):
+            new_hands[player.id] = tuple(hands[f"p{i}"])
+            bullets[player.id] = self.rng.randint(1, GUN_CHAMBERS)
+        self._emit(CardsDealt(hands=tuple(new_hands), bullets=tuple(bullets), reset_guns=True))
+
         for i, player in enumerate(alive_players):
-            player.hand = hands[f"p{i}"]
-            player.bullet_pos = random.randint(1, 6)
-            player.gun_pos = 1
             # print(
             #     f"DEBUG: _reset_game_state - 玩家 {player.id} (alive_players[{i}]) 被分配到手牌: {player.hand} (數量: {len(player.hand)})")
 
             if i == 0 and self.human_player_index == player.id:
-                print(f"你的新手牌: {player.hand} | 子彈位置: {player.bullet_pos}")
+                self._print(f"你的新手牌: {player.hand} | 子彈位置: {player.bullet_pos}")
             elif self.debug:
-                print(
+                self._print(
                     f"p{player.id} 的新手牌: {player.hand} | 子彈位置: {player.bullet_pos}")
 
-        self.last_play_cards = []
-        self.last_player_idx = None
         return False
 
-    def get_game_state(self) -> Dict:
-        """獲取當前遊戲狀態的完整描述"""
-        current_player = self.players[self.current_idx]
-
-        # 安全地處理 last_play 資訊
-        last_play = None
-        if self.last_player_idx is not None and self.last_play_cards:
-            last_play = {
-                "player_id": self.last_player_idx,
-                "cards": self.last_play_cards
-            }
-
-        return {
-            "game_count": self.game_count,
-            "round_count": self.round_count,
-            "target_card": self.target_card,
-            "players": self.players,  # 傳遞完整的 Player 物件列表
-            "current_player": {  # 提供當前玩家的簡化資訊
-                "id": current_player.id,
-                "hand": current_player.hand,
-                "bullet_pos": current_player.bullet_pos,
-                "gun_pos": current_player.gun_pos,
-                "shots_fired": current_player.shots_fired
-            },
-            "last_play": last_play,
-            "last_player_idx": self.last_player_idx,  # 為了相容舊的 AI 邏輯，可考慮移除
-            "last_play_cards": self.last_play_cards,  # 為了相容舊的 AI 邏輯，可考慮移除
-            "available_actions": self._get_available_actions(),
-            "alive_players": [p.id for p in self.players if p.alive],
-            "players_stats": [{  # 提供所有玩家的統計資訊，AI 可能會用到
-                "id": p.id,
-                "alive": p.alive,
-                "hand_count": len(p.hand),
-                "shots_fired": p.shots_fired
-            } for p in self.players],
-            "record_manager": self.record_manager,  # AI 可能需要用 RecordManager 的方法
-            "current_log_directory": self.current_log_directory  # 新增：當前記錄目錄
-        }
+    def get_game_state(self) -> GameStateView:
+        """
+        獲取當前遊戲狀態的完整描述（唯讀的 Mapping，鍵見 core.state_view）
+        各欄位在讀取時才計算；狀態沒有變更時（例如無效出牌後）返回同一個視圖
+        """
+        view = self._state_view
+        if view is None or view._generation != self._state_generation:
+            view = self._state_view = GameStateView(self)
+        return view
 
     def _get_available_actions(self) -> List[str]:
         """獲取當前可用的動作列表"""
@@ -413,7 +512,7 @@ class Game:
 
         # 初始化命令行界面，傳遞 AI 策略參數
         try:
-            cli = GameCLI(self, self.ai_strategy, self.interactive_pause)
+            cli = GameCLI(self, self.ai_strategy, self.interactive_pause, self.ai_model_path)
             # 初始化事件處理器
             event_handler = EventHandler(self, cli)
 
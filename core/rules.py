@@ -1,5 +1,7 @@
 from typing import List, Dict, Tuple, Optional
 from models.player import Player
+from models.packed_state import pack_hand
+from utils.move_table import is_legal_play
 
 
 class Rules:
@@ -21,8 +23,8 @@ class Rules:
         if invalid_cards:
             return False, f"無效的牌: {invalid_cards}"
 
-        # 檢查是否擁有這些牌
-        if not all(card in player.hand for card in cards):
+        # 檢查是否擁有這些牌（查表，含張數檢查）
+        if not is_legal_play(pack_hand(player.hand), pack_hand(cards)):
             return False, "你沒有這些牌"
 
         return True, ""
@@ -0,0 +1,144 @@
+# liars_bar/core/state_view.py
+"""
+唯讀的遊戲狀態視圖
+
+Game.get_game_state() 以前每次呼叫都重新建立完整的狀態字典（玩家統計、存活玩家、可用動作……），
+無效出牌後也一樣，而大部分策略只會讀其中兩三個欄位。GameStateView 實作 Mapping 介面，
+鍵與舊字典相同，每個欄位在第一次讀取時才計算並快取；狀態沒有變更時重複呼叫返回同一個視圖。
+
+髒標記：Game 每次狀態變更都遞增世代編號，視圖記下建立時的世代。
+狀態變更後舊視圖的欄位（不論是否已快取）可能描述不同時間點，因此舊視圖的任何讀取都拋出
+StaleStateError，請重新呼叫 get_game_state()；需要保留某一時間點的狀態時，
+在變更前用 copy() 取得一般字典（與舊字典相同，玩家物件與手牌列表仍與遊戲共享）。
+"""
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def _current_player(view: "GameStateView") -> Dict:
+    """當前玩家的簡化資訊"""
+    player = view._game.players[view._game.current_idx]
+    return {
+        "id": player.id,
+        "hand": player.hand,
+        "bullet_pos": player.bullet_pos,
+        "gun_pos": player.gun_pos,
+        "shots_fired": player.shots_fired
+    }
+
+
+def _last_play(view: "GameStateView") -> Optional[Dict]:
+    game = view._game
+    if game.last_player_idx is None or not game.last_play_cards:
+        return None
+    return {"player_id": game.last_player_idx, "cards": game.last_play_cards}
+
+
+def _player_stats(player) -> Dict:
+    return {
+        "id": player.id,
+        "alive": player.alive,
+        "hand_count": len(player.hand),
+        "shots_fired": player.shots_fired
+    }
+
+
+# 鍵 -> 計算該欄位的函式，計算結果快取在視圖中；None 表示直接讀取 Game 的同名屬性
+# （順序即迭代順序，與舊字典相同）
+_FIELDS: Dict[str, Optional[Callable[["GameStateView"], Any]]] = {
+    "game_count": None,
+    "round_count": None,
+    "target_card": None,
+    "players": None,  # 完整的 Player 物件列表
+    "current_player": _current_player,
+    "last_play": _last_play,
+    "last_player_idx": None,  # 為了相容舊的 AI 邏輯
+    "last_play_cards": None,  # 為了相容舊的 AI 邏輯
+    "available_actions": lambda view: view._game._get_available_actions(),
+    "alive_players": lambda view: [p.id for p in view._game.players if p.alive],
+    "players_stats": lambda view: [view.player_stats(p.id) for p in view._game.players],
+    "events": None,  # 事件串流（唯讀），供策略增量更新對手模型
+    "record_manager": None,
+    "current_log_directory": None,
+}
+_MISSING = object()
+
+
+class StaleStateError(RuntimeError):
+    """讀取的狀態視圖在建立之後遊戲狀態已變更"""
+
+
+class GameStateView(Mapping):
+    """延遲計算並快取各欄位的唯讀狀態視圖"""
+    __slots__ = ("_game", "_generation", "_values", "_stats")
+
+    def __init__(self, game):
+        self._game = game
+        self._generation = game._state_generation
+        self._values: Dict[str, Any] = {}
+        self._stats: Dict[int, Dict] = {}  # 玩家 ID -> 玩家統計（只建立查過的玩家）
+
+    @property
+    def stale(self) -> bool:
+        """建立之後遊戲狀態是否已變更"""
+        return self._generation != self._game._state_generation
+
+    def _check(self):
+        if self._generation != self._game._state_generation:
+            raise StaleStateError("遊戲狀態已變更，請重新呼叫 get_game_state()")
+
+    def __getitem__(self, key: str) -> Any:
+        if self._generation != self._game._state_generation:
+            raise StaleStateError("遊戲狀態已變更，請重新呼叫 get_game_state()")
+        value = self._values.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        compute = _FIELDS.get(key, _MISSING)
+        if compute is None:
+            return getattr(self._game, key)
+        if compute is _MISSING:
+            raise KeyError(key)
+        value = self._values[key] = compute(self)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # 避免 Mapping.get 以例外處理不存在的鍵
+        if key not in _FIELDS:
+            return default
+        return self[key]
+
+    def __contains__(self, key) -> bool:
+        # 判斷鍵是否存在不需要計算欄位
+        return key in _FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"GameStateView(round_count={self._game.round_count}, current_idx={self._game.current_idx})"
+
+    def copy(self) -> Dict:
+        """計算所有欄位，返回一般字典（可修改）"""
+        return dict(self.items())
+
+    def player_stats(self, player_id: int) -> Optional[Dict]:
+        """
+        以玩家 ID 取得玩家統計（與 players_stats 中的項目為同一個字典）
+        找不到該玩家時返回 None
+        """
+        self._check()
+        stats = self._stats.get(player_id)
+        if stats is None:
+            players = self._game.players
+            # 玩家列表以 ID 為索引；不符時才逐一比對
+            if 0 <= player_id < len(players) and players[player_id].id == player_id:
+                player = players[player_id]
+            else:
+                player = next((p for p in players if p.id == player_id), None)
+                if player is None:
+                    return None
+            stats = self._stats[player_id] = _player_stats(player)
+        return stats
@@ -14,6 +14,9 @@ from collections import Counter
 import ast
 import random
 from models.player import Player  # 添加 Player 類別的導入
+from models.packed_state import pack_hand
+from utils.move_table import is_legal_play
+from utils.log_context import get_log_context
 
 # toggle debug here
 DEBUG = False
@@ -79,7 +82,10 @@ def validate_played_cards(played_cards, self_hand, action="play"):
     if not all(card in valid_cards for card in played_cards):
         return False, f"出現不合法的卡片: {played_cards}"
 
-    # 3. 檢查是否超出手牌可出張數
+    # 3. 檢查是否超出手牌可出張數（先查表，失敗時才計算詳細訊息）
+    if is_legal_play(pack_hand(self_hand), pack_hand(played_cards)):
+        return True, ""
+
     hand_counter = Counter(self_hand)
     play_counter = Counter(played_cards)
     for card, count in play_counter.items():
@@ -135,8 +141,8 @@ def ai_selection_langchain(game_state: GameState, player_id: int, round_count: i
     try:
         # 偵錯輸出
         # print(f"DEBUG: Attempting to read log file from: {log_file_path}")
-        with open(log_file_path, "r", encoding="utf-8") as f:
-            round_log = f.read()
+        # 只讀取上次之後新增的部分
+        round_log = get_log_context(log_file_path).text()
     except FileNotFoundError:
         round_log = "尚未有回合記錄"
         print(f"DEBUG: Log file not found at: {log_file_path}")  # 偵錯輸出
@@ -282,12 +288,10 @@ def review_players(
     # 根據是否為大輪結束選擇不同的記錄來源
     if is_end_of_round:
         # 如果是大輪結束，讀取完整的 game_steps.md
-        with open(f"log/round_{game_count}/game_steps.md", "r", encoding="utf-8") as f:
-            game_log = f.read()
+        game_log = get_log_context(f"log/round_{game_count}/game_steps.md").text()
     else:
         # 如果是輪內整理，讀取 ai_round_context.md
-        with open(f"log/round_{game_count}/ai_round_context.md", "r", encoding="utf-8") as f:
-            game_log = f.read()
+        game_log = get_log_context(f"log/round_{game_count}/ai_round_context.md").text()
 
     player_txts = [
         open(f"prompt/player/{k}.txt", encoding="utf-8").read()
@@ -9,6 +9,8 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from string import Template
+from utils.game_id import next_game_id
+from utils.log_context import get_log_context, release_log_directory
 
 
 @dataclass
@@ -125,15 +127,9 @@ class GameLogger:
         # 初始化 LLM
         llm = ChatOpenAI(temperature=0.7)
 
-        # 讀取玩家視角日誌，但只讀取最後 5 個回合
-        with open(f"log/game_{self.game_count}/player_perspective.md", "r", encoding="utf-8") as f:
-            log_content = f.read()
-
-        # 只保留最後 5 個回合的內容
-        rounds = log_content.split("## 回合")
-        if len(rounds) > 5:
-            recent_rounds = rounds[-5:]
-            log_content = "## 回合" + "## 回合".join(recent_rounds)
+        # 讀取玩家視角日誌的最後 5 個回合（增量讀取，不重讀整個檔案）
+        log_content = get_log_context(
+            f"log/game_{self.game_count}/player_perspective.md").last_rounds(5)
 
         # 簡化提示模板
         template = """分析以下遊戲日誌，生成玩家 {observer_id} 對玩家 {target_id} 的印象。
@@ -397,16 +393,8 @@ class GameLogger:
 
 def init():
     """初始化記錄環境"""
-    # 讀取當前局數
-    with open("log/game_info.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    data["game_count"] += 1           # 修改記憶體中的值
-    game_count = data["game_count"]  # 保留原始值
-
-    # 寫入更新過的 JSON
-    with open("log/game_info.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    # 取得下一局的局數（跨進程安全，見 utils.game_id）
+    game_count = next_game_id()
 
     # 建立新的遊戲目錄
     os.makedirs(f"log/game_{game_count}", exist_ok=True)
@@ -557,6 +545,10 @@ def log_game_end_summary(game_count: int, winner: str, player_rounds: list, play
         f.write("\n")
         f.write(record)
 
+    # 一局結束：釋放 AI 決策讀取本局記錄時快取的內容
+    release_log_directory(f"log/round_{game_count}")
+    release_log_directory(f"log/game_{game_count}")
+
 
 def log_player_perspective(game_count: int, round_count: int, player: int, shoot_count: int, play_card_count: int, behavior: str):
     """
@@ -587,8 +579,7 @@ def log_next_round_context(game_count: int, sum_round_count: int, player_list: l
     """
     with open("log/example/next_round_context_template.md", "r", encoding="utf-8") as f:
         example = f.read()
-    with open(f"log/round_{game_count}/game_steps.md", "r", encoding="utf-8") as f:
-        game_step = f.read()
+    game_step = get_log_context(f"log/round_{game_count}/game_steps.md").text()
 
     record = Template(example).substitute({
         "game_count": game_count,
@@ -2,6 +2,8 @@ import random
 from typing import List, Dict, Tuple
 import datetime
 from collections import Counter
+from models.packed_state import pack_hand
+from utils.move_table import is_legal_play
 
 
 def create_deck() -> List[str]:
@@ -29,7 +31,10 @@ def validate_played_cards(cards: List[str], hand: List[str]) -> Tuple[bool, str]
     if not all(card in valid_cards for card in cards):
         return False, f"出現不合法的牌型: {[card for card in cards if card not in valid_cards]}"
 
-    # 3. 檢查手牌中是否有足夠的牌
+    # 3. 檢查手牌中是否有足夠的牌（先查表，失敗時才計算詳細訊息）
+    if is_legal_play(pack_hand(hand), pack_hand(cards)):
+        return True, ""
+
     hand_counter = Counter(hand)
     play_counter = Counter(cards)
 
@@ -1,6 +1,6 @@
 import os
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from models.player import PlayerType
 from ai.decision import AIDecisionMaker
 
@@ -8,10 +8,15 @@ from ai.decision import AIDecisionMaker
 class GameCLI:
     """命令行遊戲界面"""
 
-    def __init__(self, game, ai_strategy="rule", interactive_pause: bool = True):
-        """初始化界面"""
+    def __init__(self, game, ai_strategy="rule", interactive_pause: bool = True,
+                 model_path: Optional[str] = None):
+        """初始化界面；model_path 為學習型 AI 的對手模型檔"""
         self.game = game
-        self.ai_decision_maker = AIDecisionMaker(strategy_type=ai_strategy)
+        self.ai_decision_maker = AIDecisionMaker(strategy_type=ai_strategy, model_path=model_path)
+        # 所有 AI 座位由同一個決策器控制，視為同一個對手；人類玩家跨局以 "human" 辨識
+        self.ai_decision_maker.set_opponents([
+            "human" if p.player_type == PlayerType.HUMAN else f"ai_{ai_strategy}"
+            for p in game.players])
         self.interactive_pause = interactive_pause
 
     def clear_screen(self):
@@ -160,6 +165,7 @@ class GameCLI:
         self.clear_screen()
 
         print("\n===== 遊戲結束 =====")
+        self.ai_decision_maker.observe(self.game.get_game_state())
         winner = self.game.get_winner()
 
         if winner is not None:
@@ -1,5 +1,6 @@
 # main.py
 from core.game import Game
+from utils.record_store import get_record_store
 import argparse
 import os
 import sys
@@ -19,14 +20,170 @@ def main():
                         default=0, help="人類玩家編號 (0-3)")
     parser.add_argument("--debug", action="store_true", help="啟用調試模式")
     parser.add_argument("--ai_strategy", type=str,
-                        default="llm", help="AI策略類型 (random/rule/llm/learning)")
+                        default="llm", help="AI策略類型 (random/rule/llm/learning/ev/mcts/solver/endgame)")
     parser.add_argument("--kill_on_start", type=int, default=None,
                         help="指定一個玩家 ID (0-indexed) 在遊戲開始時被殺死 (偵錯用)")
     parser.add_argument("--no_interactive_pause", action="store_false", dest="interactive_pause",
                         help="執行時不啟用'按Enter繼續'的提示")
+    parser.add_argument("--record_db", type=str, default=None,
+                        help="同時將記錄寫入此 SQLite 記錄庫（例如 log/records.db）")
+    parser.add_argument("--ai_model", type=str, default=None,
+                        help="學習型 AI 的對手模型檔，啟動時載入、每局結束後寫回")
     parser.set_defaults(interactive_pause=True)
+
+    # 無頭批次模擬子命令
+    subparsers = parser.add_subparsers(dest="command")
+    simulate_parser = subparsers.add_parser("simulate", help="無頭批次模擬 AI 對戰")
+    simulate_parser.add_argument("--games", type=int, default=1000,
+                                 help="模擬局數")
+    simulate_parser.add_argument("--strategies", type=str, default="rule,random,rule,random",
+                                 help="每個座位的策略，以逗號分隔 (random/rule/learning/ev/solver/endgame)")
+    simulate_parser.add_argument("--max_turns", type=int, default=10000,
+                                 help="單局最大回合數")
+    simulate_parser.add_argument("--vectorized", action="store_true",
+                                 help="使用 NumPy 向量化模擬器 (僅支援 random/rule)")
+    simulate_parser.add_argument("--batch_size", type=int, default=100000,
+                                 help="向量化模擬時同時進行的局數")
+    simulate_parser.add_argument("--seed", type=int, default=None,
+                                 help="根亂數種子，相同種子可重現整批模擬")
+    simulate_parser.add_argument("--replay", type=int, default=None,
+                                 help="以 --seed 重播指定編號的單局並顯示過程")
+    simulate_parser.add_argument("--model_path", type=str, default=None,
+                                 help="學習型策略的對手模型檔，作為每局開始時的模型")
+    simulate_parser.add_argument("--carry_models", action="store_true",
+                                 help="對手模型跨局累積並寫回 --model_path（各局不再能單獨重播）")
+
+    # 多進程錦標賽子命令
+    tournament_parser = subparsers.add_parser("tournament", help="多進程 AI 策略錦標賽")
+    tournament_parser.add_argument("--games", type=int, default=100,
+                                   help="每個陣容的模擬局數")
+    tournament_parser.add_argument("--strategies", type=str, default="random,rule,learning",
+                                   help="參賽策略，以逗號分隔 (random/rule/learning/ev/solver/endgame)")
+    tournament_parser.add_argument("--players", type=int, default=4,
+                                   help="每局玩家數量 (2-4)")
+    tournament_parser.add_argument("--workers", type=int, default=None,
+                                   help="工作進程數，預設為 CPU 核心數")
+    tournament_parser.add_argument("--batch_size", type=int, default=200,
+                                   help="每個任務的局數")
+    tournament_parser.add_argument("--seed", type=int, default=None,
+                                   help="根亂數種子，相同種子可重現整場錦標賽")
+    tournament_parser.add_argument("--ratings", type=str, default=None,
+                                   help="評分排行榜 JSON 檔，存在時接續更新，結束後寫回")
+    tournament_parser.add_argument("--model_path", type=str, default=None,
+                                   help="學習型策略的對手模型檔，作為每局開始時的模型（不寫回）")
+    tournament_parser.add_argument("--stop_z", type=float, default=None,
+                                   help="名次在此倍數標準差下確定後提前停止（例如 1.96）")
+
+    # CFR 離線求解子命令
+    solve_parser = subparsers.add_parser("solve", help="以 MCCFR 求解 solver 策略表")
+    solve_parser.add_argument("--iterations", type=int, default=1000000,
+                              help="本次執行的迭代次數")
+    solve_parser.add_argument("--workers", type=int, default=1,
+                              help="工作進程數，大於 1 時以共享記憶體平行抽樣")
+    solve_parser.add_argument("--batch_size", type=int, default=20000,
+                              help="每個任務的迭代次數")
+    solve_parser.add_argument("--output", type=str, default=None,
+                              help="策略表輸出路徑，預設為 config/solver_policy.npz")
+    solve_parser.add_argument("--checkpoint", type=str, default=None,
+                              help="檢查點路徑；檔案存在時從檢查點續跑")
+    solve_parser.add_argument("--checkpoint_every", type=float, default=600.0,
+                              help="寫出檢查點的間隔秒數")
+    solve_parser.add_argument("--seed", type=int, default=None,
+                              help="根亂數種子")
+
+    # 兩人殘局資料庫子命令
+    endgame_parser = subparsers.add_parser("endgame", help="建立兩人殘局資料庫")
+    endgame_parser.add_argument("--output", type=str, default=None,
+                                help="資料庫輸出路徑，預設為 config/endgame_tablebase.npy")
+    endgame_parser.add_argument("--workers", type=int, default=None,
+                                help="工作進程數，預設為 CPU 核心數")
+
+    # 效能基準子命令
+    bench_parser = subparsers.add_parser("bench", help="執行效能基準並與基準線比較")
+    bench_parser.add_argument("--output", type=str, default="bench_results.json",
+                              help="結果 JSON 輸出路徑")
+    bench_parser.add_argument("--baseline", type=str, default=None,
+                              help="基準線 JSON，提供時標記退步的項目")
+    bench_parser.add_argument("--threshold", type=float, default=0.1,
+                              help="視為退步的耗時增加比例")
+    bench_parser.add_argument("--only", type=str, default=None,
+                              help="只執行名稱以這些前綴開頭的基準，以逗號分隔")
+    bench_parser.add_argument("--repeat", type=int, default=5,
+                              help="每個基準的重複量測次數")
+    bench_parser.add_argument("--scale", type=float, default=1.0,
+                              help="操作次數的縮放比例（例如 0.1 為快速檢查）")
+
+    # 記錄渲染子命令
+    render_parser = subparsers.add_parser("render", help="將一局的 events.jsonl 渲染成 Markdown 記錄")
+    render_parser.add_argument("log_dir", type=str,
+                               help="記錄目錄，例如 log/game_1_20250101_120000")
+    render_parser.add_argument("--perspective", type=str, default=None,
+                               help="只渲染此視角 (round/player/god)，並輸出到標準輸出")
+    render_parser.add_argument("--force", action="store_true",
+                               help="即使 Markdown 檔已是最新也重新渲染")
+
+    # 記錄庫匯入子命令
+    index_parser = subparsers.add_parser("index", help="將記錄目錄匯入 SQLite 記錄庫")
+    index_parser.add_argument("log_root", type=str, nargs="?", default="log",
+                              help="包含 game_<編號>_<session> 目錄的記錄根目錄")
+    index_parser.add_argument("--db", type=str, default=None,
+                              help="記錄庫路徑，預設為 log/records.db")
+
+    # 欄式匯出子命令
+    export_parser = subparsers.add_parser("export", help="將已結束的對局匯出成欄式 NumPy 分片")
+    export_parser.add_argument("log_root", type=str, nargs="?", default="log",
+                               help="包含 game_<編號>_<session> 目錄的記錄根目錄")
+    export_parser.add_argument("--output", type=str, default="export/actions",
+                               help="輸出目錄（已匯出的對局會略過）")
+    export_parser.add_argument("--shard_rows", type=int, default=1000000,
+                               help="每個分片的列數上限")
+    export_parser.add_argument("--include_unfinished", action="store_true",
+                               help="也匯出沒有結束記錄的對局")
+
+    # 記錄封存子命令
+    archive_parser = subparsers.add_parser("archive", help="將已結束的記錄目錄封存成壓縮檔")
+    archive_parser.add_argument("log_root", type=str, nargs="?", default="log",
+                                help="包含 game_* 目錄的記錄根目錄")
+    archive_parser.add_argument("--games_per_bundle", type=int, default=100,
+                                help="每個壓縮檔的局數")
+    archive_parser.add_argument("--min_age", type=float, default=60.0,
+                                help="目錄至少多少秒沒有變動才封存")
+    archive_parser.add_argument("--all", action="store_true",
+                                help="不足一個壓縮檔的剩餘局數也一併封存")
+    archive_parser.add_argument("--watch", type=float, default=None,
+                                help="持續執行，每隔此秒數封存一次")
     args = parser.parse_args()
 
+    if args.command == "simulate":
+        simulate(args)
+        return
+    if args.command == "tournament":
+        tournament(args)
+        return
+    if args.command == "solve":
+        solve(args)
+        return
+    if args.command == "endgame":
+        endgame(args)
+        return
+    if args.command == "bench":
+        bench(args)
+        return
+    if args.command == "render":
+        render(args)
+        return
+    if args.command == "index":
+        index(args)
+        return
+    if args.command == "export":
+        export(args)
+        return
+    if args.command == "archive":
+        archive(args)
+        return
+
+    _check_strategy_files([args.ai_strategy])
+
     # 創建並運行遊戲
     game = Game(
         num_players=args.num_players,
@@ -34,10 +191,192 @@ def main():
         human_player_index=args.human_player,
         ai_strategy=args.ai_strategy,
         kill_player_on_start=args.kill_on_start,
-        interactive_pause=args.interactive_pause
+        interactive_pause=args.interactive_pause,
+        record_store=get_record_store(args.record_db) if args.record_db else None,
+        ai_model_path=args.ai_model
     )
     game.run()
 
 
+def _check_strategy_files(strategies):
+    """需要離線產生資料的策略在檔案不存在時直接結束，而不是在建立策略時拋出例外"""
+    if "solver" in strategies:
+        from ai.cfr import DEFAULT_POLICY_PATH
+        if not os.path.exists(DEFAULT_POLICY_PATH):
+            raise SystemExit(f"solver 策略需要策略表 {DEFAULT_POLICY_PATH}，請先執行 python main.py solve")
+
+
+def simulate(args):
+    """執行無頭批次模擬並輸出報告"""
+    from simulation.runner import HeadlessRunner, format_report
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    _check_strategy_files(strategies)
+    if args.replay is not None:
+        if args.seed is None:
+            raise SystemExit("重播需要指定 --seed")
+        if args.carry_models:
+            raise SystemExit("--carry_models 的各局與之前的局有關，無法單獨重播")
+        runner = HeadlessRunner(strategies, max_turns=args.max_turns, seed=args.seed,
+                                model_path=args.model_path)
+        winner, turns = runner.play_game(args.replay, verbose=True)
+        print(f"\n第 {args.replay} 局結束：贏家 p{winner}，共 {turns} 回合")
+        return
+
+    if args.vectorized:
+        from simulation.vectorized import simulate_vectorized
+        result = simulate_vectorized(strategies, args.games, batch_size=args.batch_size,
+                                     seed=args.seed, max_steps=args.max_turns)
+    else:
+        runner = HeadlessRunner(strategies, max_turns=args.max_turns, seed=args.seed,
+                                model_path=args.model_path, carry_models=args.carry_models)
+        result = runner.run(args.games)
+    print(format_report(result))
+
+
+def tournament(args):
+    """執行多進程錦標賽並輸出報告"""
+    from simulation.rating import RatingLadder
+    from simulation.tournament import Tournament, format_report
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    _check_strategy_files(strategies)
+    runner = Tournament(strategies, num_players=args.players,
+                        max_workers=args.workers, batch_size=args.batch_size,
+                        seed=args.seed, model_path=args.model_path)
+    ratings = RatingLadder.load(args.ratings) if args.ratings else None
+    result = runner.run(args.games, ratings=ratings, stop_z=args.stop_z)
+    print(format_report(result, args.stop_z or 1.96))
+    if args.ratings:
+        result.ratings.save(args.ratings)
+
+
+def solve(args):
+    """執行 CFR 離線求解並寫出策略表"""
+    from ai.cfr import CFRSolver, DEFAULT_POLICY_PATH
+
+    solver = CFRSolver(seed=args.seed)
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        solver.load_checkpoint(args.checkpoint)
+        print(f"從檢查點續跑：已完成 {solver.iterations} 次迭代")
+
+    def progress(done: int, elapsed: float):
+        print(f"\r已完成 {done} 次迭代（{elapsed:.0f} 秒）", end="", flush=True)
+
+    solver.run(args.iterations, workers=args.workers, batch_size=args.batch_size,
+               checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+               progress=progress)
+    output = args.output or DEFAULT_POLICY_PATH
+    solver.save_policy(output)
+    print(f"\n策略表已寫入 {output}（共 {solver.iterations} 次迭代）")
+
+
+def endgame(args):
+    """建立兩人殘局資料庫"""
+    from ai.endgame import DEFAULT_TABLEBASE_PATH, build_tablebase
+
+    output = args.output or DEFAULT_TABLEBASE_PATH
+    start_value = build_tablebase(output, workers=args.workers)
+    print(f"殘局資料庫已寫入 {output}（新一輪先手勝率 {start_value:.4f}）")
+
+
+def bench(args):
+    """執行效能基準，寫出 JSON 並可與基準線比較；有退步時以非零狀態結束"""
+    from benchmarks.suite import (compare, format_comparison, format_results, load_results,
+                                  run_suite, save_results)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] if args.only else None
+    baseline = load_results(args.baseline) if args.baseline else None
+
+    def progress(name: str, result: dict):
+        if "skipped" in result:
+            print(f"{name}: 略過（{result['skipped']}）")
+        else:
+            print(f"{name}: {result['per_op_us']:.2f} us/op")
+
+    results = run_suite(names, repeat=args.repeat, scale=args.scale, progress=progress)
+    save_results(results, args.output)
+    print()
+    print(format_results(results))
+    print(f"\n結果已寫入 {args.output}")
+
+    if baseline is not None:
+        rows = compare(results, baseline, args.threshold)
+        print()
+        print(format_comparison(rows))
+        if any(row["status"] == "regression" for row in rows):
+            raise SystemExit(1)
+
+
+def render(args):
+    """將事件記錄渲染成 Markdown 視角記錄"""
+    from utils.record_renderer import EVENTS_FILE, read_records, render_log_directory
+    from utils.record_renderer import render as render_perspective
+
+    if args.perspective:
+        path = os.path.join(args.log_dir, EVENTS_FILE)
+        if not os.path.exists(path):
+            raise SystemExit(f"找不到事件記錄: {path}")
+        try:
+            print(render_perspective(read_records(path), args.perspective))
+        except ValueError as e:
+            raise SystemExit(str(e))
+        return
+    try:
+        paths = render_log_directory(args.log_dir, force=args.force)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    for path in paths:
+        print(f"已寫入 {path}")
+
+
+def index(args):
+    """將尚未匯入的記錄目錄匯入 SQLite 記錄庫"""
+    from utils.record_renderer import EVENTS_FILE
+    from utils.record_store import DEFAULT_RECORD_DB_PATH, RecordStore
+
+    store = RecordStore(args.db or DEFAULT_RECORD_DB_PATH)
+    imported = actions = 0
+    for name in sorted(os.listdir(args.log_root)):
+        log_dir = os.path.join(args.log_root, name)
+        if not os.path.exists(os.path.join(log_dir, EVENTS_FILE)):
+            continue
+        try:
+            count = store.import_log_directory(log_dir)
+        except ValueError as e:
+            print(f"略過 {log_dir}: {e}")
+            continue
+        if count:
+            imported += 1
+            actions += count
+    store.close()
+    print(f"已匯入 {imported} 局、{actions} 個動作到 {store.path}")
+
+
+def export(args):
+    """將記錄目錄匯出成欄式分片"""
+    from utils.record_export import export_logs
+
+    stats = export_logs(args.log_root, args.output, shard_rows=args.shard_rows,
+                        include_unfinished=args.include_unfinished)
+    print(f"已匯出 {stats['games']} 局、{stats['rows']} 個動作（新增 {stats['shards']} 個分片）"
+          f"到 {args.output}；略過 {stats['skipped']} 局未結束的對局")
+
+
+def archive(args):
+    """封存已結束的記錄目錄"""
+    import time
+    from utils.log_archive import LogArchiver
+
+    archiver = LogArchiver(args.log_root, games_per_bundle=args.games_per_bundle,
+                           min_age=args.min_age)
+    while True:
+        count = archiver.archive_once(flush_partial=args.all)
+        print(f"已封存 {count} 局到 {archiver.archive_dir}")
+        if args.watch is None:
+            return
+        time.sleep(args.watch)
+
+
 if __name__ == "__main__":
     main()
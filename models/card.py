@@ -9,6 +9,16 @@ class CardType(Enum):
     JOKER = "J"
 
 
+# 牌種固定順序，供手牌計數向量與整數編碼使用
+CARD_KINDS = tuple(t.value for t in CardType)
+# 標準牌組組成：A、K、Q 各 6 張，Joker 2 張
+DECK_COMPOSITION = {"A": 6, "K": 6, "Q": 6, "J": 2}
+# 每輪的目標牌只會是 A、K、Q（Joker 為萬用牌）
+TARGET_CARDS = ("A", "K", "Q")
+# 左輪手槍彈巢數，槍管位置與子彈位置皆為 1 ~ GUN_CHAMBERS
+GUN_CHAMBERS = 6
+
+
 class Card:
     """卡牌類別"""
 
@@ -47,10 +57,10 @@ class Deck:
         # Joker 2 張
         self.cards.extend([Card(CardType.JOKER.value) for _ in range(2)])
 
-    def shuffle(self):
-        """洗牌"""
+    def shuffle(self, rng=None):
+        """洗牌，rng 為 None 時使用全域 random"""
         import random
-        random.shuffle(self.cards)
+        (rng or random).shuffle(self.cards)
 
     def deal(self, num_players: int) -> dict:
         """發牌"""
@@ -0,0 +1,245 @@
+# liars_bar/models/packed_state.py
+"""
+整數編碼的精簡遊戲狀態
+
+手牌以 4 格計數向量表示（順序同 CARD_KINDS：A、K、Q、J），每格 5 位元：
+低 4 位元存張數（最多 10 張），最高位元保留為借位防護位，
+讓「是否擁有這些牌」與「移除出牌」都能以單次整數運算完成。
+
+公開狀態（所有玩家都看得到的資訊）與私有狀態（手牌、上家實際出牌、子彈位置）
+分別編碼成固定欄寬的整數，合併後即為可直接雜湊、複製成本為零的狀態鍵。
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.player import Player
+from models.card import CARD_KINDS
+
+MAX_PLAYERS = 4
+
+# 手牌編碼
+HAND_SLOT_BITS = 5
+HAND_COUNT_MASK = 0b1111
+HAND_BITS = HAND_SLOT_BITS * len(CARD_KINDS)
+HAND_MASK = (1 << HAND_BITS) - 1
+_SLOT_SHIFT = {card: i * HAND_SLOT_BITS for i, card in enumerate(CARD_KINDS)}
+# 每格最高位元的防護位
+_GUARD_MASK = sum(1 << (shift + 4) for shift in _SLOT_SHIFT.values())
+# 每格的單位值，乘上張數即為該張數的編碼
+_SLOT_UNIT = {card: 1 << shift for card, shift in _SLOT_SHIFT.items()}
+
+# 公開狀態欄位寬度
+TARGET_NONE = 3
+NO_PLAYER = 7
+_NUM_PLAYERS_BITS = 3
+_TARGET_BITS = 2
+_LAST_COUNT_BITS = 2
+_LAST_PLAYER_BITS = 3
+_CURRENT_BITS = 2
+_HEADER_BITS = (_NUM_PLAYERS_BITS + _TARGET_BITS + _LAST_COUNT_BITS
+                + _LAST_PLAYER_BITS + _CURRENT_BITS)
+# 每位玩家：[手牌數 4][槍管位置 3][開槍次數 8][存活 1]
+_HAND_COUNT_BITS = 4
+_GUN_BITS = 3
+_SHOTS_BITS = 8
+_PLAYER_BITS = _HAND_COUNT_BITS + _GUN_BITS + _SHOTS_BITS + 1
+PUBLIC_BITS = _HEADER_BITS + _PLAYER_BITS * MAX_PLAYERS
+
+# 私有狀態：每位玩家手牌、上家實際出牌、每位玩家子彈位置
+_BULLET_BITS = 3
+PRIVATE_BITS = HAND_BITS * MAX_PLAYERS + HAND_BITS + _BULLET_BITS * MAX_PLAYERS
+
+_TARGET_INDEX = {card: i for i, card in enumerate(CARD_KINDS[:3])}
+
+
+def pack_hand(cards: Sequence[str]) -> int:
+    """將手牌列表編碼為整數"""
+    packed = 0
+    for card in cards:
+        packed += _SLOT_UNIT[card]
+    return packed
+
+
+def unpack_hand(packed: int) -> List[str]:
+    """將整數編碼還原為排序後的手牌列表（與 shuffle_and_deal 相同的排序）"""
+    cards = []
+    for card in CARD_KINDS:
+        cards.extend([card] * ((packed >> _SLOT_SHIFT[card]) & HAND_COUNT_MASK))
+    cards.sort()
+    return cards
+
+
+def hand_counts(packed: int) -> Tuple[int, int, int, int]:
+    """返回各牌種張數 (A, K, Q, J)"""
+    return tuple((packed >> _SLOT_SHIFT[card]) & HAND_COUNT_MASK for card in CARD_KINDS)
+
+
+def pack_counts(counts: Sequence[int]) -> int:
+    """由各牌種張數 (A, K, Q, J) 編碼"""
+    packed = 0
+    for card, count in zip(CARD_KINDS, counts):
+        packed |= count << _SLOT_SHIFT[card]
+    return packed
+
+
+def hand_size(packed: int) -> int:
+    """手牌總張數"""
+    return sum(hand_counts(packed))
+
+
+def card_count(packed: int, card: str) -> int:
+    """手牌中某種牌的張數"""
+    return (packed >> _SLOT_SHIFT[card]) & HAND_COUNT_MASK
+
+
+def contains(hand: int, cards: int) -> bool:
+    """手牌是否擁有出牌中的每一張（逐格比較，無需迴圈）"""
+    return ((hand | _GUARD_MASK) - cards) & _GUARD_MASK == _GUARD_MASK
+
+
+def remove_cards(hand: int, cards: int) -> int:
+    """從手牌中移除出牌，呼叫前須先以 contains() 檢查"""
+    return hand - cards
+
+
+def is_honest(cards: int, target_card: str) -> bool:
+    """出牌是否全部為目標牌或 Joker"""
+    allowed = (HAND_COUNT_MASK << _SLOT_SHIFT[target_card]) | (HAND_COUNT_MASK << _SLOT_SHIFT["J"])
+    return cards & ~allowed == 0
+
+
+def pack_public_state(game) -> int:
+    """將 Game 的公開資訊編碼為固定欄寬整數"""
+    if game.num_players > MAX_PLAYERS:
+        raise ValueError(f"玩家數量不可超過 {MAX_PLAYERS}")
+
+    last_count = len(game.last_play_cards) if game.last_player_idx is not None else 0
+    last_player = game.last_player_idx if game.last_player_idx is not None else NO_PLAYER
+    target = _TARGET_INDEX.get(game.target_card, TARGET_NONE)
+
+    packed = game.num_players
+    shift = _NUM_PLAYERS_BITS
+    packed |= target << shift
+    shift += _TARGET_BITS
+    packed |= last_count << shift
+    shift += _LAST_COUNT_BITS
+    packed |= last_player << shift
+    shift += _LAST_PLAYER_BITS
+    packed |= game.current_idx << shift
+    shift += _CURRENT_BITS
+
+    for player in game.players:
+        if player.shots_fired >= 1 << _SHOTS_BITS:
+            raise ValueError(f"玩家 {player.id} 開槍次數超出編碼範圍")
+        packed |= len(player.hand) << shift
+        shift += _HAND_COUNT_BITS
+        packed |= player.gun_pos << shift
+        shift += _GUN_BITS
+        packed |= player.shots_fired << shift
+        shift += _SHOTS_BITS
+        packed |= int(player.alive) << shift
+        shift += 1
+
+    return packed
+
+
+def unpack_public_state(packed: int) -> Dict:
+    """將公開狀態整數解碼為字典"""
+    def take(bits: int) -> int:
+        nonlocal packed
+        value = packed & ((1 << bits) - 1)
+        packed >>= bits
+        return value
+
+    num_players = take(_NUM_PLAYERS_BITS)
+    target = take(_TARGET_BITS)
+    last_count = take(_LAST_COUNT_BITS)
+    last_player = take(_LAST_PLAYER_BITS)
+    current_idx = take(_CURRENT_BITS)
+
+    players = []
+    for i in range(num_players):
+        players.append({
+            "id": i,
+            "hand_count": take(_HAND_COUNT_BITS),
+            "gun_pos": take(_GUN_BITS),
+            "shots_fired": take(_SHOTS_BITS),
+            "alive": bool(take(1))
+        })
+
+    return {
+        "num_players": num_players,
+        "target_card": CARD_KINDS[target] if target != TARGET_NONE else None,
+        "last_play_count": last_count,
+        "last_player_idx": last_player if last_player != NO_PLAYER else None,
+        "current_idx": current_idx,
+        "players": players
+    }
+
+
+def pack_private_state(game) -> int:
+    """將手牌、上家實際出牌與子彈位置編碼為整數"""
+    packed = 0
+    shift = 0
+    for player in game.players:
+        packed |= pack_hand(player.hand) << shift
+        shift += HAND_BITS
+    shift = HAND_BITS * MAX_PLAYERS
+
+    if game.last_player_idx is not None:
+        packed |= pack_hand(game.last_play_cards) << shift
+    shift += HAND_BITS
+
+    for player in game.players:
+        packed |= (player.bullet_pos or 0) << shift
+        shift += _BULLET_BITS
+
+    return packed
+
+
+def encode_game(game) -> int:
+    """完整狀態鍵：公開狀態在低位，私有狀態在高位（不含記錄與玩家歷史）"""
+    return pack_public_state(game) | (pack_private_state(game) << PUBLIC_BITS)
+
+
+def public_key(state_key: int) -> int:
+    """從完整狀態鍵取出公開狀態部分"""
+    return state_key & ((1 << PUBLIC_BITS) - 1)
+
+
+def player_hand(state_key: int, player_id: int) -> int:
+    """從完整狀態鍵取出某位玩家的手牌編碼"""
+    return (state_key >> (PUBLIC_BITS + HAND_BITS * player_id)) & HAND_MASK
+
+
+def decode_into_game(game, state_key: int):
+    """將完整狀態鍵寫回既有的 Game 與 Player 物件（玩家數量須相同）"""
+    public = unpack_public_state(public_key(state_key))
+    if public["num_players"] != game.num_players:
+        raise ValueError("狀態鍵的玩家數量與遊戲不符")
+
+    private = state_key >> PUBLIC_BITS
+    bullets = private >> (HAND_BITS * (MAX_PLAYERS + 1))
+    for player, info in zip(game.players, public["players"]):
+        apply_player_state(player,
+                           hand=(private >> (HAND_BITS * player.id)) & HAND_MASK,
+                           gun_pos=info["gun_pos"],
+                           shots_fired=info["shots_fired"],
+                           alive=info["alive"],
+                           bullet_pos=(bullets >> (_BULLET_BITS * player.id)) & ((1 << _BULLET_BITS) - 1))
+
+    game.target_card = public["target_card"]
+    game.current_idx = public["current_idx"]
+    game.last_player_idx = public["last_player_idx"]
+    last_play = (private >> (HAND_BITS * MAX_PLAYERS)) & HAND_MASK
+    game.last_play_cards = unpack_hand(last_play) if public["last_player_idx"] is not None else []
+    game.invalidate_state()
+
+
+def apply_player_state(player: Player, hand: int, gun_pos: int, shots_fired: int, alive: bool,
+                       bullet_pos: Optional[int] = None):
+    """以編碼後的手牌與數值更新 Player 物件"""
+    player.hand = unpack_hand(hand)
+    player.gun_pos = gun_pos
+    player.shots_fired = shots_fired
+    player.alive = alive
+    if bullet_pos:
+        player.bullet_pos = bullet_pos
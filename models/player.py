@@ -2,6 +2,7 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 from enum import Enum
+from models.card import GUN_CHAMBERS
 
 
 class PlayerType(Enum):
@@ -32,7 +33,7 @@ class Player:
     def __post_init__(self):
         import random
         if self.bullet_pos is None:
-            self.bullet_pos = random.randint(1, 6)
+            self.bullet_pos = random.randint(1, GUN_CHAMBERS)
         if not self.opinions:
             # 初始化對其他玩家的評價
             self.opinions = {
@@ -41,7 +42,7 @@ class Player:
     def shoot(self) -> bool:
         """進行俄羅斯輪盤，返回是否中彈"""
         is_hit = self.bullet_pos == self.gun_pos
-        self.gun_pos = (self.gun_pos % 6) + 1
+        self.gun_pos = (self.gun_pos % GUN_CHAMBERS) + 1
         self.shots_fired += 1
         if is_hit:
             self.alive = False
@@ -0,0 +1,183 @@
+# liars_bar/simulation/rating.py
+"""
+多人局的線上評分（Plackett-Luce 模型的 Weng-Lin 貝氏近似）
+
+每個參賽者（策略名稱，或任何標籤，例如 "llm:prompt_v2"）以常態分布 N(mu, sigma²) 表示實力，
+每局依名次（贏家第一、之後依淘汰順序倒序）做一次 O(n²) 的增量更新，n 為座位數。
+只保存每個參賽者的常數大小統計，與模擬局數無關，因此可以串流處理數百萬局結果。
+
+sigma 會隨觀察次數下降，mu ± z * sigma 即為信賴區間；
+排行榜上相鄰兩者的差距都超過 z 倍合併標準差時，名次視為已確定，可以提前停止模擬。
+同一策略佔多個座位時，各座位分別計算更新量後取平均套用到同一個評分。
+"""
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_MU = 25.0
+DEFAULT_SIGMA = DEFAULT_MU / 3
+
+
+@dataclass
+class Rating:
+    """單一參賽者的評分與累計統計"""
+    mu: float = DEFAULT_MU
+    sigma: float = DEFAULT_SIGMA
+    games: int = 0
+    wins: int = 0
+    seats: int = 0
+
+    def interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """mu 的信賴區間"""
+        return self.mu - z * self.sigma, self.mu + z * self.sigma
+
+    @property
+    def conservative(self) -> float:
+        """保守評分 mu - 3 sigma"""
+        return self.mu - 3 * self.sigma
+
+
+class RatingLadder:
+    """Plackett-Luce 評分排行榜"""
+
+    def __init__(self, mu: float = DEFAULT_MU, sigma: float = DEFAULT_SIGMA,
+                 beta: Optional[float] = None, kappa: float = 1e-4, tau: float = 0.0):
+        """
+        mu, sigma: 新參賽者的初始評分
+        beta: 單局表現的雜訊標準差，預設為 sigma / 2
+        kappa: 每局變異數縮小比例的下限，避免 sigma 變成 0
+        tau: 每局加入的動態雜訊；策略固定不變時為 0
+        """
+        self.mu = mu
+        self.sigma = sigma
+        self.beta = beta if beta is not None else sigma / 2
+        self.kappa = kappa
+        self.tau = tau
+        self.ratings: Dict[str, Rating] = {}
+        self.games = 0
+
+    def rating(self, label: str) -> Rating:
+        rating = self.ratings.get(label)
+        if rating is None:
+            rating = Rating(self.mu, self.sigma)
+            self.ratings[label] = rating
+        return rating
+
+    def update(self, ranking: Sequence[str]):
+        """
+        以一局的名次更新評分
+        ranking: 每個座位的參賽者標籤，依名次由好到壞排列（同一標籤可出現多次）
+        """
+        if len(ranking) < 2 or len(set(ranking)) < 2:
+            return
+        if self.tau:
+            for label in set(ranking):
+                rating = self.rating(label)
+                rating.sigma = math.sqrt(rating.sigma ** 2 + self.tau ** 2)
+        ratings = [self.rating(label) for label in ranking]
+
+        n = len(ratings)
+        variances = [r.sigma ** 2 for r in ratings]
+        c = math.sqrt(sum(v + self.beta ** 2 for v in variances))
+        strengths = [math.exp(r.mu / c) for r in ratings]
+        # tail[q] = 名次在 q 之後（含 q）的實力總和
+        tail = [0.0] * n
+        total = 0.0
+        for q in range(n - 1, -1, -1):
+            total += strengths[q]
+            tail[q] = total
+
+        mu_delta: Dict[str, float] = {}
+        var_factor: Dict[str, float] = {}
+        for i, label in enumerate(ranking):
+            omega = 0.0
+            delta = 0.0
+            for q in range(i + 1):
+                quotient = strengths[i] / tail[q]
+                omega += (1.0 - quotient) if q == i else -quotient
+                delta += quotient * (1.0 - quotient)
+            variance = variances[i]
+            gamma = math.sqrt(variance) / c
+            mu_delta[label] = mu_delta.get(label, 0.0) + omega * variance / c
+            var_factor[label] = var_factor.get(label, 0.0) + max(
+                1.0 - delta * gamma * variance / c ** 2, self.kappa)
+
+        self.games += 1
+        for label in mu_delta:
+            seats = ranking.count(label)
+            rating = self.ratings[label]
+            rating.mu += mu_delta[label] / seats
+            rating.sigma *= math.sqrt(var_factor[label] / seats)
+            rating.games += 1
+            rating.seats += seats
+        self.ratings[ranking[0]].wins += 1
+
+    def update_many(self, rankings: Iterable[Sequence[str]]):
+        """串流處理多局名次，不保留原始結果"""
+        for ranking in rankings:
+            self.update(ranking)
+
+    def leaderboard(self) -> List[Tuple[str, Rating]]:
+        """依 mu 由高到低排序"""
+        return sorted(self.ratings.items(), key=lambda item: item[1].mu, reverse=True)
+
+    def separation(self, a: str, b: str) -> float:
+        """a 與 b 的 mu 差距除以合併標準差（z 值）"""
+        ra, rb = self.ratings[a], self.ratings[b]
+        return (ra.mu - rb.mu) / math.sqrt(ra.sigma ** 2 + rb.sigma ** 2)
+
+    def settled(self, z: float = 1.96, labels: Optional[Sequence[str]] = None) -> bool:
+        """排行榜上相鄰兩者（限定 labels 時只看這些參賽者，且每個都須已有評分）的差距是否都超過 z"""
+        if labels is not None and any(label not in self.ratings for label in labels):
+            return False
+        board = [label for label, _ in self.leaderboard()
+                 if labels is None or label in labels]
+        if len(board) < 2:
+            return False
+        return all(self.separation(a, b) > z for a, b in zip(board, board[1:]))
+
+    def to_dict(self) -> Dict:
+        return {
+            "params": {"mu": self.mu, "sigma": self.sigma, "beta": self.beta,
+                       "kappa": self.kappa, "tau": self.tau},
+            "games": self.games,
+            "ratings": {label: asdict(rating) for label, rating in self.ratings.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RatingLadder":
+        ladder = cls(**data["params"])
+        ladder.games = data.get("games", 0)
+        ladder.ratings = {label: Rating(**fields) for label, fields in data["ratings"].items()}
+        return ladder
+
+    def save(self, path: str):
+        """寫入 JSON 檔（先寫暫存檔再改名）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "RatingLadder":
+        """讀取 JSON 檔；檔案不存在時返回新的排行榜"""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def format_ratings(ladder: RatingLadder, z: float = 1.96) -> str:
+    """將排行榜格式化為文字報告"""
+    lines = [f"評分排行 (Plackett-Luce，{ladder.games} 局，{z:g} 倍標準差信賴區間):"]
+    board = ladder.leaderboard()
+    for rank, (label, rating) in enumerate(board, 1):
+        low, high = rating.interval(z)
+        lines.append(f"{rank}. {label}: {rating.mu:.2f} ± {z * rating.sigma:.2f} "
+                     f"[{low:.2f}, {high:.2f}]（{rating.games} 局，{rating.wins} 勝）")
+    if len(board) >= 2:
+        lines.append("名次已確定" if ladder.settled(z) else "名次尚未確定")
+    return "\n".join(lines)
@@ -0,0 +1,185 @@
+# liars_bar/simulation/runner.py
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from core.events import GameStarted, PlayerEliminated
+from core.game import Game
+from ai.decision import AIDecisionMaker
+from utils.rng import SeedStream
+from .rating import RatingLadder
+
+# 無頭模擬可用的策略（LLM 策略需要網路呼叫，不適合大量模擬）
+SIMULATION_STRATEGIES = ("random", "rule", "learning", "ev", "solver", "endgame")
+
+
+def finishing_order(events: Sequence) -> Tuple[int, ...]:
+    """由事件串流得出名次（座位編號）：贏家第一，其餘依淘汰順序倒序；未分勝負時返回空元組"""
+    num_players = 0
+    eliminated = []
+    for event in events:
+        if type(event) is PlayerEliminated:
+            eliminated.append(event.player_id)
+        elif type(event) is GameStarted:
+            num_players = event.num_players
+            eliminated = []
+    survivors = [i for i in range(num_players) if i not in eliminated]
+    if len(survivors) != 1:
+        return ()
+    return (survivors[0], *reversed(eliminated))
+
+
+@dataclass
+class SimulationResult:
+    """批次模擬結果"""
+    strategies: List[str]
+    seed: Optional[int] = None
+    games: int = 0
+    unfinished: int = 0
+    turns: int = 0
+    elapsed: float = 0.0
+    seat_wins: List[int] = field(default_factory=list)
+
+    @property
+    def games_per_sec(self) -> float:
+        """每秒完成的遊戲數"""
+        return self.games / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def strategy_wins(self) -> Dict[str, int]:
+        """各策略的勝場數（同策略多個座位合併計算）"""
+        wins = {strategy: 0 for strategy in self.strategies}
+        for seat, count in enumerate(self.seat_wins):
+            wins[self.strategies[seat]] += count
+        return wins
+
+
+class HeadlessRunner:
+    """無頭遊戲執行器，直接驅動 Game.start()/Game.next()，不產生任何終端輸出"""
+
+    def __init__(self, strategies: Sequence[str], max_turns: int = 10000, seed: Optional[int] = None,
+                 seed_stream: Optional[SeedStream] = None, model_path: Optional[str] = None,
+                 carry_models: bool = False):
+        """
+        strategies: 每個座位使用的策略，長度即玩家數量 (2-4)
+        max_turns: 單局最大回合數，避免策略卡住造成無窮迴圈
+        seed: 根種子，None 時隨機產生；第 i 局使用其第 i 個子流，可單獨重播
+        seed_stream: 直接指定種子流（優先於 seed），供錦標賽等上層分流使用
+        model_path: 學習型策略的對手模型檔案，作為每局開始時的模型
+        carry_models: 對手模型跨局累積，並在每局結束後寫回 model_path；
+            此時一局的結果與之前進行過的局有關，不能再以局編號單獨重播
+        """
+        if not (2 <= len(strategies) <= 4):
+            raise ValueError("玩家數量必須在2到4之間")
+        invalid = [s for s in strategies if s not in SIMULATION_STRATEGIES]
+        if invalid:
+            raise ValueError(f"無效的模擬策略: {invalid}")
+
+        self.strategies = list(strategies)
+        self.max_turns = max_turns
+        self.seed_stream = seed_stream if seed_stream is not None else SeedStream(seed)
+        self.games_played = 0
+        # 上一局的名次（座位編號，由贏家到最先出局者）
+        self.last_ranking: Tuple[int, ...] = ()
+        self.carry_models = carry_models
+        # 每個座位一個決策器，跨局重複使用；除非 carry_models，每局開始前以 reset() 捨棄跨局資料
+        # 多個學習型座位共用同一個模型檔時只由第一個寫回，避免互相覆蓋
+        first_learning = self.strategies.index("learning") if "learning" in self.strategies else -1
+        self.decision_makers = [AIDecisionMaker(strategy_type=s, model_path=model_path,
+                                                save_models=carry_models and seat == first_learning)
+                                for seat, s in enumerate(self.strategies)]
+        # 對手以策略名稱辨識（座位在不同陣容間會改變），自己的座位為 "self"
+        for seat, decision_maker in enumerate(self.decision_makers):
+            decision_maker.set_opponents(["self" if other == seat else s
+                                          for other, s in enumerate(self.strategies)])
+
+    def play_game(self, game_index: Optional[int] = None, verbose: bool = False) -> Tuple[Optional[int], int]:
+        """
+        進行一局完整遊戲，返回 (贏家座位, 回合數)；未分出勝負時贏家為 None
+        game_index: 使用第幾個子流，None 時接續上一局；以相同根種子與編號呼叫即可重播該局
+
+        除非 carry_models，每局開始前重設各座位的策略（學習型策略的對手模型回到初始狀態），
+        一局的結果只由 (根種子, 局編號, 初始模型) 決定，與之前進行過哪些局無關。
+        代價是學習型策略只能在一局之內學習對手，跨局累積需要 carry_models。
+        """
+        if game_index is None:
+            game_index = self.games_played
+        self.games_played = game_index + 1
+
+        # 子流 0 給遊戲引擎，子流 1.. 給各座位的策略
+        streams = self.seed_stream.child(game_index)
+        for seat, decision_maker in enumerate(self.decision_makers):
+            if not self.carry_models:
+                decision_maker.reset()
+            decision_maker.set_rng(streams.child(seat + 1).rng())
+
+        game = Game(
+            num_players=len(self.strategies),
+            human_player_index=-1,
+            verbose=verbose,
+            record_logs=False,
+            rng=streams.child(0).rng()
+        )
+        game_state = game.start()
+
+        turns = 0
+        while not game.is_game_over() and turns < self.max_turns:
+            player_id = game.current_idx
+            action, cards = self.decision_makers[player_id].make_decision(
+                game_state, player_id)
+            game_state = game.next({"action": action, "played_cards": cards})
+            turns += 1
+
+        # 讓策略看到結束前的最後幾個事件（例如學習型策略的對手模型）
+        for decision_maker in self.decision_makers:
+            decision_maker.observe(game_state)
+
+        winner = game.get_winner() if game.is_game_over() else None
+        self.last_ranking = finishing_order(game.events) if winner is not None else ()
+        return winner, turns
+
+    def run(self, num_games: int, ratings: Optional[RatingLadder] = None) -> SimulationResult:
+        """
+        連續進行 num_games 局並統計結果
+        ratings: 評分排行榜，提供時以每局名次更新各策略的評分
+        """
+        result = SimulationResult(strategies=self.strategies,
+                                  seed=self.seed_stream.entropy,
+                                  seat_wins=[0] * len(self.strategies))
+
+        start_time = time.perf_counter()
+        for _ in range(num_games):
+            winner, turns = self.play_game()
+            result.games += 1
+            result.turns += turns
+            if winner is None:
+                result.unfinished += 1
+            else:
+                result.seat_wins[winner] += 1
+                if ratings is not None:
+                    ratings.update([self.strategies[seat] for seat in self.last_ranking])
+        result.elapsed = time.perf_counter() - start_time
+
+        return result
+
+
+def format_report(result: SimulationResult) -> str:
+    """將模擬結果格式化為文字報告"""
+    lines = [
+        f"模擬局數: {result.games}",
+        f"根種子: {result.seed}",
+        f"耗時: {result.elapsed:.2f} 秒",
+        f"速度: {result.games_per_sec:.1f} 局/秒",
+        f"平均回合數: {result.turns / result.games if result.games else 0:.1f}",
+        f"未分勝負: {result.unfinished}",
+        "\n策略勝場:"
+    ]
+    for strategy, wins in result.strategy_wins.items():
+        seats = result.strategies.count(strategy)
+        rate = wins / result.games if result.games else 0.0
+        lines.append(f"- {strategy} ({seats} 座): {wins} 勝 ({rate:.1%})")
+
+    lines.append("\n座位勝場:")
+    for seat, wins in enumerate(result.seat_wins):
+        lines.append(f"- p{seat} ({result.strategies[seat]}): {wins} 勝")
+
+    return "\n".join(lines)
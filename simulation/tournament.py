@@ -0,0 +1,233 @@
+# liars_bar/simulation/tournament.py
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from utils.rng import SeedStream
+from .rating import RatingLadder, format_ratings
+from .runner import HeadlessRunner, SIMULATION_STRATEGIES
+
+# 工作進程內快取的執行器，鍵為 (座位策略組合, 對手模型檔)，跨批次重複使用 AIDecisionMaker
+# （HeadlessRunner 每局開始前重設策略，分到哪些批次不影響結果）
+_RUNNERS: Dict[Tuple[Tuple[str, ...], Optional[str]], HeadlessRunner] = {}
+
+# 單局結果：(陣容編號, 贏家座位（未分勝負為 -1）, 回合數, 名次（座位編號，未分勝負為空）)
+GameResult = Tuple[int, int, int, Tuple[int, ...]]
+
+
+def build_lineups(strategies: Sequence[str], num_players: int) -> List[Tuple[str, ...]]:
+    """列出所有座位排列與策略組合，排除只有單一策略的陣容"""
+    return [lineup for lineup in itertools.product(strategies, repeat=num_players)
+            if len(set(lineup)) > 1]
+
+
+def _play_batch(lineup_id: int, lineup: Tuple[str, ...], first_game: int, num_games: int,
+                max_turns: int, entropy: int, model_path: Optional[str] = None) -> List[GameResult]:
+    """
+    在工作進程中進行一批同陣容的遊戲，只回傳精簡的結果元組
+    每局的亂數子流由 (entropy, 陣容編號, 局編號) 決定，與排程到哪個進程無關
+    """
+    key = (lineup, model_path)
+    runner = _RUNNERS.get(key)
+    if runner is None or runner.seed_stream.entropy != entropy:
+        runner = HeadlessRunner(lineup, max_turns=max_turns,
+                                seed_stream=SeedStream(entropy).child(lineup_id),
+                                model_path=model_path)
+        _RUNNERS[key] = runner
+
+    results = []
+    for game_index in range(first_game, first_game + num_games):
+        winner, turns = runner.play_game(game_index)
+        results.append((lineup_id, -1 if winner is None else winner, turns, runner.last_ranking))
+    return results
+
+
+@dataclass
+class TournamentResult:
+    """錦標賽統計結果"""
+    strategies: List[str]
+    lineups: List[Tuple[str, ...]]
+    seed: Optional[int] = None
+    games: int = 0
+    unfinished: int = 0
+    turns: int = 0
+    elapsed: float = 0.0
+    # 各策略勝場數與出場座位數
+    wins: Dict[str, int] = field(default_factory=dict)
+    seats: Dict[str, int] = field(default_factory=dict)
+    # 對戰矩陣：head_to_head[a][b] = 有 a 與 b 同場時 a 的勝場；meetings[a][b] = 同場局數
+    head_to_head: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    meetings: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # 依每局名次增量更新的評分；stopped 表示名次確定後提前停止
+    ratings: RatingLadder = field(default_factory=RatingLadder)
+    stopped: bool = False
+
+    def __post_init__(self):
+        for s in self.strategies:
+            self.wins.setdefault(s, 0)
+            self.seats.setdefault(s, 0)
+            self.head_to_head.setdefault(s, {o: 0 for o in self.strategies})
+            self.meetings.setdefault(s, {o: 0 for o in self.strategies})
+
+    def merge(self, results: List[GameResult]):
+        """合併一批工作進程回傳的結果"""
+        for lineup_id, winner, turns, ranking in results:
+            lineup = self.lineups[lineup_id]
+            present = set(lineup)
+            self.games += 1
+            self.turns += turns
+            for s in lineup:
+                self.seats[s] += 1
+            for a in present:
+                for b in present:
+                    if a != b:
+                        self.meetings[a][b] += 1
+
+            if winner < 0:
+                self.unfinished += 1
+                continue
+
+            self.ratings.update([lineup[seat] for seat in ranking])
+            winning_strategy = lineup[winner]
+            self.wins[winning_strategy] += 1
+            for other in present:
+                if other != winning_strategy:
+                    self.head_to_head[winning_strategy][other] += 1
+
+    @property
+    def games_per_sec(self) -> float:
+        """每秒完成的遊戲數"""
+        return self.games / self.elapsed if self.elapsed > 0 else 0.0
+
+    def win_rate_matrix(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """勝率矩陣：matrix[a][b] 為 a 與 b 同場時 a 獲勝的比例，沒有同場紀錄時為 None"""
+        matrix = {}
+        for a in self.strategies:
+            matrix[a] = {}
+            for b in self.strategies:
+                met = self.meetings[a][b]
+                matrix[a][b] = self.head_to_head[a][b] / met if met else None
+        return matrix
+
+    def seat_adjusted_win_rate(self) -> Dict[str, float]:
+        """每個座位的平均勝率（勝場 / 出場座位數），可跨人數比較"""
+        return {s: self.wins[s] / self.seats[s] if self.seats[s] else 0.0
+                for s in self.strategies}
+
+
+class Tournament:
+    """以進程池並行進行所有陣容的 AI 策略錦標賽"""
+
+    def __init__(self, strategies: Sequence[str], num_players: int = 4, max_workers: Optional[int] = None,
+                 batch_size: int = 200, max_turns: int = 10000, seed: Optional[int] = None,
+                 model_path: Optional[str] = None):
+        """
+        strategies: 參賽策略（至少兩種）
+        num_players: 每局玩家數量 (2-4)
+        max_workers: 工作進程數，預設為 CPU 核心數
+        batch_size: 每個任務的局數，批次越大進程間通訊成本越低
+        seed: 根種子，None 時隨機產生；相同種子的錦標賽結果完全一致
+        model_path: 學習型策略的對手模型檔案，只作為每局開始時的模型，不會寫回；
+            每局的模型與工作進程分到哪些批次無關，因此結果仍與進程數無關
+        """
+        strategies = list(dict.fromkeys(strategies))
+        if len(strategies) < 2:
+            raise ValueError("錦標賽至少需要兩種策略")
+        invalid = [s for s in strategies if s not in SIMULATION_STRATEGIES]
+        if invalid:
+            raise ValueError(f"無效的模擬策略: {invalid}")
+        if not (2 <= num_players <= 4):
+            raise ValueError("玩家數量必須在2到4之間")
+
+        self.strategies = strategies
+        self.num_players = num_players
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = max(1, batch_size)
+        self.max_turns = max_turns
+        self.lineups = build_lineups(strategies, num_players)
+        self.seed_stream = SeedStream(seed)
+        self.model_path = model_path
+
+    def _tasks(self, games_per_lineup: int):
+        """
+        將每個陣容的局數切成批次任務
+        各陣容的批次交錯排列，提前停止時每個陣容已進行的局數相近
+        """
+        for first_game in range(0, games_per_lineup, self.batch_size):
+            count = min(self.batch_size, games_per_lineup - first_game)
+            for lineup_id, lineup in enumerate(self.lineups):
+                yield (lineup_id, lineup, first_game, count, self.max_turns,
+                       self.seed_stream.entropy, self.model_path)
+
+    def run(self, games_per_lineup: int, ratings: Optional[RatingLadder] = None,
+            stop_z: Optional[float] = None) -> TournamentResult:
+        """
+        每個陣容進行 games_per_lineup 局，返回合併後的統計
+        ratings: 沿用既有的評分排行榜（例如從檔案載入），None 時建立新的
+        stop_z: 設定時，每合併一批就檢查參賽策略的名次是否已在 stop_z 倍標準差下確定，
+                確定後取消其餘批次
+        """
+        result = TournamentResult(strategies=self.strategies, lineups=self.lineups,
+                                  seed=self.seed_stream.entropy)
+        if ratings is not None:
+            result.ratings = ratings
+
+        def settled(task_index: int) -> bool:
+            # 只在每個陣容都多進行一批後檢查，避免只看到部分陣容就停止
+            return (stop_z is not None and (task_index + 1) % len(self.lineups) == 0
+                    and result.ratings.settled(stop_z, self.strategies))
+
+        start_time = time.perf_counter()
+        if self.max_workers == 1:
+            for i, task in enumerate(self._tasks(games_per_lineup)):
+                result.merge(_play_batch(*task))
+                if settled(i):
+                    result.stopped = True
+                    break
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(_play_batch, *task)
+                           for task in self._tasks(games_per_lineup)]
+                # 依提交順序合併：線上評分與合併順序有關，如此相同種子的評分也完全一致
+                for i, future in enumerate(futures):
+                    result.merge(future.result())
+                    if settled(i):
+                        result.stopped = True
+                        for pending in futures:
+                            pending.cancel()
+                        break
+        result.elapsed = time.perf_counter() - start_time
+
+        return result
+
+
+def format_report(result: TournamentResult, z: float = 1.96) -> str:
+    """將錦標賽結果格式化為文字報告"""
+    lines = [
+        f"陣容數: {len(result.lineups)}",
+        f"根種子: {result.seed}",
+        f"總局數: {result.games}",
+        f"耗時: {result.elapsed:.2f} 秒",
+        f"速度: {result.games_per_sec:.1f} 局/秒",
+        f"未分勝負: {result.unfinished}",
+        "\n每座位平均勝率:"
+    ]
+    for strategy, rate in result.seat_adjusted_win_rate().items():
+        lines.append(f"- {strategy}: {rate:.1%} ({result.wins[strategy]} 勝 / {result.seats[strategy]} 座)")
+
+    width = max(len(s) for s in result.strategies) + 2
+    lines.append("\n勝率矩陣 (列策略對行策略同場時的勝率):")
+    lines.append(" " * width + "".join(s.rjust(width) for s in result.strategies))
+    for a, row in result.win_rate_matrix().items():
+        cells = "".join(("-" if rate is None else f"{rate:.1%}").rjust(width)
+                        for rate in row.values())
+        lines.append(a.ljust(width) + cells)
+
+    lines.append("")
+    lines.append(format_ratings(result.ratings, z))
+    if result.stopped:
+        lines.append("名次已確定，提前停止")
+
+    return "\n".join(lines)
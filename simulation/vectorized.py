@@ -0,0 +1,287 @@
+# liars_bar/simulation/vectorized.py
+import time
+from typing import Optional, Sequence, Tuple, Union
+import numpy as np
+from models.card import GUN_CHAMBERS
+from utils.card_utils import CARD_KINDS, create_deck
+from .runner import SimulationResult
+
+# 牌種索引：A=0, K=1, Q=2, J=3（目標牌只會是 0~2）
+KIND_INDEX = {card: i for i, card in enumerate(CARD_KINDS)}
+JOKER = KIND_INDEX["J"]
+# 由 create_deck() 轉成的牌種索引陣列，與遊戲引擎使用同一副牌
+DECK = np.array([KIND_INDEX[card] for card in create_deck()], dtype=np.int8)
+MAX_PLAY_CARDS = 3
+
+# 可為單一數值，或長度為 batch_size 的陣列（每局一個參數，用於參數掃描）
+Param = Union[float, np.ndarray]
+
+
+def _per_game(param: Param, games: np.ndarray):
+    """取出指定遊戲的參數值"""
+    if isinstance(param, np.ndarray):
+        return param[games]
+    return param
+
+
+class VectorPolicy:
+    """向量化策略基類：一次為多局遊戲的當前玩家決定動作"""
+
+    def act(self, sim: "VectorizedSimulator", games: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        返回 (challenge, played)
+        challenge: [n] 布林陣列，是否質疑
+        played: [n, 4] 各牌種出牌張數（質疑時全為 0）
+        """
+        raise NotImplementedError("子類必須實現此方法")
+
+
+class RulePolicy(VectorPolicy):
+    """RuleBasedStrategy 的向量化版本"""
+
+    def __init__(self, challenge_prob: Param = 0.7, min_challenge_cards: Param = 2):
+        """
+        challenge_prob: 上家出牌數達門檻時的質疑機率
+        min_challenge_cards: 觸發質疑判斷的最少出牌數
+        """
+        self.challenge_prob = challenge_prob
+        self.min_challenge_cards = min_challenge_cards
+
+    def act(self, sim, games, rng):
+        n = games.size
+        rows = np.arange(n)
+        hands = sim.hands[games, sim.current[games]]
+        target = sim.target[games]
+
+        # 上家出牌數達門檻時，有一定機率質疑
+        challenge = ((sim.last_player[games] >= 0)
+                     & (sim.last_count[games] >= _per_game(self.min_challenge_cards, games))
+                     & (rng.random(n) < _per_game(self.challenge_prob, games)))
+
+        played = np.zeros((n, 4), dtype=np.int8)
+        target_count = hands[rows, target]
+
+        # 有目標牌時出最多 3 張目標牌
+        honest = target_count > 0
+        played[rows[honest], target[honest]] = np.minimum(
+            target_count[honest], MAX_PLAY_CARDS)
+
+        # 否則有 Joker 就出 1 張 Joker
+        joker = ~honest & (hands[:, JOKER] > 0)
+        played[joker, JOKER] = 1
+
+        # 都沒有時說謊，出排序後的第一張牌
+        lie = ~honest & ~joker
+        lie_kind = np.argmax(hands[:, :JOKER] > 0, axis=1)
+        played[rows[lie], lie_kind[lie]] = 1
+
+        played[challenge] = 0
+        return challenge, played
+
+
+class RandomPolicy(VectorPolicy):
+    """RandomStrategy 的向量化版本"""
+
+    def act(self, sim, games, rng):
+        n = games.size
+        rows = np.arange(n)
+        hands = sim.hands[games, sim.current[games]]
+
+        # 可質疑時在出牌與質疑之間均勻選擇
+        challenge = (sim.last_player[games] >= 0) & (rng.random(n) < 0.5)
+
+        # 隨機 1~3 張，不超過手牌數，從手牌中不放回抽樣
+        num = np.minimum(rng.integers(1, MAX_PLAY_CARDS + 1, n), hands.sum(axis=1))
+        remaining = hands.astype(np.int16)
+        played = np.zeros((n, 4), dtype=np.int8)
+        for k in range(MAX_PLAY_CARDS):
+            drawing = k < num
+            if not drawing.any():
+                break
+            cumulative = np.cumsum(remaining, axis=1)
+            u = rng.random(n) * cumulative[:, -1]
+            kind = np.minimum((u[:, None] >= cumulative).sum(axis=1), 3)
+            played[rows[drawing], kind[drawing]] += 1
+            remaining[rows[drawing], kind[drawing]] -= 1
+
+        played[challenge] = 0
+        return challenge, played
+
+
+VECTOR_POLICIES = {
+    "rule": RulePolicy,
+    "random": RandomPolicy,
+}
+
+
+class VectorizedSimulator:
+    """以 NumPy 陣列同步推進 B 局固定策略遊戲的蒙地卡羅模擬器，規則與 core/game.py 相同"""
+
+    def __init__(self, policies: Sequence[VectorPolicy], batch_size: int = 100000,
+                 seed: Optional[int] = None, max_steps: int = 10000):
+        """
+        policies: 每個座位的向量化策略，長度即玩家數量 (2-4)
+        batch_size: 同時模擬的局數
+        max_steps: 最大步數，超過仍未結束的局視為未分勝負
+        """
+        if not (2 <= len(policies) <= 4):
+            raise ValueError("玩家數量必須在2到4之間")
+
+        self.policies = list(policies)
+        self.num_players = len(policies)
+        self.batch_size = batch_size
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        b, p = batch_size, self.num_players
+        self.hands = np.zeros((b, p, 4), dtype=np.int8)
+        self.target = np.zeros(b, dtype=np.int8)
+        self.bullet_pos = np.zeros((b, p), dtype=np.int8)
+        self.gun_pos = np.ones((b, p), dtype=np.int8)
+        self.shots_fired = np.zeros((b, p), dtype=np.int16)
+        self.alive = np.ones((b, p), dtype=bool)
+        self.current = np.zeros(b, dtype=np.int8)
+        self.last_player = np.full(b, -1, dtype=np.int8)
+        self.last_count = np.zeros(b, dtype=np.int8)
+        self.last_honest = np.zeros(b, dtype=bool)
+        self.done = np.zeros(b, dtype=bool)
+        self.turns = np.zeros(b, dtype=np.int32)
+
+    def _deal(self, games: np.ndarray):
+        """重新抽目標牌、洗牌並發給存活玩家，重置彈倉（對應 Game._reset_game_state）"""
+        n = games.size
+        if n == 0:
+            return
+        alive = self.alive[games]
+        num_alive = alive.sum(axis=1)
+
+        self.target[games] = self.rng.integers(0, 3, n)
+
+        # 每局一個隨機排列的牌組
+        order = np.argsort(self.rng.random((n, DECK.size)), axis=1)
+        deck = DECK[order]
+        cards_per_player = DECK.size // num_alive
+        rank = np.cumsum(alive, axis=1) - 1
+        positions = np.arange(DECK.size)
+
+        hands = np.zeros((n, self.num_players, 4), dtype=np.int8)
+        for p in range(self.num_players):
+            start = rank[:, p] * cards_per_player
+            owned = ((positions >= start[:, None])
+                     & (positions < (start + cards_per_player)[:, None])
+                     & alive[:, p, None])
+            for kind in range(4):
+                hands[:, p, kind] = (owned & (deck == kind)).sum(axis=1)
+        self.hands[games] = hands
+
+        bullets = self.rng.integers(1, GUN_CHAMBERS + 1, (n, self.num_players))
+        self.bullet_pos[games] = np.where(alive, bullets, self.bullet_pos[games])
+        self.gun_pos[games] = np.where(alive, 1, self.gun_pos[games])
+        self.last_player[games] = -1
+        self.last_count[games] = 0
+
+    def _shoot(self, games: np.ndarray, seats: np.ndarray):
+        """俄羅斯輪盤（對應 Game._russian_roulette）"""
+        hit = self.bullet_pos[games, seats] == self.gun_pos[games, seats]
+        self.gun_pos[games, seats] = self.gun_pos[games, seats] % GUN_CHAMBERS + 1
+        self.shots_fired[games, seats] += 1
+        self.alive[games[hit], seats[hit]] = False
+
+    def _next_alive(self, games: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        """每局 seats 之後的下一位存活玩家（對應 Game._get_next_player_idx）"""
+        result = seats.copy()
+        found = np.zeros(games.size, dtype=bool)
+        for offset in range(1, self.num_players + 1):
+            candidate = (seats + offset) % self.num_players
+            hit = ~found & self.alive[games, candidate]
+            result[hit] = candidate[hit]
+            found |= hit
+        return result
+
+    def _reset_or_finish(self, games: np.ndarray):
+        """只剩一名玩家時結束該局，否則重新發牌"""
+        finished = self.alive[games].sum(axis=1) <= 1
+        self.done[games[finished]] = True
+        self._deal(games[~finished])
+
+    def step(self) -> bool:
+        """所有未結束的局各推進一步，沒有進行中的局時返回 False"""
+        games = np.flatnonzero(~self.done)
+        if games.size == 0:
+            return False
+        current = self.current[games]
+
+        challenge = np.zeros(games.size, dtype=bool)
+        played = np.zeros((games.size, 4), dtype=np.int8)
+        for seat, policy in enumerate(self.policies):
+            sel = np.flatnonzero(current == seat)
+            if sel.size:
+                challenge[sel], played[sel] = policy.act(self, games[sel], self.rng)
+        self.turns[games] += 1
+
+        # 出牌
+        g, seats, cards = games[~challenge], current[~challenge], played[~challenge]
+        if g.size:
+            self.hands[g, seats] -= cards
+            target_cards = cards[np.arange(g.size), self.target[g]]
+            self.last_player[g] = seats
+            self.last_count[g] = cards.sum(axis=1)
+            self.last_honest[g] = cards.sum(axis=1) == target_cards + cards[:, JOKER]
+
+            # 出完手牌時系統自動質疑
+            emptied = self.hands[g, seats].sum(axis=1) == 0
+            caught = emptied & ~self.last_honest[g]
+            self._shoot(g[caught], seats[caught])
+            self.current[g] = self._next_alive(g, seats)
+            self._reset_or_finish(g[emptied])
+
+        # 質疑
+        g, seats = games[challenge], current[challenge]
+        if g.size:
+            shooter = np.where(self.last_honest[g], seats,
+                               self.last_player[g]).astype(np.int8)
+            self._shoot(g, shooter)
+            self.current[g] = np.where(self.alive[g, shooter], shooter,
+                                       self._next_alive(g, shooter))
+            self._reset_or_finish(g)
+
+        return True
+
+    def run(self) -> np.ndarray:
+        """模擬到所有局結束（或達到 max_steps），返回每局贏家座位（未分勝負為 -1）"""
+        self._deal(np.arange(self.batch_size))
+        for _ in range(self.max_steps):
+            if not self.step():
+                break
+        return np.where(self.done, np.argmax(self.alive, axis=1), -1)
+
+
+def simulate_vectorized(strategies: Sequence[str], num_games: int, batch_size: int = 100000,
+                        seed: Optional[int] = None, max_steps: int = 10000) -> SimulationResult:
+    """以策略名稱進行向量化模擬，結果格式與 HeadlessRunner 相同"""
+    invalid = [s for s in strategies if s not in VECTOR_POLICIES]
+    if invalid:
+        raise ValueError(f"向量化模擬不支援的策略: {invalid}")
+
+    seed_sequence = np.random.SeedSequence(seed)
+    result = SimulationResult(strategies=list(strategies),
+                              seed=seed_sequence.entropy,
+                              seat_wins=[0] * len(strategies))
+
+    start_time = time.perf_counter()
+    remaining = num_games
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        sim = VectorizedSimulator([VECTOR_POLICIES[s]() for s in strategies], batch_size=size,
+                                  seed=seed_sequence.spawn(1)[0], max_steps=max_steps)
+        winners = sim.run()
+        result.games += size
+        result.turns += int(sim.turns.sum())
+        result.unfinished += int((winners < 0).sum())
+        counts = np.bincount(winners[winners >= 0], minlength=len(strategies))
+        for seat, wins in enumerate(counts):
+            result.seat_wins[seat] += int(wins)
+        remaining -= size
+    result.elapsed = time.perf_counter() - start_time
+
+    return result
@@ -1,27 +1,28 @@
 # liars_bar/utils/card_utils.py
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import random
+from models.card import CARD_KINDS, DECK_COMPOSITION
+from utils.move_table import is_legal_play
+from models.packed_state import pack_hand
 
 
 def create_deck() -> List[str]:
     """創建一副牌"""
     deck = []
-    # 每種牌各 6 張
-    for card_type in ["A", "K", "Q"]:
-        deck.extend([card_type] * 6)
-    # Joker 2 張
-    deck.extend(["J"] * 2)
+    # A、K、Q 各 6 張，Joker 2 張
+    for card_type, count in DECK_COMPOSITION.items():
+        deck.extend([card_type] * count)
     return deck
 
 
-def shuffle_and_deal(deck: List[str], num_players: int) -> Dict[str, List[str]]:
-    """洗牌並發牌"""
+def shuffle_and_deal(deck: List[str], num_players: int, rng: Optional[random.Random] = None) -> Dict[str, List[str]]:
+    """洗牌並發牌，rng 為 None 時使用全域 random"""
     if not (2 <= num_players <= 4):
         raise ValueError("玩家數量必須在2到4之間")
 
     # 洗牌
     shuffled_deck = deck.copy()
-    random.shuffle(shuffled_deck)
+    (rng or random).shuffle(shuffled_deck)
 
     # 計算每位玩家應得的牌數
     cards_per_player = len(shuffled_deck) // num_players
@@ -50,8 +51,8 @@ def validate_played_cards(played_cards: List[str], hand: List[str]) -> Tuple[boo
     if invalid_cards:
         return False, f"無效的牌: {invalid_cards}"
 
-    # 檢查是否擁有這些牌
-    if not all(card in hand for card in played_cards):
+    # 檢查是否擁有這些牌（查表，含張數檢查）
+    if not is_legal_play(pack_hand(hand), pack_hand(played_cards)):
         return False, "你沒有這些牌"
 
     return True, ""
@@ -0,0 +1,44 @@
+# liars_bar/utils/file_lock.py
+"""
+跨進程的檔案鎖（POSIX 用 fcntl.flock，Windows 用 msvcrt.locking）
+
+鎖在獨立的鎖檔上：受保護的資料檔通常會以 os.replace 整個替換，不能拿來上鎖。
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_path: str, blocking: bool = True):
+    """
+    取得 lock_path 的互斥鎖，離開 with 區塊時釋放
+    blocking 為 False 且鎖已被其他進程持有時拋出 BlockingIOError
+    """
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                # LK_LOCK 最多重試 10 秒，逾時拋出 OSError
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError as e:
+            if blocking:
+                raise
+            raise BlockingIOError(f"檔案鎖已被佔用: {lock_path}") from e
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
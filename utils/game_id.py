@@ -0,0 +1,122 @@
+# liars_bar/utils/game_id.py
+"""
+跨進程安全的遊戲編號分配
+
+編號仍存放在 log/game_info.json 的 game_count（與舊版格式相同），
+但讀取、遞增、寫回都在同一個檔案鎖內完成（POSIX 用 fcntl.flock，Windows 用 msvcrt.locking），
+並以暫存檔加 os.replace 寫回，同時開始遊戲的多個進程不會拿到相同的編號，中斷時也不會留下損壞的檔案。
+
+block_size 大於 1 時一次保留一段連續編號，之後在進程內分配不需任何檔案 I/O，
+適合大量平行的模擬工作進程；進程結束時未用完的編號會被跳過（編號可能不連續，但不會重複）。
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, Optional
+from utils.file_lock import file_lock
+
+DEFAULT_GAME_INFO_PATH = os.path.join("log", "game_info.json")
+_GAME_DIR = re.compile(r"game_(\d+)(?:_|$)")
+
+
+class GameIdAllocator:
+    """遊戲編號分配器"""
+
+    def __init__(self, path: str = DEFAULT_GAME_INFO_PATH, block_size: int = 1):
+        """
+        path: 編號檔路徑（轉為絕對路徑，之後切換工作目錄不受影響）
+        block_size: 每次向檔案保留的編號數量
+        """
+        if block_size < 1:
+            raise ValueError("block_size 必須至少為 1")
+        self.path = os.path.abspath(path)
+        # 鎖檔與暫存檔以 "." 開頭，不會被當成 game_* 記錄目錄列出
+        directory, name = os.path.split(self.path)
+        self.lock_path = os.path.join(directory, f".{name}.lock")
+        self._tmp_prefix = os.path.join(directory, f".{name}")
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        """取得下一個編號"""
+        with self._lock:
+            # fork 出的子進程不能沿用父進程保留的編號
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                block = self.reserve(self.block_size)
+                self._next, self._end = block.start, block.stop
+            game_id = self._next
+            self._next += 1
+            return game_id
+
+    def reserve(self, count: int) -> range:
+        """直接向檔案保留 count 個連續編號"""
+        if count < 1:
+            raise ValueError("count 必須至少為 1")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with file_lock(self.lock_path):
+            data = self._read()
+            start = int(data.get("game_count", 0)) + 1
+            data["game_count"] = start + count - 1
+            tmp_path = f"{self._tmp_prefix}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        return range(start, start + count)
+
+    def peek(self) -> int:
+        """目前檔案中已分配的最大編號（不保留）"""
+        return int(self._read().get("game_count", 0))
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict) or not isinstance(data.get("game_count", 0), int):
+            # 舊版非原子寫入可能留下損壞的檔案：改由現有的 game_<編號> 目錄推算，避免編號重複
+            return {"game_count": self._scan_directories()}
+        return data
+
+    def _scan_directories(self) -> int:
+        """記錄目錄中 game_<編號>[_...] 的最大編號"""
+        largest = 0
+        try:
+            names = os.listdir(os.path.dirname(self.path))
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            match = _GAME_DIR.match(name)
+            if match:
+                largest = max(largest, int(match.group(1)))
+        return largest
+
+
+_ALLOCATORS: Dict[str, GameIdAllocator] = {}
+_ALLOCATORS_LOCK = threading.Lock()
+
+
+def get_allocator(path: str = DEFAULT_GAME_INFO_PATH,
+                  block_size: Optional[int] = None) -> GameIdAllocator:
+    """取得某個編號檔的共用分配器（依絕對路徑快取；block_size 只在第一次建立時生效）"""
+    key = os.path.abspath(path)
+    with _ALLOCATORS_LOCK:
+        allocator = _ALLOCATORS.get(key)
+        if allocator is None:
+            allocator = GameIdAllocator(key, block_size or 1)
+            _ALLOCATORS[key] = allocator
+        return allocator
+
+
+def next_game_id(path: str = DEFAULT_GAME_INFO_PATH) -> int:
+    """取得下一個遊戲編號"""
+    return get_allocator(path).next_id()
@@ -0,0 +1,347 @@
+# liars_bar/utils/log_archive.py
+"""
+記錄目錄封存
+
+log/ 每局一個目錄，長時間運行後會耗盡 inode。LogArchiver 把已結束的 game_* 目錄
+每 games_per_bundle 局打包成一個壓縮檔（archive/bundle_<編號>.zip），登記到 archive/index.json 後刪除原目錄。
+
+- 已結束：events.jsonl 最後一筆是 end 記錄，或有 GameLogger 的 game_result.md；
+  兩者皆無的舊目錄在 stale_after 秒沒有變動後也視為已結束
+- 目錄內所有檔案至少 min_age 秒沒有變動才會處理；打包後再比對一次檔案簽章（數量、大小、修改時間），
+  打包期間有變動的目錄從壓縮檔中剔除（重新打包其餘目錄），不登記也不刪除，留待下次處理
+- 先寫暫存檔再改名，最後才更新索引、刪除目錄；任何一步中斷都不會遺失記錄。
+  已登記的目錄若仍存在：剩下的檔案都與壓縮檔內容相同（刪除到一半中斷）就直接刪除，
+  否則表示封存後又有變動，重新封存並讓索引改指向新的壓縮檔
+- 同一時間只有一個進程執行封存（archive/.lock），可在遊戲進行中由背景執行緒定期執行
+
+採用 ZIP（deflate）而非 tar.gz：ZIP 的中央目錄可直接定位單一成員，
+ArchiveReader 能串流讀出某一局的檔案而不需解開整個壓縮檔。
+"""
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+from utils.file_lock import file_lock
+from utils.record_renderer import EVENTS_FILE, iter_records
+
+DEFAULT_ARCHIVE_DIR = os.path.join("log", "archive")
+INDEX_FILE = "index.json"
+_GAME_DIR = re.compile(r"game_\d+(?:_.+)?$")
+_RESULT_FILE = "game_result.md"
+_FORMAT_VERSION = 1
+
+
+def _signature(path: str) -> Tuple[int, int, int]:
+    """目錄的檔案簽章：(檔案數, 總大小, 最新修改時間 ns)"""
+    count = size = latest = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            st = os.stat(os.path.join(root, name))
+            count += 1
+            size += st.st_size
+            latest = max(latest, st.st_mtime_ns)
+    return count, size, latest
+
+
+def _file_crc(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _last_record_type(events_path: str) -> Optional[str]:
+    """只讀檔尾，取得最後一筆完整記錄的類型"""
+    with open(events_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 4096))
+        tail = f.read()
+    lines = tail.split(b"\n")
+    # 最後一個元素是換行之後（可能寫到一半）的內容
+    for line in reversed(lines[:-1]):
+        if line.strip():
+            try:
+                return json.loads(line).get("type")
+            except ValueError:
+                return None
+    return None
+
+
+def load_index(archive_dir: str) -> Dict:
+    """讀取封存索引；不存在時返回空索引"""
+    path = os.path.join(archive_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"version": _FORMAT_VERSION, "next_bundle": 0, "games": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"封存索引版本不符: {path}")
+    return index
+
+
+def _save_index(archive_dir: str, index: Dict):
+    path = os.path.join(archive_dir, INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class LogArchiver:
+    """將已結束的記錄目錄封存成壓縮檔"""
+
+    def __init__(self, log_root: str = "log", archive_dir: Optional[str] = None,
+                 games_per_bundle: int = 100, min_age: float = 60.0,
+                 stale_after: float = 3600.0):
+        """
+        log_root: 包含 game_* 目錄的記錄根目錄
+        archive_dir: 封存目錄，預設為 log_root/archive
+        games_per_bundle: 每個壓縮檔的局數
+        min_age: 目錄至少多少秒沒有變動才處理
+        stale_after: 沒有結束記錄的目錄多少秒沒有變動後視為已結束
+        """
+        if games_per_bundle < 1:
+            raise ValueError("games_per_bundle 必須至少為 1")
+        self.log_root = os.path.abspath(log_root)
+        self.archive_dir = os.path.abspath(archive_dir or os.path.join(log_root, "archive"))
+        self.games_per_bundle = games_per_bundle
+        self.min_age = min_age
+        self.stale_after = stale_after
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _finished(self, path: str, signature: Tuple[int, int, int], now: float) -> bool:
+        age = now - signature[2] / 1e9
+        if signature[0] == 0 or age < self.min_age:
+            return False
+        events_path = os.path.join(path, EVENTS_FILE)
+        if os.path.exists(events_path) and _last_record_type(events_path) == "end":
+            return True
+        if os.path.exists(os.path.join(path, _RESULT_FILE)):
+            return True
+        return age >= self.stale_after
+
+    def candidates(self) -> List[Tuple[str, Tuple[int, int, int]]]:
+        """可以封存的目錄名稱與簽章（依名稱排序）"""
+        now = time.time()
+        result = []
+        for name in sorted(os.listdir(self.log_root)):
+            path = os.path.join(self.log_root, name)
+            if not _GAME_DIR.match(name) or not os.path.isdir(path):
+                continue
+            signature = _signature(path)
+            if self._finished(path, signature, now):
+                result.append((name, signature))
+        return result
+
+    def archive_once(self, flush_partial: bool = False) -> int:
+        """
+        封存一次，返回封存的局數；只寫滿 games_per_bundle 局的壓縮檔（flush_partial 時也寫入剩餘的局）
+        其他進程正在封存時直接返回 0
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        try:
+            with file_lock(os.path.join(self.archive_dir, ".lock"), blocking=False):
+                return self._archive(flush_partial)
+        except BlockingIOError:
+            return 0
+
+    def _archive(self, flush_partial: bool) -> int:
+        index = load_index(self.archive_dir)
+        games = index["games"]
+        for name in os.listdir(self.log_root):
+            path = os.path.join(self.log_root, name)
+            if name in games and os.path.isdir(path) and self._in_bundle(name, games[name]["bundle"]):
+                # 上次登記後、刪除完成前中斷（可能已刪掉一部分）：剩下的檔案都在壓縮檔中，直接刪除
+                shutil.rmtree(path)
+
+        candidates = self.candidates()
+        archived = 0
+        n = self.games_per_bundle
+        for start in range(0, len(candidates), n):
+            group = candidates[start:start + n]
+            if len(group) < n and not flush_partial:
+                break
+            archived += self._write_bundle(index, group)
+        return archived
+
+    def _in_bundle(self, name: str, bundle: str) -> bool:
+        """目錄中剩下的每個檔案是否都與壓縮檔中的成員內容相同"""
+        try:
+            with zipfile.ZipFile(os.path.join(self.archive_dir, bundle)) as zf:
+                members = {info.filename: info for info in zf.infolist()}
+        except (OSError, zipfile.BadZipFile):
+            return False
+        for root, _, files in os.walk(os.path.join(self.log_root, name)):
+            for filename in files:
+                path = os.path.join(root, filename)
+                info = members.get(os.path.relpath(path, self.log_root).replace(os.sep, "/"))
+                if (info is None or info.file_size != os.path.getsize(path)
+                        or info.CRC != _file_crc(path)):
+                    return False
+        return True
+
+    def _pack(self, path: str, group: List[Tuple[str, Tuple[int, int, int]]]):
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, _ in group:
+                game_dir = os.path.join(self.log_root, name)
+                for root, _, files in os.walk(game_dir):
+                    for filename in sorted(files):
+                        file_path = os.path.join(root, filename)
+                        arcname = os.path.relpath(file_path, self.log_root).replace(os.sep, "/")
+                        zf.write(file_path, arcname)
+
+    def _write_bundle(self, index: Dict, group: List[Tuple[str, Tuple[int, int, int]]]) -> int:
+        bundle = f"bundle_{index['next_bundle']:05d}.zip"
+        bundle_path = os.path.join(self.archive_dir, bundle)
+        tmp_path = bundle_path + ".tmp"
+        # 打包期間有變動的目錄不登記，留待下次處理；壓縮檔中也不能留下它們打包到一半的內容，
+        # 因此剔除後重新打包，直到打包前後簽章全部相同
+        stable = group
+        while stable:
+            self._pack(tmp_path, stable)
+            unchanged = [(name, signature) for name, signature in stable
+                         if _signature(os.path.join(self.log_root, name)) == signature]
+            if len(unchanged) == len(stable):
+                break
+            stable = unchanged
+        if not stable:
+            os.remove(tmp_path)
+            return 0
+        os.replace(tmp_path, bundle_path)
+
+        index["next_bundle"] += 1
+        for name, signature in stable:
+            if name in index["games"]:
+                print(f"警告: {name} 封存後又有變動，已重新封存至 {bundle}")
+            index["games"][name] = {"bundle": bundle, "signature": list(signature)}
+        _save_index(self.archive_dir, index)
+        for name, _ in stable:
+            shutil.rmtree(os.path.join(self.log_root, name))
+        return len(stable)
+
+    def start(self, interval: float = 60.0, flush_partial: bool = False):
+        """以背景執行緒每 interval 秒封存一次"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.archive_once(flush_partial)
+                except OSError as e:
+                    print(f"封存記錄時出錯: {e}")
+
+        self._thread = threading.Thread(target=run, name="log-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止背景封存"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class ArchiveReader:
+    """由封存檔串流讀取單一局的記錄，不解開整個壓縮檔"""
+
+    def __init__(self, archive_dir: str = DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._index_version = None
+        self._games: Dict[str, Dict] = {}
+        self._bundles: Dict[str, zipfile.ZipFile] = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """索引有更新時重新載入"""
+        path = os.path.join(self.archive_dir, INDEX_FILE)
+        try:
+            st = os.stat(path)
+            version = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            version = None
+        if version != self._index_version:
+            self._games = load_index(self.archive_dir)["games"]
+            self._index_version = version
+
+    def games(self) -> List[str]:
+        """已封存的局（目錄名稱）"""
+        self.refresh()
+        return sorted(self._games)
+
+    def __contains__(self, game: str) -> bool:
+        if game not in self._games:
+            self.refresh()
+        return game in self._games
+
+    def files(self, game: str) -> List[str]:
+        """某一局封存的檔名"""
+        prefix = game + "/"
+        return [info.filename[len(prefix):] for info in self._bundle(game).infolist()
+                if info.filename.startswith(prefix)]
+
+    def open(self, game: str, filename: str = EVENTS_FILE) -> IO[bytes]:
+        """開啟某一局的某個檔案（二進位串流）"""
+        bundle = self._bundle(game)
+        try:
+            return bundle.open(f"{game}/{filename}")
+        except KeyError:
+            raise FileNotFoundError(f"封存中找不到 {game}/{filename}") from None
+
+    def read_text(self, game: str, filename: str) -> str:
+        with self.open(game, filename) as f:
+            return f.read().decode("utf-8")
+
+    def read_records(self, game: str) -> Iterator[Dict]:
+        """串流讀取某一局的 events.jsonl"""
+        with self.open(game) as f:
+            yield from iter_records(io.TextIOWrapper(f, encoding="utf-8"))
+
+    def extract(self, game: str, dest_root: str) -> str:
+        """將某一局還原成目錄，返回目錄路徑"""
+        bundle = self._bundle(game)
+        prefix = game + "/"
+        for info in bundle.infolist():
+            if info.filename.startswith(prefix):
+                bundle.extract(info, dest_root)
+        return os.path.join(dest_root, game)
+
+    def close(self):
+        with self._lock:
+            for bundle in self._bundles.values():
+                bundle.close()
+            self._bundles.clear()
+
+    def _bundle(self, game: str) -> zipfile.ZipFile:
+        if game not in self:
+            raise FileNotFoundError(f"封存中找不到這一局: {game}")
+        name = self._games[game]["bundle"]
+        with self._lock:
+            bundle = self._bundles.get(name)
+            if bundle is None:
+                bundle = zipfile.ZipFile(os.path.join(self.archive_dir, name))
+                self._bundles[name] = bundle
+            return bundle
+
+
+def open_log_file(game: str, filename: str = EVENTS_FILE, log_root: str = "log",
+                  archive_dir: Optional[str] = None) -> IO[bytes]:
+    """開啟某一局的記錄檔：目錄還在時直接讀取，已封存時由壓縮檔串流讀取"""
+    path = os.path.join(log_root, game, filename)
+    if os.path.exists(path):
+        return open(path, "rb")
+    reader = ArchiveReader(archive_dir or os.path.join(log_root, "archive"))
+    # 串流持有壓縮檔的參照，關閉串流後壓縮檔才會真正關閉
+    return reader.open(game, filename)
@@ -0,0 +1,151 @@
+# liars_bar/utils/log_context.py
+"""
+增量讀取的記錄上下文
+
+AI 決策每一步都需要目前這一局的記錄（完整內容或最後 K 個回合）。LogTail 記住已讀到的位元組位置，
+每次只讀取檔案新增的部分，並在讀入時記下回合標記的位置：
+- text()：完整內容
+- last_rounds(k)：從倒數第 k 個回合標記開始的內容（標記不足 k 個時返回完整內容）
+讀取成本只與新增的位元組數有關，last_rounds 只串接最後幾個回合所在的區塊。
+
+記錄檔預期只會附加；每次讀取前會比對上次讀到的最後幾個位元組，檔案被截斷或改寫時自動從頭重讀。
+get_log_context() 提供以路徑共用的實例，同一進程內的多個呼叫端不會重複讀檔；
+一局結束時以 release_log_directory() 釋放該局目錄下的所有實例。
+"""
+import codecs
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional
+
+DEFAULT_ROUND_MARKER = "## 回合"
+_GUARD_BYTES = 64
+
+
+class LogTail:
+    """以位元組位置增量讀取單一記錄檔"""
+
+    def __init__(self, path: str, marker: str = DEFAULT_ROUND_MARKER):
+        self.path = path
+        self.marker = marker
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._guard = b""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._chunks: List[str] = []
+        self._starts: List[int] = []  # 每個區塊在內容中的起始字元位置
+        self._length = 0
+        self._markers: List[int] = []  # 回合標記的字元位置
+        self._text: Optional[str] = None
+
+    def refresh(self) -> int:
+        """讀取檔案新增的內容，返回新增的字元數；檔案不存在時拋出 FileNotFoundError"""
+        with self._lock:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self._offset or not self._guard_matches(f):
+                    self._reset()
+                if size == self._offset:
+                    return 0
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+            self._offset += len(data)
+            self._guard = (self._guard + data)[-_GUARD_BYTES:]
+            return self._append(self._decoder.decode(data))
+
+    def _guard_matches(self, f) -> bool:
+        """上次讀到的最後幾個位元組是否仍相同（檔案未被改寫）"""
+        if not self._guard:
+            return True
+        f.seek(self._offset - len(self._guard))
+        return f.read(len(self._guard)) == self._guard
+
+    def _append(self, text: str) -> int:
+        if not text:
+            return 0
+        # 與前一區塊的交界處也可能出現標記
+        overlap = len(self.marker) - 1
+        tail = self._chunks[-1][-overlap:] if self._chunks and overlap else ""
+        window = tail + text
+        base = self._length - len(tail)
+        pos = window.find(self.marker)
+        while pos != -1:
+            self._markers.append(base + pos)
+            pos = window.find(self.marker, pos + 1)
+
+        self._starts.append(self._length)
+        self._chunks.append(text)
+        self._length += len(text)
+        self._text = None
+        return len(text)
+
+    def text(self) -> str:
+        """完整內容（先讀取新增的部分）"""
+        self.refresh()
+        with self._lock:
+            if self._text is None:
+                self._text = "".join(self._chunks)
+                # 合併成單一區塊，之後的切片不必再串接
+                self._chunks = [self._text]
+                self._starts = [0]
+            return self._text
+
+    def last_rounds(self, k: int) -> str:
+        """從倒數第 k 個回合標記開始的內容；標記不足 k 個時返回完整內容"""
+        self.refresh()
+        with self._lock:
+            if k <= 0 or len(self._markers) < k:
+                start = 0
+            else:
+                start = self._markers[-k]
+            if self._text is not None:
+                return self._text[start:]
+            i = bisect_right(self._starts, start) - 1
+            parts = [self._chunks[i][start - self._starts[i]:]]
+            parts.extend(self._chunks[i + 1:])
+            return "".join(parts)
+
+    def round_count(self) -> int:
+        """目前讀到的回合標記數量"""
+        self.refresh()
+        return len(self._markers)
+
+
+_TAILS: "OrderedDict[tuple, LogTail]" = OrderedDict()
+_TAILS_LOCK = threading.Lock()
+MAX_OPEN_CONTEXTS = 64
+
+
+def get_log_context(path: str, marker: str = DEFAULT_ROUND_MARKER) -> LogTail:
+    """取得某個記錄檔的共用 LogTail（最多保留 MAX_OPEN_CONTEXTS 個，最久未使用的先移除）"""
+    key = (os.path.abspath(path), marker)
+    with _TAILS_LOCK:
+        tail = _TAILS.get(key)
+        if tail is None:
+            tail = LogTail(key[0], marker)
+            _TAILS[key] = tail
+            while len(_TAILS) > MAX_OPEN_CONTEXTS:
+                _TAILS.popitem(last=False)
+        else:
+            _TAILS.move_to_end(key)
+        return tail
+
+
+def release_log_context(path: str, marker: str = DEFAULT_ROUND_MARKER):
+    """釋放單一記錄檔在記憶體中的內容"""
+    with _TAILS_LOCK:
+        _TAILS.pop((os.path.abspath(path), marker), None)
+
+
+def release_log_directory(directory: str) -> int:
+    """一局結束後釋放該局記錄目錄下所有記錄檔的內容（不論標記），返回釋放的數量"""
+    prefix = os.path.join(os.path.abspath(directory), "")
+    with _TAILS_LOCK:
+        keys = [key for key in _TAILS if key[0].startswith(prefix)]
+        for key in keys:
+            del _TAILS[key]
+    return len(keys)
@@ -0,0 +1,216 @@
+# liars_bar/utils/log_sink.py
+"""
+背景執行緒的非同步記錄輸出
+
+遊戲執行緒只把 (路徑, 文字) 放進有界佇列就返回，由單一寫入執行緒依序取出、
+合併同一檔案的連續記錄後批次寫入，因此出牌的延遲不再受磁碟（或掛載在 NFS 上的 log/）影響。
+佇列滿時 write() 會等待，記憶體用量有上限。
+
+寫入執行緒在佇列累積 batch_size 筆或距上次寫入超過 flush_interval 秒時寫出並 flush；
+flush() 會等到呼叫前放入的所有項目都寫到檔案為止，close() 另外會關閉所有檔案並結束執行緒。
+寫入時的任何例外都記錄下來，在下一次 flush()/close() 時於呼叫端拋出；寫入執行緒意外結束時
+flush() 也會拋出例外，而不是永遠等待。
+共用的 get_sink() 在程式正常結束時（atexit）自動 close，不會遺失已放入佇列的記錄。
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+# 佇列項目種類
+_DATA = "data"
+_FLUSH = "flush"
+_RELEASE = "release"
+_STOP = "stop"
+
+
+class AsyncLogSink:
+    """有界佇列加上單一寫入執行緒的記錄輸出"""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256, flush_interval: float = 0.5):
+        """
+        max_queue: 佇列上限（筆數），滿時 write() 會等待
+        batch_size: 累積多少筆就喚醒寫入執行緒
+        flush_interval: 最久多少秒寫出一次
+        """
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # deque 的 append/popleft 本身是執行緒安全的；只在達到門檻時才喚醒寫入執行緒，
+        # 避免每筆記錄都造成一次執行緒切換
+        self._items: deque = deque()
+        self._wakeup = threading.Event()
+        self._space = threading.Condition()
+        self._files: Dict[str, TextIO] = {}
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # 建立時的進程編號：fork 出的子進程沒有寫入執行緒，get_sink() 會另建一個
+        self.pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, path: str, text: str, mode: str = "a"):
+        """
+        放入一筆記錄；mode 為 "w" 時先清空檔案（依放入順序執行）
+        已 close 時改為直接同步寫入，確保不會遺失
+        """
+        self.write_many(((path, text, mode),))
+
+    def write_many(self, entries: Sequence[Tuple[str, str, str]]):
+        """一次放入多筆 (路徑, 文字, 模式) 記錄，佔用佇列中的一個位置"""
+        if self._closed:
+            for path, text, mode in entries:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, mode, encoding="utf-8") as f:
+                    f.write(text)
+            return
+        self._put((_DATA, entries))
+
+    def release(self, paths: Sequence[str]):
+        """寫完已放入的記錄後關閉這些檔案（例如一局結束時）"""
+        if not self._closed:
+            self._put((_RELEASE, tuple(paths)), wake=True)
+
+    def flush(self, timeout: Optional[float] = None):
+        """等待呼叫前放入的所有記錄都寫入檔案；寫入執行緒發生錯誤時在此拋出"""
+        if not self._closed:
+            done = threading.Event()
+            self._put((_FLUSH, done), wake=True)
+            # 分段等待並確認寫入執行緒仍在運行，執行緒結束後不再等待
+            waited = 0.0
+            while not done.wait(self.flush_interval):
+                waited += self.flush_interval
+                if not self._thread.is_alive():
+                    self._raise_error()
+                    raise RuntimeError("記錄寫入執行緒已停止，記錄未寫入")
+                if timeout is not None and waited >= timeout:
+                    break
+        self._raise_error()
+
+    def close(self, timeout: Optional[float] = None):
+        """寫完所有記錄、關閉檔案並結束寫入執行緒"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._put((_STOP, None), wake=True)
+        self._thread.join(timeout)
+        self._raise_error()
+
+    def _put(self, item, wake: bool = False):
+        items = self._items
+        if len(items) >= self.max_queue:
+            # 佇列已滿：喚醒寫入執行緒並等待空間
+            self._wakeup.set()
+            with self._space:
+                while len(items) >= self.max_queue and self._thread.is_alive():
+                    self._space.wait(self.flush_interval)
+        items.append(item)
+        if wake or len(items) >= self.batch_size:
+            self._wakeup.set()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise OSError(f"記錄寫入失敗: {error}") from error
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as e:
+            # 不應發生：記錄錯誤並放行等待中的 flush()，之後的 flush() 會發現執行緒已結束
+            self._error = e
+            while self._items:
+                kind, payload = self._items.popleft()
+                if kind is _FLUSH:
+                    payload.set()
+            with self._space:
+                self._space.notify_all()
+
+    def _loop(self):
+        items = self._items
+        pending: List[Tuple[str, str, str]] = []
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            # 先清除再取出：清除之後才放入的項目會重新設定事件，不會遺漏
+            self._wakeup.clear()
+            stop = False
+            while items:
+                kind, payload = items.popleft()
+                if kind is _DATA:
+                    pending.extend(payload)
+                    continue
+                self._write_batch(pending)
+                if kind is _FLUSH:
+                    payload.set()
+                elif kind is _RELEASE:
+                    for released in payload:
+                        self._close_file(released)
+                else:
+                    stop = True
+            self._write_batch(pending)
+            with self._space:
+                self._space.notify_all()
+            if stop:
+                for opened in list(self._files):
+                    self._close_file(opened)
+                return
+
+    def _write_batch(self, pending: List[Tuple[str, str, str]]):
+        """依放入順序寫出；同一檔案連續的附加項目合併成一次寫入，最後 flush 所有碰到的檔案"""
+        if not pending:
+            return
+        touched = {}
+        try:
+            i = 0
+            while i < len(pending):
+                path, text, mode = pending[i]
+                parts = [text]
+                i += 1
+                while i < len(pending) and pending[i][0] == path and pending[i][2] == "a":
+                    parts.append(pending[i][1])
+                    i += 1
+                f = self._open(path, mode)
+                f.write("".join(parts))
+                touched[path] = f
+            for f in touched.values():
+                f.flush()
+        except Exception as e:
+            # 包含不合法的記錄內容（TypeError 等）；記錄後繼續處理之後的項目
+            self._error = e
+        finally:
+            pending.clear()
+
+    def _open(self, path: str, mode: str) -> TextIO:
+        f = self._files.get(path)
+        if mode == "w" or f is None:
+            if f is not None:
+                f.close()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            f = open(path, mode, encoding="utf-8")
+            self._files[path] = f
+        return f
+
+    def _close_file(self, path: str):
+        f = self._files.pop(path, None)
+        if f is not None:
+            try:
+                f.close()
+            except Exception as e:
+                self._error = e
+
+
+_SINK: Optional[AsyncLogSink] = None
+_SINK_LOCK = threading.Lock()
+
+
+def get_sink() -> AsyncLogSink:
+    """取得共用的記錄輸出（第一次呼叫時啟動寫入執行緒，程式結束時自動 close）"""
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None or _SINK._closed or _SINK.pid != os.getpid():
+            _SINK = AsyncLogSink()
+            atexit.register(_SINK.close)
+        return _SINK
@@ -1,16 +1,21 @@
 # liars_bar/utils/logger.py
 import os
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from utils.log_context import release_log_directory
+from utils.log_sink import AsyncLogSink, get_sink
 
 
 class GameLogger:
-    """遊戲日誌記錄器"""
+    """遊戲日誌記錄器（檔案 I/O 由背景寫入執行緒處理）"""
 
-    def __init__(self, log_dir="log"):
+    def __init__(self, log_dir="log", sink: Optional[AsyncLogSink] = None):
         self.log_dir = log_dir
+        # 背景寫入時工作目錄可能已改變，先轉成絕對路徑
+        self._root = os.path.abspath(log_dir)
         self.current_game_id = None
         self.round_count = 0
+        self.sink = sink or get_sink()
 
         # 確保日誌目錄存在
         if not os.path.exists(log_dir):
@@ -22,38 +27,38 @@ class GameLogger:
         self.round_count = 1
 
         # 創建遊戲日誌目錄
-        game_dir = os.path.join(self.log_dir, f"game_{game_id}")
+        game_dir = os.path.join(self._root, f"game_{game_id}")
         if not os.path.exists(game_dir):
             os.makedirs(game_dir)
 
         # 記錄遊戲初始狀態
-        with open(os.path.join(game_dir, "game_info.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 遊戲 {game_id} 資訊\n\n")
-            f.write(
-                f"開始時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"目標牌: {target_card}\n\n")
-            f.write("## 玩家初始狀態\n\n")
-
-            for player in players:
-                f.write(f"### 玩家 {player.id}\n")
-                f.write(f"- 手牌: {player.hand}\n")
-                f.write(f"- 子彈位置: {player.bullet_pos}\n")
-                f.write(f"- 槍管位置: {player.gun_pos}\n\n")
+        info = [
+            f"# 遊戲 {game_id} 資訊\n\n",
+            f"開始時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"目標牌: {target_card}\n\n",
+            "## 玩家初始狀態\n\n"
+        ]
+        for player in players:
+            info.append(f"### 玩家 {player.id}\n")
+            info.append(f"- 手牌: {player.hand}\n")
+            info.append(f"- 子彈位置: {player.bullet_pos}\n")
+            info.append(f"- 槍管位置: {player.gun_pos}\n\n")
+        self.sink.write(os.path.join(game_dir, "game_info.md"), "".join(info), mode="w")
 
         # 創建回合記錄文件
-        with open(os.path.join(game_dir, "rounds.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 遊戲 {game_id} 回合記錄\n\n")
+        self.sink.write(os.path.join(game_dir, "rounds.md"),
+                        f"# 遊戲 {game_id} 回合記錄\n\n", mode="w")
 
         # 創建 AI 決策記錄文件
-        with open(os.path.join(game_dir, "ai_decisions.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 遊戲 {game_id} AI 決策記錄\n\n")
+        self.sink.write(os.path.join(game_dir, "ai_decisions.md"),
+                        f"# 遊戲 {game_id} AI 決策記錄\n\n", mode="w")
 
     def log_action(self, player_id: int, action_type: str, cards=None, **kwargs) -> None:
         """記錄玩家動作"""
         if self.current_game_id is None:
             return
 
-        game_dir = os.path.join(self.log_dir, f"game_{self.current_game_id}")
+        game_dir = os.path.join(self._root, f"game_{self.current_game_id}")
 
         # 獲取額外參數
         behavior = kwargs.get("behavior", "")
@@ -83,8 +88,7 @@ class GameLogger:
         action_desc += f"\n時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
 
         # 添加到回合記錄
-        with open(os.path.join(game_dir, "rounds.md"), "a", encoding="utf-8") as f:
-            f.write(action_desc)
+        self.sink.write(os.path.join(game_dir, "rounds.md"), action_desc)
 
     def next_round(self) -> None:
         """進入下一回合"""
@@ -95,54 +99,64 @@ class GameLogger:
         if self.current_game_id is None:
             return
 
-        game_dir = os.path.join(self.log_dir, f"game_{self.current_game_id}")
+        game_dir = os.path.join(self._root, f"game_{self.current_game_id}")
 
-        with open(os.path.join(game_dir, "rounds.md"), "a", encoding="utf-8") as f:
-            f.write(f"## 遊戲重置\n\n")
-            f.write(f"- 新目標牌: {target_card}\n")
-            f.write(f"- 存活玩家: {alive_players}\n\n")
+        self.sink.write(os.path.join(game_dir, "rounds.md"),
+                        f"## 遊戲重置\n\n- 新目標牌: {target_card}\n- 存活玩家: {alive_players}\n\n")
 
     def log_game_end(self, winner_id: int, statistics: Dict) -> None:
         """記錄遊戲結束"""
         if self.current_game_id is None:
             return
 
-        game_dir = os.path.join(self.log_dir, f"game_{self.current_game_id}")
-
-        with open(os.path.join(game_dir, "game_result.md"), "w", encoding="utf-8") as f:
-            f.write(f"# 遊戲 {self.current_game_id} 結果\n\n")
-            f.write(
-                f"結束時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"獲勝者: 玩家 {winner_id}\n\n")
-            f.write("## 玩家統計\n\n")
-
-            for player_id, stats in statistics.items():
-                f.write(f"### 玩家 {player_id}\n")
-                f.write(f"- 存活回合數: {stats['survival_rounds']}\n")
-                f.write(f"- 成功質疑次數: {stats['challenge_success']}\n")
-                f.write(f"- 失敗質疑次數: {stats['challenge_fail']}\n")
-                f.write(f"- 開槍次數: {stats['shots_fired']}\n\n")
+        game_dir = os.path.join(self._root, f"game_{self.current_game_id}")
+
+        result = [
+            f"# 遊戲 {self.current_game_id} 結果\n\n",
+            f"結束時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"獲勝者: 玩家 {winner_id}\n\n",
+            "## 玩家統計\n\n"
+        ]
+        for player_id, stats in statistics.items():
+            result.append(f"### 玩家 {player_id}\n")
+            result.append(f"- 存活回合數: {stats['survival_rounds']}\n")
+            result.append(f"- 成功質疑次數: {stats['challenge_success']}\n")
+            result.append(f"- 失敗質疑次數: {stats['challenge_fail']}\n")
+            result.append(f"- 開槍次數: {stats['shots_fired']}\n\n")
+        self.sink.write(os.path.join(game_dir, "game_result.md"), "".join(result), mode="w")
+
+        # 一局結束：寫完並關閉本局的檔案
+        self.sink.release([os.path.join(game_dir, name) for name in
+                           ("game_info.md", "rounds.md", "ai_decisions.md", "game_result.md", "errors.log")])
+        self.sink.flush()
+        release_log_directory(game_dir)
 
     def log_ai_thinking(self, player_id: int, reasoning: str) -> None:
         """記錄 AI 思考過程"""
         if self.current_game_id is None:
             return
 
-        game_dir = os.path.join(self.log_dir, f"game_{self.current_game_id}")
+        game_dir = os.path.join(self._root, f"game_{self.current_game_id}")
 
-        with open(os.path.join(game_dir, "ai_decisions.md"), "a", encoding="utf-8") as f:
-            f.write(f"## 回合 {self.round_count} - 玩家 {player_id} 的思考\n\n")
-            f.write(f"{reasoning}\n\n")
-            f.write(
-                f"時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        self.sink.write(os.path.join(game_dir, "ai_decisions.md"),
+                        f"## 回合 {self.round_count} - 玩家 {player_id} 的思考\n\n"
+                        f"{reasoning}\n\n"
+                        f"時間: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
 
     def log_error(self, error_message: str) -> None:
         """記錄錯誤信息"""
         if self.current_game_id is None:
             return
 
-        game_dir = os.path.join(self.log_dir, f"game_{self.current_game_id}")
+        game_dir = os.path.join(self._root, f"game_{self.current_game_id}")
+
+        self.sink.write(os.path.join(game_dir, "errors.log"),
+                        f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_message}\n")
+
+    def flush(self) -> None:
+        """等待目前為止的日誌都寫入檔案"""
+        self.sink.flush()
 
-        with open(os.path.join(game_dir, "errors.log"), "a", encoding="utf-8") as f:
-            f.write(
-                f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_message}\n")
+    def close(self) -> None:
+        """寫完所有日誌（共用的寫入執行緒會在程式結束時自動關閉）"""
+        self.sink.flush()
@@ -0,0 +1,103 @@
+# liars_bar/utils/move_table.py
+"""
+依手牌組成預先計算的合法出牌表
+
+手牌只有 4 種牌、最多 10 張（兩人局每人 10 張），所有可能組成只有數百種。
+載入時一次列舉每種組成的所有不同出牌（1~3 張的子多重集合）以及每種出牌
+對哪些目標牌算誠實，之後出牌生成與驗證都是以整數編碼為鍵的 O(1) 查表，
+由遊戲引擎的驗證函式與 AI 策略共用。
+"""
+import itertools
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+from models.card import CARD_KINDS, DECK_COMPOSITION, TARGET_CARDS
+from models.packed_state import contains, pack_counts, pack_hand
+
+MIN_PLAY_CARDS = 1
+MAX_PLAY_CARDS = 3
+# 最多兩名玩家分一副牌
+MAX_HAND_SIZE = sum(DECK_COMPOSITION.values()) // 2
+
+_LEGAL_PLAYS: Dict[int, Tuple[int, ...]] = {}
+_LEGAL_PLAY_SETS: Dict[int, FrozenSet[int]] = {}
+_HONEST_PLAYS: Dict[Tuple[int, str], Tuple[int, ...]] = {}
+# 出牌編碼 -> 誠實的目標牌位元遮罩（位元順序同 TARGET_CARDS）
+_HONEST_TARGETS: Dict[int, int] = {}
+# 出牌編碼 -> 排序後的牌
+_PLAY_CARDS: Dict[int, Tuple[str, ...]] = {}
+
+
+def _build_tables():
+    """列舉所有出牌與手牌組成並建立查詢表"""
+    # 所有 1~3 張的出牌
+    plays = []
+    for size in range(MIN_PLAY_CARDS, MAX_PLAY_CARDS + 1):
+        for cards in itertools.combinations_with_replacement(sorted(CARD_KINDS), size):
+            play = pack_hand(cards)
+            plays.append(play)
+            _PLAY_CARDS[play] = cards
+            mask = 0
+            for bit, target in enumerate(TARGET_CARDS):
+                if all(card in (target, "J") for card in cards):
+                    mask |= 1 << bit
+            _HONEST_TARGETS[play] = mask
+
+    # 所有不超過牌組數量與手牌上限的組成
+    ranges = [range(DECK_COMPOSITION[card] + 1) for card in CARD_KINDS]
+    for counts in itertools.product(*ranges):
+        if sum(counts) > MAX_HAND_SIZE:
+            continue
+        hand = pack_counts(counts)
+        legal = tuple(play for play in plays if contains(hand, play))
+        _LEGAL_PLAYS[hand] = legal
+        _LEGAL_PLAY_SETS[hand] = frozenset(legal)
+        for bit, target in enumerate(TARGET_CARDS):
+            _HONEST_PLAYS[(hand, target)] = tuple(
+                play for play in legal if _HONEST_TARGETS[play] >> bit & 1)
+
+
+_build_tables()
+
+
+def legal_plays(hand: int) -> Tuple[int, ...]:
+    """手牌（整數編碼）所有不同的合法出牌"""
+    plays = _LEGAL_PLAYS.get(hand)
+    if plays is None:
+        # 超出表格範圍的手牌（非標準牌組），退回逐一檢查
+        plays = tuple(play for play in _PLAY_CARDS if contains(hand, play))
+    return plays
+
+
+def is_legal_play(hand: int, play: int) -> bool:
+    """出牌是否為手牌的合法出牌（1~3 張且手牌中擁有足夠張數）"""
+    plays = _LEGAL_PLAY_SETS.get(hand)
+    if plays is None:
+        return play in _PLAY_CARDS and contains(hand, play)
+    return play in plays
+
+
+def honest_plays(hand: int, target_card: str) -> Tuple[int, ...]:
+    """手牌中對目標牌誠實（只含目標牌與 Joker）的合法出牌"""
+    plays = _HONEST_PLAYS.get((hand, target_card))
+    if plays is None:
+        plays = tuple(play for play in legal_plays(hand) if is_honest_play(play, target_card))
+    return plays
+
+
+def is_honest_play(play: int, target_card: str) -> bool:
+    """出牌對目標牌是否誠實"""
+    return bool(_HONEST_TARGETS.get(play, 0) >> TARGET_CARDS.index(target_card) & 1)
+
+
+def play_cards(play: int) -> Tuple[str, ...]:
+    """出牌編碼對應的牌（已排序）"""
+    return _PLAY_CARDS[play]
+
+
+def legal_play_lists(hand: Sequence[str]) -> List[List[str]]:
+    """以牌列表表示的所有合法出牌，供以列表操作的策略使用"""
+    return [list(_PLAY_CARDS[play]) for play in legal_plays(pack_hand(hand))]
+
+
+def table_size() -> Tuple[int, int]:
+    """(手牌組成數, 總出牌項目數)"""
+    return len(_LEGAL_PLAYS), sum(len(p) for p in _LEGAL_PLAYS.values())
@@ -0,0 +1,240 @@
+# liars_bar/utils/record_export.py
+"""
+將已結束的對局匯出成欄式 NumPy 分片，供大量資料分析
+
+每個動作一列，所有欄位都是整數編碼的 NumPy 陣列：
+- game, round, seq, player：局編號、回合、本局內的動作序號、玩家
+- action：動作類型（ACTION_CODES，未知類型為 OTHER_ACTION）
+- target：當時的目標牌（CARD_CODES 中的索引，-1 表示未知）
+- played_A / played_K / played_Q / played_J：出牌中各牌面的張數；played：出牌總張數
+- remaining：出牌後剩餘的手牌張數
+- honest：出牌是否全為目標牌或 J（1/0；非出牌動作為 -1）
+- success：質疑是否成功；hit：開槍是否中彈（1/0；不適用為 -1）
+- shots：動作後的累計開槍次數
+
+輸出目錄的每個分片是一個子目錄，每欄一個 .npy 檔，以 np.load(mmap_mode="r") 直接映射，
+百萬列只需讀取實際用到的欄位。manifest.json 記錄各分片的列數與已匯出的記錄目錄，
+再次匯出時只處理新的對局並寫成新的分片。
+"""
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from utils.record_renderer import EVENTS_FILE, read_records
+
+ACTION_CODES = {"play": 0, "challenge": 1, "shoot": 2}
+OTHER_ACTION = 3
+CARD_CODES = ("A", "K", "Q", "J")
+_CARD_INDEX = {card: i for i, card in enumerate(CARD_CODES)}
+
+# 欄位名稱 -> dtype
+COLUMNS = {
+    "game": np.int64,
+    "round": np.int32,
+    "seq": np.int32,
+    "player": np.int8,
+    "action": np.int8,
+    "target": np.int8,
+    "played_A": np.int8,
+    "played_K": np.int8,
+    "played_Q": np.int8,
+    "played_J": np.int8,
+    "played": np.int8,
+    "remaining": np.int8,
+    "honest": np.int8,
+    "success": np.int8,
+    "hit": np.int8,
+    "shots": np.int8,
+}
+
+MANIFEST_FILE = "manifest.json"
+_FORMAT_VERSION = 1
+
+
+def _flag(value: Optional[bool]) -> int:
+    return -1 if value is None else int(bool(value))
+
+
+class ColumnBuilder:
+    """逐列累積動作，最後轉成欄式陣列"""
+
+    def __init__(self):
+        self.rows: Dict[str, List[int]] = {name: [] for name in COLUMNS}
+        self._append = [self.rows[name].append for name in COLUMNS]
+
+    def __len__(self) -> int:
+        return len(self.rows["game"])
+
+    def add(self, game_id: int, round_number: int, seq: int, player_id: int, action_type: str,
+            target_card: Optional[str], cards_played: Sequence[str], remaining: int,
+            shots: int, success: Optional[bool] = None, hit: Optional[bool] = None):
+        counts = [0, 0, 0, 0]
+        for card in cards_played:
+            index = _CARD_INDEX.get(card)
+            if index is not None:
+                counts[index] += 1
+        action = ACTION_CODES.get(action_type, OTHER_ACTION)
+        if action == ACTION_CODES["play"] and target_card is not None:
+            honest = int(counts[0] + counts[1] + counts[2] + counts[3]
+                         == counts[_CARD_INDEX[target_card]] + counts[3])
+        else:
+            honest = -1
+        values = (game_id, round_number, seq, player_id, action,
+                  _CARD_INDEX.get(target_card, -1), counts[0], counts[1], counts[2], counts[3],
+                  len(cards_played), remaining, honest, _flag(success), _flag(hit), shots or 0)
+        for append, value in zip(self._append, values):
+            append(value)
+
+    def add_records(self, game_id: int, records: Iterable[Dict]) -> int:
+        """加入一局 events.jsonl 的所有動作，返回加入的列數"""
+        target = None
+        seq = 0
+        for record in records:
+            kind = record.get("type")
+            if kind == "action":
+                seq += 1
+                self.add(game_id, record["round"], seq, record["player"], record["action"],
+                         target, record["played"], len(record["remaining"]), record["shots"],
+                         record.get("success"), record.get("hit"))
+            elif kind in ("round", "target"):
+                target = record["target"]
+        return seq
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: np.asarray(values, dtype=COLUMNS[name])
+                for name, values in self.rows.items()}
+
+
+def manager_columns(manager) -> Dict[str, np.ndarray]:
+    """由 RecordManager 記憶體中的回合記錄直接產生欄式陣列（不讀檔）"""
+    builder = ColumnBuilder()
+    seq = 0
+    for round_record in manager.round_records:
+        for action in round_record.actions:
+            seq += 1
+            builder.add(manager.game_id, round_record.round_number, seq, action["player_id"],
+                        action["action_type"], action.get("target_card", round_record.target_card),
+                        action["cards_played"], len(action["cards_remaining"]),
+                        action["shots_fired"], action.get("success"), action.get("hit"))
+    return builder.columns()
+
+
+def _game_id(log_dir: str) -> Optional[int]:
+    """由 game_<編號>_<session> 目錄名稱取得局編號"""
+    parts = os.path.basename(os.path.normpath(log_dir)).split("_")
+    if len(parts) >= 3 and parts[0] == "game" and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def _finished(records: List[Dict]) -> bool:
+    return bool(records) and records[-1].get("type") == "end"
+
+
+def load_manifest(out_dir: str) -> Dict:
+    """讀取輸出目錄的清單；不存在時返回空清單"""
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": _FORMAT_VERSION, "columns": list(COLUMNS), "shards": [], "games": []}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != _FORMAT_VERSION:
+        raise ValueError(f"匯出格式版本不符: {path}")
+    return manifest
+
+
+def _save_manifest(out_dir: str, manifest: Dict):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def write_shard(out_dir: str, columns: Dict[str, np.ndarray], games: Sequence[str] = ()) -> str:
+    """將一組欄位寫成新的分片並登記到清單，返回分片目錄"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    name = f"shard_{len(manifest['shards']):05d}"
+    shard_dir = os.path.join(out_dir, name)
+    tmp_dir = shard_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for column, values in columns.items():
+        np.save(os.path.join(tmp_dir, f"{column}.npy"), values)
+    os.replace(tmp_dir, shard_dir)
+
+    # 清單最後才更新：中斷時只會留下未登記的分片，不會有登記了卻不完整的分片
+    manifest["shards"].append({"name": name, "rows": int(len(columns["game"]))})
+    manifest["games"].extend(games)
+    _save_manifest(out_dir, manifest)
+    return shard_dir
+
+
+def export_logs(log_root: str, out_dir: str, shard_rows: int = 1000000,
+                include_unfinished: bool = False) -> Dict[str, int]:
+    """
+    將 log_root 下尚未匯出的 game_<編號>_<session> 記錄目錄匯出到 out_dir
+    shard_rows: 每個分片的列數上限（一局不會跨分片）
+    include_unfinished: 是否包含沒有結束記錄的對局（進行中或中斷）
+    返回 {"games": 匯出局數, "rows": 匯出列數, "shards": 新增分片數, "skipped": 略過局數}
+    """
+    manifest = load_manifest(out_dir)
+    exported = set(manifest["games"])
+    stats = {"games": 0, "rows": 0, "shards": 0, "skipped": 0}
+    builder = ColumnBuilder()
+    pending: List[str] = []
+
+    def flush():
+        if len(builder):
+            write_shard(out_dir, builder.columns(), pending)
+            stats["shards"] += 1
+        pending.clear()
+
+    for name in sorted(os.listdir(log_root)):
+        log_dir = os.path.join(log_root, name)
+        events_path = os.path.join(log_dir, EVENTS_FILE)
+        game_id = _game_id(log_dir)
+        if game_id is None or name in exported or not os.path.exists(events_path):
+            continue
+        records = list(read_records(events_path))
+        if not include_unfinished and not _finished(records):
+            stats["skipped"] += 1
+            continue
+        if len(builder) and len(builder) + len(records) > shard_rows:
+            flush()
+            builder = ColumnBuilder()
+        stats["rows"] += builder.add_records(game_id, records)
+        stats["games"] += 1
+        pending.append(name)
+    flush()
+    return stats
+
+
+def load_actions(out_dir: str, columns: Optional[Sequence[str]] = None,
+                 mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    載入匯出的欄位；只有一個分片時直接返回記憶體映射的陣列，多個分片時串接
+    columns: 只載入這些欄位（預設全部）
+    """
+    manifest = load_manifest(out_dir)
+    names = list(columns) if columns else list(COLUMNS)
+    for name in names:
+        if name not in COLUMNS:
+            raise ValueError(f"未知的欄位: {name}")
+    mode = "r" if mmap else None
+    result = {}
+    for name in names:
+        parts = [np.load(os.path.join(out_dir, shard["name"], f"{name}.npy"), mmap_mode=mode)
+                 for shard in manifest["shards"]]
+        if not parts:
+            result[name] = np.empty(0, dtype=COLUMNS[name])
+        elif len(parts) == 1:
+            result[name] = parts[0]
+        else:
+            result[name] = np.concatenate(parts)
+    return result
@@ -1,8 +1,11 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
-import json
 from datetime import datetime
+from utils.log_context import release_log_directory
+from utils.log_sink import AsyncLogSink, get_sink
+from utils.record_renderer import EVENTS_FILE, encode_record, read_records, render, render_log_directory
+from utils.record_store import RecordStore
 
 
 @dataclass
@@ -30,17 +33,37 @@ class PlayerRecord:
 class RecordManager:
     """遊戲記錄管理器"""
 
-    def __init__(self, game_id: int, session_id: str):
+    def __init__(self, game_id: int, session_id: str, sink: Optional[AsyncLogSink] = None,
+                 store: Optional[RecordStore] = None, num_players: Optional[int] = None):
+        """
+        sink: 記錄輸出，None 時使用共用的背景寫入執行緒
+        store: 選用的 SQLite 記錄庫，提供時每個動作也寫入資料庫
+        num_players: 玩家數量（只寫入記錄庫）
+        """
         self.game_id = game_id
         self.session_id = session_id
         self.log_directory_path = f"log/game_{self.game_id}_{self.session_id}"
         self.current_round = 1
         self.round_records: List[RoundRecord] = []
         self.target_card = ""
+        # get_round_context 用：回合編號索引、每回合已渲染的動作文字與完整文字快取
+        self._round_index: Dict[int, RoundRecord] = {}
+        self._context_body: Dict[int, Tuple[str, int]] = {}
+        self._context_cache: Dict[int, str] = {}
+        # 實際的檔案 I/O 交給背景寫入執行緒，遊戲執行緒只負責放入佇列
+        self.sink = sink or get_sink()
+        # 每局只寫一個 JSONL 事件記錄；背景寫入時工作目錄可能已改變，先轉成絕對路徑
+        self.events_path = os.path.abspath(os.path.join(self.log_directory_path, EVENTS_FILE))
+
+        self.store = store
+        self._action_seq = 0
 
         # 建立記錄目錄
         self._create_directories()
         self._init_record_files()
+        if self.store is not None:
+            self.store.begin_game(self.game_id, self.session_id, num_players,
+                                  self.log_directory_path)
 
     def _create_directories(self):
         """建立記錄目錄"""
@@ -48,17 +71,33 @@ class RecordManager:
 
     def _init_record_files(self):
         """初始化記錄文件"""
-        # 回合內記錄
-        with open(os.path.join(self.log_directory_path, "round_records.md"), "w", encoding="utf-8") as f:
-            f.write("# 回合內記錄\n\n")
-
-        # 玩家視角記錄
-        with open(os.path.join(self.log_directory_path, "player_perspective.md"), "w", encoding="utf-8") as f:
-            f.write("# 玩家視角記錄\n\n")
-
-        # 上帝視角記錄
-        with open(os.path.join(self.log_directory_path, "god_perspective.md"), "w", encoding="utf-8") as f:
-            f.write("# 上帝視角記錄\n\n")
+        self.sink.write(self.events_path, "", mode="w")
+
+    def flush(self):
+        """等待目前為止的記錄都寫入檔案"""
+        self.sink.flush()
+
+    def close(self, winner: Optional[int] = None):
+        """寫完並關閉本局的記錄檔（一局結束時呼叫）；之後若再寫入會自動重新開啟"""
+        ended_at = datetime.now().isoformat()
+        self.sink.write(self.events_path, encode_record(
+            {"type": "end", "winner": winner, "time": ended_at}))
+        if self.store is not None:
+            self.store.end_game(self.game_id, winner, ended_at)
+        self.sink.release([self.events_path])
+        self.sink.flush()
+        # AI 決策讀取本局記錄時快取的內容
+        release_log_directory(self.log_directory_path)
+
+    def render_markdown(self, perspective: str = "god") -> str:
+        """渲染指定視角（round/player/god）的 Markdown 記錄，供人閱讀或放入提示詞"""
+        self.sink.flush()
+        return render(read_records(self.events_path), perspective)
+
+    def write_markdown(self, perspectives: Optional[List[str]] = None) -> List[str]:
+        """將視角記錄渲染成 Markdown 檔寫入記錄目錄，返回檔案路徑"""
+        self.sink.flush()
+        return render_log_directory(self.log_directory_path, perspectives)
 
     def get_log_directory_path(self) -> str:
         """返回當前遊戲記錄的完整目錄路徑"""
@@ -67,62 +106,74 @@ class RecordManager:
     def get_round_context(self, round_number: Optional[int] = None) -> str:
         """獲取指定回合的上下文記錄，用於 AI 決策參考
 
+        以回合編號索引直接取得回合記錄；每個回合的文字會快取，
+        該回合有新動作時只補上新動作的文字，不重新渲染整個回合
+
         Args:
             round_number: 回合編號，如果為 None 則返回當前回合的記錄
 
         Returns:
             str: 格式化的回合記錄文本
         """
-        if not self.round_records:
-            return ""
-
         # 如果沒有指定回合編號，使用當前回合
         if round_number is None:
             round_number = self.current_round
 
         # 找到指定回合的記錄
-        round_record = None
-        for record in self.round_records:
-            if record.round_number == round_number:
-                round_record = record
-                break
-
-        if not round_record:
+        round_record = self._round_index.get(round_number)
+        if round_record is None:
             return ""
 
-        # 構建回合記錄文本
-        context = [
+        cached = self._context_cache.get(round_number)
+        if cached is not None:
+            return cached
+
+        # 只渲染上次之後新增的動作，附加到該回合已渲染的文字後面
+        body, rendered = self._context_body.get(round_number, ("", 0))
+        if rendered < len(round_record.actions):
+            body += "".join(self._render_context_action(action)
+                            for action in round_record.actions[rendered:])
+            self._context_body[round_number] = (body, len(round_record.actions))
+
+        context = (self._render_context_header(round_record) + body
+                   + self._render_context_summary(round_record))
+        self._context_cache[round_number] = context
+        return context
+
+    @staticmethod
+    def _render_context_header(round_record: RoundRecord) -> str:
+        return "\n".join([
             f"# 回合 {round_record.round_number} 記錄",
             f"目標牌: {round_record.target_card}",
             f"時間: {round_record.timestamp}",
             "\n## 玩家動作記錄"
-        ]
+        ])
 
-        # 添加每個玩家的動作記錄
-        for action in round_record.actions:
-            context.extend([
-                f"\n### 玩家 {action['player_id']}",
-                f"- 動作類型: {action['action_type']}",
-                f"- 出牌: {action['cards_played']}",
-                f"- 開槍次數: {action['shots_fired']}",
-                f"- 表現: {action['behavior']}"
-            ])
-
-            # 如果是質疑動作，添加質疑結果
-            if action['action_type'] == 'challenge':
-                context.append(f"- 質疑原因: {action['strategy']}")
-
-        # 添加回合總結
-        context.extend([
-            "\n## 回合總結",
+    @staticmethod
+    def _render_context_action(action: Dict) -> str:
+        text = "\n".join([
+            f"\n\n### 玩家 {action['player_id']}",
+            f"- 動作類型: {action['action_type']}",
+            f"- 出牌: {action['cards_played']}",
+            f"- 開槍次數: {action['shots_fired']}",
+            f"- 表現: {action['behavior']}"
+        ])
+        # 如果是質疑動作，添加質疑結果
+        if action['action_type'] == 'challenge':
+            text += f"\n- 質疑原因: {action['strategy']}"
+        return text
+
+    @staticmethod
+    def _render_context_summary(round_record: RoundRecord) -> str:
+        # 回合總結只與各玩家的開槍次數有關，每次重新產生（玩家數量很小）
+        lines = [
+            "\n\n## 回合總結",
             f"- 總開槍次數: {sum(round_record.shots_fired.values())}",
             "- 玩家開槍次數統計:"
-        ])
-
+        ]
         for player_id, shots in round_record.shots_fired.items():
-            context.append(f"  - 玩家 {player_id}: {shots} 次")
-
-        return "\n".join(context)
+            lines.append(f"  - 玩家 {player_id}: {shots} 次")
+        return "\n".join(lines)
 
     def log_action(self,
                    player_id: int,
@@ -132,8 +183,10 @@ class RecordManager:
                    shots_fired: int,
                    behavior: str,
                    strategy: Optional[str] = None,
-                   bullet_pos: Optional[int] = None):
-        """記錄玩家動作"""
+                   bullet_pos: Optional[int] = None,
+                   success: Optional[bool] = None,
+                   hit: Optional[bool] = None):
+        """記錄玩家動作；success 為質疑動作的結果（上家是否說謊），hit 為開槍動作是否中彈"""
         # 創建玩家記錄
         player_record = PlayerRecord(
             player_id=player_id,
@@ -145,7 +198,8 @@ class RecordManager:
             bullet_pos=bullet_pos
         )
 
-        # 如果是新回合，創建新的回合記錄
+        # 如果是新回合，創建新的回合記錄，並在記錄檔寫入回合事件
+        header = ""
         if not self.round_records or self.round_records[-1].round_number != self.current_round:
             self.round_records.append(RoundRecord(
                 round_number=self.current_round,
@@ -154,10 +208,18 @@ class RecordManager:
                 actions=[],
                 shots_fired={}
             ))
+            round_record = self.round_records[-1]
+            self._round_index[round_record.round_number] = round_record
+            header = encode_record({"type": "round", "round": round_record.round_number,
+                                    "target": round_record.target_card,
+                                    "time": round_record.timestamp})
+            if self.store is not None:
+                self.store.add_round(self.game_id, round_record.round_number,
+                                     round_record.target_card, round_record.timestamp)
 
         # 更新當前回合記錄
         current_round = self.round_records[-1]
-        current_round.actions.append({
+        action = {
             "player_id": player_id,
             "action_type": action_type,
             "cards_played": cards_played,
@@ -165,107 +227,43 @@ class RecordManager:
             "shots_fired": shots_fired,
             "behavior": behavior,
             "strategy": strategy,
-            "bullet_pos": bullet_pos
-        })
+            "bullet_pos": bullet_pos,
+            "target_card": self.target_card,
+            "success": success,
+            "hit": hit
+        }
+        current_round.actions.append(action)
         current_round.shots_fired[player_id] = shots_fired
-
-        # 寫入所有視角的記錄
-        self._write_all_records()
+        self._context_cache.pop(current_round.round_number, None)
+
+        # 只附加這個動作的一行記錄
+        record = {"type": "action", "round": current_round.round_number, "player": player_id,
+                  "action": action_type, "played": cards_played, "remaining": cards_remaining,
+                  "shots": shots_fired, "behavior": behavior, "strategy": strategy,
+                  "bullet": bullet_pos}
+        if success is not None:
+            record["success"] = success
+        if hit is not None:
+            record["hit"] = hit
+        self.sink.write(self.events_path, header + encode_record(record))
+
+        if self.store is not None:
+            self._action_seq += 1
+            self.store.add_action(self.game_id, current_round.round_number, self._action_seq,
+                                  player_id, action_type, self.target_card,
+                                  cards_played, cards_remaining, shots_fired, behavior,
+                                  strategy, bullet_pos, success, hit)
 
     def update_target_card(self, target_card: str):
-        """更新目標牌"""
+        """更新目標牌；目前回合已有記錄時在記錄檔附加一行說明"""
         self.target_card = target_card
         if self.round_records:
             self.round_records[-1].target_card = target_card
-            self._write_all_records()
+            self._context_cache.pop(self.round_records[-1].round_number, None)
+            if self.round_records[-1].round_number == self.current_round:
+                self.sink.write(self.events_path, encode_record(
+                    {"type": "target", "round": self.current_round, "target": target_card}))
 
     def next_round(self):
-        """進入下一回合"""
+        """進入下一回合（新回合的事件在該回合第一個動作時寫入）"""
         self.current_round += 1
-        self._write_all_records()
-
-    def _write_all_records(self):
-        """寫入所有視角的記錄"""
-        self._write_round_records()
-        self._write_player_perspective()
-        self._write_god_perspective()
-
-    def _write_round_records(self):
-        """寫入回合內記錄"""
-        if not self.round_records:
-            return
-
-        current_round = self.round_records[-1]
-        content = [
-            f"\n## 回合 {current_round.round_number}",
-            f"目標牌: {current_round.target_card}",
-            f"時間: {current_round.timestamp}",
-            "\n### 玩家動作"
-        ]
-
-        for action in current_round.actions:
-            content.extend([
-                f"\n#### 玩家 {action['player_id']}",
-                f"- 動作: {action['action_type']}",
-                f"- 出牌: {action['cards_played']}",
-                f"- 開槍次數: {action['shots_fired']}",
-                f"- 表現: {action['behavior']}"
-            ])
-
-        with open(os.path.join(self.log_directory_path, "round_records.md"), "a", encoding="utf-8") as f:
-            f.write("\n".join(content))
-
-    def _write_player_perspective(self):
-        """寫入玩家視角記錄"""
-        if not self.round_records:
-            return
-
-        current_round = self.round_records[-1]
-        content = [
-            f"\n## 回合 {current_round.round_number}",
-            f"目標牌: {current_round.target_card}",
-            f"時間: {current_round.timestamp}",
-            "\n### 玩家動作"
-        ]
-
-        for action in current_round.actions:
-            content.extend([
-                f"\n#### 玩家 {action['player_id']}",
-                f"- 動作: {action['action_type']}",
-                f"- 出牌: {action['cards_played']}",
-                f"- 剩餘手牌: {action['cards_remaining']}",
-                f"- 開槍次數: {action['shots_fired']}",
-                f"- 表現: {action['behavior']}",
-                f"- 策略: {action['strategy']}"
-            ])
-
-        with open(os.path.join(self.log_directory_path, "player_perspective.md"), "a", encoding="utf-8") as f:
-            f.write("\n".join(content))
-
-    def _write_god_perspective(self):
-        """寫入上帝視角記錄"""
-        if not self.round_records:
-            return
-
-        current_round = self.round_records[-1]
-        content = [
-            f"\n## 回合 {current_round.round_number}",
-            f"目標牌: {current_round.target_card}",
-            f"時間: {current_round.timestamp}",
-            "\n### 玩家動作"
-        ]
-
-        for action in current_round.actions:
-            content.extend([
-                f"\n#### 玩家 {action['player_id']}",
-                f"- 動作: {action['action_type']}",
-                f"- 出牌: {action['cards_played']}",
-                f"- 剩餘手牌: {action['cards_remaining']}",
-                f"- 開槍次數: {action['shots_fired']}",
-                f"- 表現: {action['behavior']}",
-                f"- 策略: {action['strategy']}",
-                f"- 子彈位置: {action['bullet_pos'] or '未知'}"
-            ])
-
-        with open(os.path.join(self.log_directory_path, "god_perspective.md"), "a", encoding="utf-8") as f:
-            f.write("\n".join(content))
@@ -0,0 +1,124 @@
+# liars_bar/utils/record_renderer.py
+"""
+由 JSONL 事件記錄產生 Markdown 視角記錄
+
+RecordManager 每局只寫一個 events.jsonl，每行一筆 JSON：
+- {"type": "round", "round": 回合, "target": 目標牌, "time": ISO 時間}：回合第一個動作前
+- {"type": "action", "round": 回合, "player": 玩家, "action": "play"/"challenge",
+   "played": 出牌, "remaining": 剩餘手牌, "shots": 開槍次數, "behavior": 表現,
+   "strategy": 策略, "bullet": 子彈位置}；質疑動作另有 "success": 質疑是否成功，
+   開槍動作另有 "hit": 是否中彈
+- {"type": "target", "round": 回合, "target": 目標牌}：回合中途更新目標牌
+- {"type": "end", "winner": 贏家, "time": ISO 時間}：一局結束（沒有這一行表示尚未結束或中斷）
+
+三個 Markdown 視角（回合內、玩家視角、上帝視角）只在需要時由本模組渲染，
+內容與過去每個動作直接寫入的三個檔案相同。
+"""
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+EVENTS_FILE = "events.jsonl"
+
+# 視角名稱 -> (檔名, 檔案標題)
+PERSPECTIVES = {
+    "round": ("round_records.md", "# 回合內記錄\n\n"),
+    "player": ("player_perspective.md", "# 玩家視角記錄\n\n"),
+    "god": ("god_perspective.md", "# 上帝視角記錄\n\n"),
+}
+_ORDER = ("round", "player", "god")
+
+
+def encode_record(record: Dict) -> str:
+    """編碼為一行 JSON（含換行）"""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[Dict]:
+    """由文字行解析事件記錄；略過寫到一半（沒有換行）的最後一行"""
+    for line in lines:
+        if not line.endswith("\n"):
+            break
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """逐行讀取事件記錄檔"""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_records(f)
+
+
+def render_round_header(round_number: int, target_card: str, timestamp: str) -> str:
+    """回合標題（三個視角相同）"""
+    return "\n".join([
+        f"\n## 回合 {round_number}",
+        f"目標牌: {target_card}",
+        f"時間: {timestamp}",
+        "\n### 玩家動作"
+    ])
+
+
+def render_action(record: Dict) -> Tuple[str, str, str]:
+    """將一個動作渲染為 (回合內, 玩家視角, 上帝視角) 三段文字，每個欄位只格式化一次"""
+    head = (f"\n\n#### 玩家 {record['player']}\n- 動作: {record['action']}"
+            f"\n- 出牌: {record['played']}")
+    remaining = f"\n- 剩餘手牌: {record['remaining']}"
+    tail = f"\n- 開槍次數: {record['shots']}\n- 表現: {record['behavior']}"
+    player = f"{head}{remaining}{tail}\n- 策略: {record['strategy']}"
+    return (head + tail, player, f"{player}\n- 子彈位置: {record['bullet'] or '未知'}")
+
+
+def render_all(records: Iterable[Dict]) -> Dict[str, str]:
+    """一次走訪記錄，渲染出所有視角的完整 Markdown"""
+    parts: Dict[str, List[str]] = {name: [PERSPECTIVES[name][1]] for name in _ORDER}
+    outputs = [parts[name] for name in _ORDER]
+    for record in records:
+        kind = record.get("type")
+        if kind == "action":
+            for out, text in zip(outputs, render_action(record)):
+                out.append(text)
+        elif kind == "round":
+            header = render_round_header(record["round"], record["target"], record["time"])
+            for out in outputs:
+                out.append(header)
+        elif kind == "target":
+            line = f"\n目標牌更新: {record['target']}"
+            for out in outputs:
+                out.append(line)
+    return {name: "".join(text) for name, text in parts.items()}
+
+
+def render(records: Iterable[Dict], perspective: str = "god") -> str:
+    """渲染單一視角的 Markdown"""
+    if perspective not in PERSPECTIVES:
+        raise ValueError(f"未知的視角: {perspective}（可用: {', '.join(_ORDER)}）")
+    return render_all(records)[perspective]
+
+
+def render_log_directory(log_dir: str, perspectives: Optional[Sequence[str]] = None,
+                         force: bool = False) -> List[str]:
+    """
+    將一局的 events.jsonl 渲染成 Markdown 檔並返回檔案路徑
+    檔案已存在且不比事件記錄舊時不重新渲染（force 時一律重寫）
+    """
+    events_path = os.path.join(log_dir, EVENTS_FILE)
+    if not os.path.exists(events_path):
+        raise FileNotFoundError(f"找不到事件記錄: {events_path}")
+    names = list(perspectives) if perspectives else list(_ORDER)
+    for name in names:
+        if name not in PERSPECTIVES:
+            raise ValueError(f"未知的視角: {name}（可用: {', '.join(_ORDER)}）")
+
+    events_mtime = os.path.getmtime(events_path)
+    paths = {name: os.path.join(log_dir, PERSPECTIVES[name][0]) for name in names}
+    stale = [name for name, path in paths.items()
+             if force or not os.path.exists(path) or os.path.getmtime(path) < events_mtime]
+    if stale:
+        texts = render_all(read_records(events_path))
+        for name in stale:
+            tmp_path = paths[name] + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(texts[name])
+            os.replace(tmp_path, paths[name])
+    return [paths[name] for name in names]
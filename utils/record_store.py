@@ -0,0 +1,294 @@
+# liars_bar/utils/record_store.py
+"""
+SQLite 遊戲記錄庫
+
+RecordManager 傳入 store 時，除了 events.jsonl 之外也把每局、每回合、每個動作寫入同一個資料庫，
+分析時以索引查詢，不需要逐一掃描、解析 log/game_* 目錄。
+
+- 表格：games（每局一列）、rounds（每回合開始時的目標牌）、
+  actions（每個動作，含當時的目標牌、出牌張數與質疑結果）
+- 索引：actions(game_id, round)、actions(player_id)、actions(action_type)
+- 寫入先累積在記憶體，達到 batch_size 筆或一局結束時以單一交易寫入；資料庫使用 WAL 模式，
+  寫入時其他進程仍可同時讀取
+- 既有的記錄目錄可用 import_log_directory() 由 events.jsonl 匯入
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from utils.record_renderer import EVENTS_FILE, read_records
+
+DEFAULT_RECORD_DB_PATH = os.path.join("log", "records.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    num_players INTEGER,
+    log_dir TEXT,
+    started_at TEXT,
+    ended_at TEXT,
+    winner INTEGER
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    target_card TEXT,
+    started_at TEXT,
+    PRIMARY KEY (game_id, round)
+);
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    action_type TEXT NOT NULL,
+    target_card TEXT,
+    cards_played TEXT,
+    num_cards INTEGER,
+    cards_remaining TEXT,
+    shots_fired INTEGER,
+    behavior TEXT,
+    strategy TEXT,
+    bullet_pos INTEGER,
+    success INTEGER,
+    hit INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_actions_game_round ON actions (game_id, round);
+CREATE INDEX IF NOT EXISTS idx_actions_player ON actions (player_id);
+CREATE INDEX IF NOT EXISTS idx_actions_type ON actions (action_type);
+"""
+
+_ACTION_COLUMNS = ("game_id", "round", "seq", "player_id", "action_type", "target_card",
+                   "cards_played", "num_cards", "cards_remaining", "shots_fired", "behavior",
+                   "strategy", "bullet_pos", "success", "hit")
+_LOG_DIR_NAME = re.compile(r"game_(\d+)_(.+)$")
+
+
+class RecordStore:
+    """以 SQLite 保存遊戲記錄並提供索引查詢"""
+
+    def __init__(self, path: str = DEFAULT_RECORD_DB_PATH, batch_size: int = 500):
+        """
+        path: 資料庫路徑（":memory:" 為記憶體資料庫）
+        batch_size: 累積多少筆待寫資料就寫入一次
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        # 遊戲執行緒與分析程式可能在不同執行緒使用同一個連線，以鎖保護
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._games: List[Tuple] = []
+        self._rounds: List[Tuple] = []
+        self._actions: List[Tuple] = []
+        self._ended: List[Tuple] = []
+
+    # 寫入
+
+    def begin_game(self, game_id: int, session_id: str, num_players: Optional[int] = None,
+                   log_dir: Optional[str] = None, started_at: Optional[str] = None):
+        """登記一局（同編號已存在時覆寫）"""
+        with self._lock:
+            self._games.append((game_id, session_id, num_players, log_dir,
+                                started_at or datetime.now().isoformat()))
+            self._maybe_flush()
+
+    def add_round(self, game_id: int, round_number: int, target_card: str,
+                  started_at: Optional[str] = None):
+        """登記一個回合（目標牌為回合開始時的目標牌；每個動作另記錄當時的目標牌）"""
+        with self._lock:
+            self._rounds.append((game_id, round_number, target_card, started_at))
+            self._maybe_flush()
+
+    def add_action(self, game_id: int, round_number: int, seq: int, player_id: int,
+                   action_type: str, target_card: Optional[str] = None,
+                   cards_played: Sequence[str] = (), cards_remaining: Sequence[str] = (),
+                   shots_fired: Optional[int] = None, behavior: Optional[str] = None,
+                   strategy: Optional[str] = None, bullet_pos: Optional[int] = None,
+                   success: Optional[bool] = None, hit: Optional[bool] = None):
+        """登記一個動作；seq 為本局內的動作序號，success 為質疑結果，hit 為開槍是否中彈"""
+        with self._lock:
+            self._actions.append((
+                game_id, round_number, seq, player_id, action_type, target_card,
+                json.dumps(list(cards_played), ensure_ascii=False), len(cards_played),
+                json.dumps(list(cards_remaining), ensure_ascii=False), shots_fired,
+                behavior, strategy, bullet_pos, None if success is None else int(success),
+                None if hit is None else int(hit)))
+            self._maybe_flush()
+
+    def end_game(self, game_id: int, winner: Optional[int] = None,
+                 ended_at: Optional[str] = None):
+        """登記一局結束並寫入所有待寫資料"""
+        with self._lock:
+            self._ended.append((ended_at or datetime.now().isoformat(), winner, game_id))
+            self.flush()
+
+    def flush(self):
+        """以單一交易寫入所有待寫資料"""
+        with self._lock:
+            if not (self._games or self._rounds or self._actions or self._ended):
+                return
+            with self.conn:
+                if self._games:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO games (game_id, session_id, num_players, log_dir, "
+                        "started_at) VALUES (?, ?, ?, ?, ?)", self._games)
+                if self._rounds:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO rounds (game_id, round, target_card, started_at) "
+                        "VALUES (?, ?, ?, ?)", self._rounds)
+                if self._actions:
+                    self.conn.executemany(
+                        f"INSERT INTO actions ({', '.join(_ACTION_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_ACTION_COLUMNS))})", self._actions)
+                if self._ended:
+                    self.conn.executemany(
+                        "UPDATE games SET ended_at = ?, winner = ? WHERE game_id = ?",
+                        self._ended)
+            self._games.clear()
+            self._rounds.clear()
+            self._actions.clear()
+            self._ended.clear()
+
+    def close(self):
+        """寫入待寫資料並關閉連線"""
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+    def _maybe_flush(self):
+        if len(self._games) + len(self._rounds) + len(self._actions) >= self.batch_size:
+            self.flush()
+
+    # 匯入
+
+    def import_log_directory(self, log_dir: str) -> int:
+        """
+        由記錄目錄的 events.jsonl 匯入一局（目錄名稱須為 game_<編號>_<session>），
+        返回匯入的動作數；該局已在資料庫中時略過並返回 0
+        """
+        match = _LOG_DIR_NAME.match(os.path.basename(os.path.normpath(log_dir)))
+        if not match:
+            raise ValueError(f"無法由目錄名稱判斷遊戲編號: {log_dir}")
+        events_path = os.path.join(log_dir, EVENTS_FILE)
+        if not os.path.exists(events_path):
+            raise FileNotFoundError(f"找不到事件記錄: {events_path}")
+        game_id, session_id = int(match.group(1)), match.group(2)
+        with self._lock:
+            self.flush()
+            if self.conn.execute("SELECT 1 FROM games WHERE game_id = ?", (game_id,)).fetchone():
+                return 0
+
+            records = list(read_records(events_path))
+            started_at = next((r.get("time") for r in records if r.get("type") == "round"), None)
+            self.begin_game(game_id, session_id, log_dir=log_dir, started_at=started_at)
+            target = None
+            seq = 0
+            for record in records:
+                kind = record.get("type")
+                if kind == "round":
+                    target = record["target"]
+                    self.add_round(game_id, record["round"], target, record.get("time"))
+                elif kind == "target":
+                    target = record["target"]
+                elif kind == "action":
+                    seq += 1
+                    self.add_action(game_id, record["round"], seq, record["player"],
+                                    record["action"], target, record["played"],
+                                    record["remaining"], record["shots"], record["behavior"],
+                                    record["strategy"], record["bullet"], record.get("success"),
+                                    record.get("hit"))
+                elif kind == "end":
+                    self.end_game(game_id, record.get("winner"), record.get("time"))
+            self.flush()
+            return seq
+
+    # 查詢
+
+    def query(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        """執行任意唯讀查詢，每列返回一個字典"""
+        with self._lock:
+            self.flush()
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def actions(self, game_id: Optional[int] = None, round_number: Optional[int] = None,
+                player_id: Optional[int] = None, action_type: Optional[str] = None,
+                target_card: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """依條件查詢動作（依局與序號排序），出牌與剩餘手牌還原為串列"""
+        where, params = _conditions(game_id=game_id, round=round_number, player_id=player_id,
+                                    action_type=action_type, target_card=target_card)
+        sql = f"SELECT * FROM actions{where} ORDER BY game_id, seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self.query(sql, params)
+        for row in rows:
+            row["cards_played"] = json.loads(row["cards_played"])
+            row["cards_remaining"] = json.loads(row["cards_remaining"])
+        return rows
+
+    def round_actions(self, game_id: int, round_number: int) -> List[Dict]:
+        """某局某回合的所有動作（走 (game_id, round) 索引），供 AI 取得回合上下文"""
+        return self.actions(game_id=game_id, round_number=round_number)
+
+    def action_counts(self, game_id: Optional[int] = None,
+                      player_id: Optional[int] = None) -> Dict[str, int]:
+        """各動作類型的次數"""
+        where, params = _conditions(game_id=game_id, player_id=player_id)
+        rows = self.query(f"SELECT action_type, COUNT(*) AS n FROM actions{where} "
+                          f"GROUP BY action_type", params)
+        return {row["action_type"]: row["n"] for row in rows}
+
+    def challenge_success_rate(self, player_id: Optional[int] = None,
+                               target_card: Optional[str] = None) -> Tuple[float, int]:
+        """質疑成功率與有結果的質疑次數，例如 player_id=2, target_card="K" """
+        where, params = _conditions(action_type="challenge", player_id=player_id,
+                                    target_card=target_card)
+        row = self.query(f"SELECT COUNT(success) AS n, SUM(success) AS wins FROM actions{where}",
+                         params)[0]
+        total = row["n"] or 0
+        return ((row["wins"] or 0) / total if total else 0.0), total
+
+    def games(self, limit: Optional[int] = None) -> List[Dict]:
+        """最近的對局（依編號由新到舊）"""
+        sql = "SELECT * FROM games ORDER BY game_id DESC"
+        params: List = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+
+def _conditions(**filters) -> Tuple[str, List]:
+    """將非 None 的條件組成 WHERE 子句"""
+    clauses, params = [], []
+    for column, value in filters.items():
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+_STORES: Dict[str, RecordStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_record_store(path: str = DEFAULT_RECORD_DB_PATH) -> RecordStore:
+    """取得某個資料庫的共用記錄庫（依絕對路徑快取）"""
+    key = os.path.abspath(path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = RecordStore(key)
+            _STORES[key] = store
+        return store
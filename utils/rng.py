@@ -0,0 +1,40 @@
+# liars_bar/utils/rng.py
+import hashlib
+import random
+import secrets
+from typing import List, Optional, Tuple
+
+
+class SeedStream:
+    """
+    可分裂的亂數種子流，概念同 numpy.random.SeedSequence：
+    由根種子與分裂路徑 (spawn_key) 雜湊出子種子，任一子流都可由 (entropy, spawn_key) 直接重建，
+    不需依序產生前面的子流，因此百萬局中的任一局都能單獨重播。
+    """
+
+    def __init__(self, entropy: Optional[int] = None, spawn_key: Tuple[int, ...] = ()):
+        self.entropy = secrets.randbits(128) if entropy is None else entropy
+        self.spawn_key = tuple(spawn_key)
+        self._spawned = 0
+
+    def child(self, index: int) -> "SeedStream":
+        """取得第 index 個子流（隨機存取）"""
+        return SeedStream(self.entropy, self.spawn_key + (index,))
+
+    def spawn(self, count: int) -> List["SeedStream"]:
+        """依序產生 count 個尚未使用過的子流"""
+        children = [self.child(self._spawned + i) for i in range(count)]
+        self._spawned += count
+        return children
+
+    def seed(self) -> int:
+        """此子流對應的 128 位元整數種子"""
+        data = ",".join(str(part) for part in (self.entropy,) + self.spawn_key)
+        return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=16).digest(), "little")
+
+    def rng(self) -> random.Random:
+        """建立此子流專屬的亂數產生器"""
+        return random.Random(self.seed())
+
+    def __repr__(self) -> str:
+        return f"SeedStream(entropy={self.entropy}, spawn_key={self.spawn_key})"